@@ -1,50 +1,1217 @@
+import gzip
+import hashlib
+import html
+import mimetypes
 import os
+import queue
+import re
 import sys
 import json
 import socket
+import statistics
+import threading
+import time
 import webbrowser
+from collections import OrderedDict, deque
+from itertools import islice
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from urllib.parse import quote, unquote, urlsplit
 
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 
-def tor_port_open(host: str, port: int, timeout=1.0) -> bool:
+# Tor Project's own onion service, used as the circuit health target
+HEALTH_ONION = "2gzyxa5ihm7nsggfxnu52rck2vv4rvmdlkiu3zzui5du4xyclen53wid.onion"
+
+
+def parse_proxy(proxy: str):
+    host, port = "127.0.0.1", 9150
+    if ":" in proxy:
+        host, p = proxy.rsplit(":", 1)
+        try:
+            port = int(p)
+        except ValueError:
+            port = 9150
+    return host, port
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise OSError("bağlantı kapandı")
+        buf += chunk
+    return buf
+
+
+def _shutdown(sock):
     try:
-        with socket.create_connection((host, port), timeout=timeout):
-            return True
+        sock.shutdown(socket.SHUT_RDWR)
     except OSError:
-        return False
+        pass
+
+
+class CircuitError(OSError):
+    """The proxy answered the SOCKS5 greeting, but the CONNECT through it failed (rejected,
+    timed out or dropped): Tor is up, the circuit is not."""
 
 
-def pick_free_port() -> int:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(("127.0.0.1", 0))
-        return s.getsockname()[1]
+def socks5_probe(host: str, port: int, timeout=2.0, target=None, track=None):
+    """SOCKS5 greeting (no auth) against host:port and, with target=(host, port), a CONNECT.
+
+    Returns (handshake_ms, connect_ms or None); raises OSError when the proxy is not
+    usable and CircuitError when only the CONNECT failed. track, if given, is called with
+    the socket once it is connected and with None when the probe is over, so the caller
+    can shut it down to interrupt a long CONNECT.
+    """
+    t0 = time.monotonic()
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        if track:
+            track(sock)
+        try:
+            sock.settimeout(timeout)
+            sock.sendall(b"\x05\x01\x00")
+            if _recv_exact(sock, 2) != b"\x05\x00":
+                raise OSError("SOCKS5 değil / kimlik doğrulama istiyor")
+            handshake_ms = (time.monotonic() - t0) * 1000
+            if target is None:
+                return handshake_ms, None
+
+            name = target[0].encode("idna")
+            t1 = time.monotonic()
+            try:
+                sock.sendall(b"\x05\x01\x00\x03" + bytes([len(name)]) + name + target[1].to_bytes(2, "big"))
+                ver, rep, _, atyp = _recv_exact(sock, 4)
+                if ver != 5 or rep != 0:
+                    raise CircuitError(f"SOCKS5 CONNECT reddedildi (0x{rep:02x})")
+                # bound address: IPv4, domain or IPv6, then the port
+                size = {1: 4, 4: 16}.get(atyp) or _recv_exact(sock, 1)[0]
+                _recv_exact(sock, size + 2)
+            except CircuitError:
+                raise
+            except OSError as e:
+                raise CircuitError(f"SOCKS5 CONNECT başarısız: {e or e.__class__.__name__}") from e
+            return handshake_ms, (time.monotonic() - t1) * 1000
+        finally:
+            if track:
+                track(None)
+
+
+class TorMonitor(QtCore.QThread):
+    """Probes the Tor SOCKS port off the GUI thread and keeps a rolling health history.
+
+    Every interval a SOCKS5 handshake is timed. When enabled, a separate circuit thread
+    times a CONNECT to HEALTH_ONION every interval * circuit_every (that needs a working
+    circuit and may take up to circuit_timeout), so a slow onion never holds up the
+    handshake samples. The history deques belong to the monitor thread: the circuit
+    thread hands its results over through a queue and the GUI thread only queues a reset.
+    stop() shuts down the sockets of running probes, so it never waits for a timeout.
+    """
+
+    sampled = QtCore.pyqtSignal(object)   # health summary dict, after every probe
+    stateChanged = QtCore.pyqtSignal(bool)  # proxy became reachable / unreachable
+
+    def __init__(self, interval=1.5, history=200, circuit_every=20, circuit_timeout=30.0, parent=None):
+        super().__init__(parent)
+        self.interval = interval
+        self.circuit_every = circuit_every
+        self.circuit_timeout = circuit_timeout
+        self.samples = deque(maxlen=history)  # (time, ok, handshake_ms)
+        self.circuits = deque(maxlen=history // circuit_every or 1)  # (time, ok, connect_ms)
+        self._lock = threading.Lock()
+        self._endpoint = ("127.0.0.1", 9150)
+        self._circuit = False
+        self._reset = False
+        self._wake = threading.Event()
+        self._circuit_wake = threading.Event()
+        self._stopping = threading.Event()
+        self._circuit_results = queue.SimpleQueue()  # ((host, port), time, ok, connect_ms, error)
+        self._probes = {}  # thread ident -> socket of its running probe
+        self._state = None
+
+    def set_endpoint(self, host: str, port: int):
+        with self._lock:
+            changed = (host, port) != self._endpoint
+            self._endpoint = (host, port)
+            if changed:
+                self._reset = True
+        if changed:
+            self._wake.set()
+            self._circuit_wake.set()
+
+    def set_circuit_check(self, enabled: bool):
+        with self._lock:
+            self._circuit = enabled
+        self._circuit_wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self.requestInterruption()
+        with self._lock:
+            probes = list(self._probes.values())
+        for sock in probes:
+            _shutdown(sock)
+        self._wake.set()
+        self._circuit_wake.set()
+        self.wait()
+
+    def _track(self, sock):
+        ident = threading.get_ident()
+        with self._lock:
+            if sock is None:
+                self._probes.pop(ident, None)
+            else:
+                self._probes[ident] = sock
+                if self._stopping.is_set():
+                    _shutdown(sock)
+
+    def run(self):
+        circuits = threading.Thread(target=self._circuit_loop, name="tor-circuit-probe", daemon=True)
+        circuits.start()
+        try:
+            self._sample_loop()
+        finally:
+            self._circuit_wake.set()
+            circuits.join()
+
+    def _sample_loop(self):
+        while not self.isInterruptionRequested():
+            with self._lock:
+                host, port = self._endpoint
+                reset, self._reset = self._reset, False
+            if reset:
+                self.samples.clear()
+                self.circuits.clear()
+
+            now = time.time()
+            error = ""
+            try:
+                handshake_ms, _ = socks5_probe(host, port, track=self._track)
+                self.samples.append((now, True, handshake_ms))
+            except OSError as e:
+                error = str(e) or e.__class__.__name__
+                self.samples.append((now, False, None))
+            if self.isInterruptionRequested():
+                break
+            circuit_error = self._drain_circuits((host, port))
+
+            ok = self.samples[-1][1]
+            if ok != self._state:
+                self._state = ok
+                self.stateChanged.emit(ok)
+            self.sampled.emit(self.summary(host, port, error, circuit_error))
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _drain_circuits(self, endpoint) -> str:
+        """Moves finished circuit probes of the current endpoint into the history and
+        returns the error of the last failed one ("" if none)."""
+        error = ""
+        while True:
+            try:
+                ep, at, ok, ms, err = self._circuit_results.get_nowait()
+            except queue.Empty:
+                return error
+            if ep == endpoint:
+                self.circuits.append((at, ok, ms))
+                error = err
+
+    def _circuit_loop(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                enabled = self._circuit
+                host, port = self._endpoint
+            if enabled:
+                now = time.time()
+                try:
+                    _, connect_ms = socks5_probe(
+                        host, port, timeout=self.circuit_timeout, target=(HEALTH_ONION, 80), track=self._track
+                    )
+                    result = (now, True, connect_ms, "")
+                except OSError as e:
+                    # a dead proxy shows up in the handshake samples; here it is just no circuit
+                    result = (now, False, None, str(e) or e.__class__.__name__)
+                if self._stopping.is_set():
+                    return
+                self._circuit_results.put(((host, port),) + result)
+            self._circuit_wake.wait(self.interval * self.circuit_every if enabled else None)
+            self._circuit_wake.clear()
+
+    def summary(self, host: str, port: int, error: str, circuit_error: str = "") -> dict:
+        samples = list(self.samples)
+        circuits = list(self.circuits)
+        latencies = [ms for _, ok, ms in samples if ok and ms is not None]
+        last_circuit = circuits[-1] if circuits else None
+        return {
+            "endpoint": f"{host}:{port}",
+            "ok": samples[-1][1] if samples else False,
+            "error": error,
+            "circuit_error": circuit_error,
+            "handshake_ms": samples[-1][2] if samples else None,
+            "handshake_p50": statistics.median(latencies) if latencies else None,
+            "availability": sum(1 for _, ok, _ in samples if ok) / len(samples) if samples else 0.0,
+            "window_s": samples[-1][0] - samples[0][0] if len(samples) > 1 else 0.0,
+            "circuit_ok": last_circuit[1] if last_circuit else None,
+            "circuit_ms": last_circuit[2] if last_circuit else None,
+            "circuit_availability": (
+                sum(1 for _, ok, _ in circuits if ok) / len(circuits) if circuits else None
+            ),
+            "history": [ms if ok else None for _, ok, ms in samples[-40:]],
+        }
 
 
-class LocalServer(QtCore.QObject):
-    started = QtCore.pyqtSignal(int)
-    stopped = QtCore.pyqtSignal()
+# ---------------- Result stream ----------------
+
+
+class JsonlTail:
+    """Reads the records appended to a JSONL file since the last call.
+
+    Keeps the offset and an unterminated last line (the scanner may be mid-line); a
+    truncated or replaced file (new scan without -resume) starts over from the top.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.pos = 0
+        self.ino = None
+        self.partial = b""
+
+    def read(self, max_bytes=None):
+        """Returns (records, restarted, more): restarted when earlier records no longer
+        apply, more when max_bytes left unread data behind."""
+        restarted = False
+        try:
+            st = self.path.stat()
+        except OSError:
+            restarted = self.ino is not None
+            self.pos, self.ino, self.partial = 0, None, b""
+            return [], restarted, False
+        if self.ino is not None and (st.st_ino != self.ino or st.st_size < self.pos):
+            self.pos, self.partial = 0, b""
+            restarted = True
+        self.ino = st.st_ino
+        if st.st_size == self.pos:
+            return [], restarted, False
+
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.pos)
+                chunk = f.read(max_bytes if max_bytes else st.st_size - self.pos)
+        except OSError:
+            return [], restarted, False
+        self.pos += len(chunk)
+
+        lines = (self.partial + chunk).split(b"\n")
+        self.partial = lines.pop()
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, restarted, self.pos < st.st_size
+
+
+class LatestResults:
+    """Latest record per URL of a result stream, kept up to date from the appended bytes
+    only. Thread-safe (preview server handler threads)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tail = None
+        self.latest = {}  # url -> record, most recently updated last
+        self.active = 0
+
+    def update(self, path: Path):
+        with self.lock:
+            if self.tail is None or self.tail.path != path:
+                self.tail = JsonlTail(path)
+                self.latest, self.active = {}, 0
+            records, restarted, _ = self.tail.read()
+            if restarted:
+                self.latest, self.active = {}, 0
+            for rec in records:
+                url = rec.get("normalized_url") or rec.get("url")
+                if not url:
+                    continue
+                old = self.latest.pop(url, None)
+                if old is not None and old.get("active"):
+                    self.active -= 1
+                if rec.get("active"):
+                    self.active += 1
+                self.latest[url] = rec
+
+    def snapshot(self, limit: int):
+        """(total urls, active urls, newest `limit` records)."""
+        with self.lock:
+            return len(self.latest), self.active, list(islice(reversed(self.latest.values()), limit))
+
+
+# ---------------- Preview server ----------------
+
+PREVIEW_DIRS = ("html", "screenshots")
+INDEX_LIMIT = 2000  # rows on the index page
+
+mimetypes.add_type("image/webp", ".webp")  # missing from older mimetypes tables
+
+
+def safe_file_name(name: str) -> bool:
+    """A single plain file name: no separators (either OS), drive letters or dot segments."""
+    return (
+        name not in ("", ".", "..")
+        and not any(c in name for c in "/\\:\0")
+        and os.sep not in name
+        and (os.altsep is None or os.altsep not in name)
+    )
+
+
+def preview_url_path(saved: str) -> str:
+    """/html/<name> or /screenshots/<name> for a path from the result stream."""
+    p = Path(saved)
+    return f"/{p.parent.name}/{quote(p.name)}"
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    """Serves <out>/html and <out>/screenshots plus an index of the latest scan.
+
+    HTTP/1.1 keep-alive, ETag/304 revalidation, archived .html.gz bodies sent as-is
+    to gzip clients and other HTML gzipped on the fly.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "TorScraperPreview/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        root = self.server.root
+        path = unquote(urlsplit(self.path).path)
+        if root is None:
+            return self.send_plain(503, "output klasörü seçilmedi", head)
+        if path in ("/", "/index.html"):
+            return self.send_index(root, head)
+
+        parts = path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] not in PREVIEW_DIRS or not safe_file_name(parts[1]):
+            return self.send_plain(404, "bulunamadı", head)
+        base = (root / parts[0]).resolve()
+        file = (base / parts[1]).resolve()
+        if file.parent != base:
+            return self.send_plain(404, "bulunamadı", head)
+        gz = None
+        if parts[0] == "html" and not file.is_file():
+            # -html-gzip archives store <sha256>.html.gz
+            gz, file = file.with_name(file.name + ".gz"), None
+            if not gz.is_file():
+                return self.send_plain(404, "bulunamadı", head)
+        elif not file.is_file():
+            return self.send_plain(404, "bulunamadı", head)
+        elif parts[0] == "html" and file.name.endswith(".gz"):
+            gz, file = file, None
+
+        src = gz or file
+        try:
+            st = src.stat()
+        except OSError:
+            return self.send_plain(404, "bulunamadı", head)
+        accepts_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+        name = src.name[:-3] if gz else src.name
+        ctype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if ctype.startswith("text/"):
+            ctype += "; charset=utf-8"
+        compress = accepts_gzip and (gz is not None or (ctype.startswith("text/html") and st.st_size > 1024))
+
+        etag = f'"{st.st_size:x}-{st.st_mtime_ns:x}{"-gz" if compress else ""}"'
+        if etag in self.headers.get("If-None-Match", ""):
+            return self.send_body(304, b"", ctype, etag, head=True)
+
+        try:
+            body = src.read_bytes()
+        except OSError:
+            # removed between the checks and the read
+            return self.send_plain(404, "bulunamadı", head)
+        if gz is not None and not accepts_gzip:
+            body = gzip.decompress(body)
+        elif gz is None and compress:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_body(200, body, ctype, etag, gzipped=compress, head=head, sandbox=parts[0] == "html")
+
+    def send_index(self, root: Path, head: bool):
+        stream = root / "scan_results.jsonl"
+        try:
+            st = stream.stat()
+            etag = f'"idx-{st.st_size:x}-{st.st_mtime_ns:x}"'
+        except OSError:
+            st, etag = None, '"idx-empty"'
+        if etag in self.headers.get("If-None-Match", ""):
+            return self.send_body(304, b"", "text/html; charset=utf-8", etag, head=True)
+
+        # only the bytes appended since the last index request are parsed
+        self.server.results.update(stream)
+        total, active, rows = self.server.results.snapshot(INDEX_LIMIT)
+
+        out = [
+            "<!doctype html><html><head><meta charset='utf-8'><title>Son tarama</title><style>",
+            "body{font:14px sans-serif;background:#0e1626;color:#e9f0ff;margin:20px}",
+            "table{border-collapse:collapse;width:100%}td,th{padding:6px 8px;border-bottom:1px solid #2b3c55;text-align:left}",
+            "a{color:#8dd7ff}.ok{color:#4ade80}.no{color:#f87171}img{max-width:160px;display:block}",
+            "</style></head><body>",
+            f"<h2>Son tarama: {total} URL, {active} aktif</h2>",
+        ]
+        if total > INDEX_LIMIT:
+            out.append(f"<p>En yeni {INDEX_LIMIT} kayıt gösteriliyor.</p>")
+        out.append("<table><tr><th>Önizleme</th><th>URL</th><th>Durum</th><th>HTTP</th><th>Tarih (UTC)</th><th>HTML</th></tr>")
+        for r in rows:
+            shot = r.get("saved_thumbnail") or r.get("saved_screenshot")
+            img = ""
+            if shot:
+                full = preview_url_path(r.get("saved_screenshot") or shot)
+                img = f"<a href='{full}'><img loading='lazy' src='{preview_url_path(shot)}'></a>"
+            page = f"<a href='{preview_url_path(r['saved_html'])}'>aç</a>" if r.get("saved_html") else ""
+            state = "<span class='ok'>aktif</span>" if r.get("active") else "<span class='no'>pasif</span>"
+            out.append(
+                f"<tr><td>{img}</td><td>{html.escape(r.get('normalized_url') or r.get('url', ''))}</td><td>{state}</td>"
+                f"<td title='{html.escape(r.get('error', ''), quote=True)}'>{r.get('http_status') or '-'}</td>"
+                f"<td>{html.escape(r.get('timestamp_utc', ''))}</td><td>{page}</td></tr>"
+            )
+        out.append("</table></body></html>")
+        body = "".join(out).encode("utf-8")
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_body(200, body, "text/html; charset=utf-8", etag, gzipped=gzipped, head=head)
+
+    def send_body(self, code: int, body: bytes, ctype: str, etag: str, gzipped=False, head=False, sandbox=False):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("X-Content-Type-Options", "nosniff")
+        if sandbox:
+            # scraped pages: no scripts, no forms, opaque origin, nothing loaded from this server
+            self.send_header("Content-Security-Policy", "sandbox; default-src 'none'; img-src data:; style-src 'unsafe-inline'")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(0 if code == 304 else len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def send_plain(self, code: int, text: str, head=False):
+        body = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+class PreviewServer:
+    """One threaded HTTP server for the whole GUI session, started on first use (127.0.0.1)."""
+
+    def __init__(self):
+        self.httpd = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def serve(self, root: Path) -> str:
+        """Points the server at an output directory (starting it if needed) and returns its base URL."""
+        if self.httpd is None:
+            self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), PreviewHandler)
+            self.httpd.daemon_threads = True
+            self.httpd.root = None
+            self.httpd.results = LatestResults()
+            self.thread = threading.Thread(target=self.httpd.serve_forever, name="preview-server", daemon=True)
+            self.thread.start()
+        self.httpd.root = root.resolve()
+        return self.url
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+# ---------------- Results (model / view) ----------------
+
+RESULT_COLUMNS = ["URL", "Durum", "HTTP", "Tarih (UTC)", "HTML", "Screenshot", "Aç"]
+COL_URL, COL_STATE, COL_HTTP, COL_TIME, COL_HTML, COL_SHOT, COL_OPEN = range(len(RESULT_COLUMNS))
+
+ROW_ROLE = QtCore.Qt.UserRole + 1
+
+
+class ResultRow:
+    """The fields of one scan_results.jsonl record the views need."""
+
+    __slots__ = ("url", "active", "changed", "status", "error", "ts", "html", "shot", "thumb")
+
+    def __init__(self, rec: dict):
+        self.url = rec.get("normalized_url") or rec.get("url", "")
+        self.active = bool(rec.get("active"))
+        self.changed = bool(rec.get("changed"))
+        self.status = int(rec.get("http_status") or 0)
+        self.error = rec.get("error", "")
+        self.ts = rec.get("timestamp_utc", "")
+        self.html = rec.get("saved_html", "")
+        self.shot = rec.get("saved_screenshot", "")
+        self.thumb = rec.get("saved_thumbnail", "")
+
+
+# sort keys per column; sorting runs on the Python rows, not through data() per comparison
+SORT_KEYS = {
+    COL_URL: lambda r: r.url,
+    COL_STATE: lambda r: (r.active, r.changed),
+    COL_HTTP: lambda r: r.status,
+    COL_TIME: lambda r: r.ts,
+    COL_HTML: lambda r: r.html,
+    COL_SHOT: lambda r: r.shot,
+    COL_OPEN: lambda r: bool(r.html),
+}
+
+
+class ResultsModel(QtCore.QAbstractTableModel):
+    """One row per URL (the latest record wins); cell text is built only when a view asks."""
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.proc = QtCore.QProcess(self)
-        self.proc.finished.connect(lambda *_: self.stopped.emit())
+        self._rows = []
+        self._index = {}  # url -> row
+        self._sort = None  # (column, order)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(RESULT_COLUMNS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return RESULT_COLUMNS[section]
+        return None
+
+    def row(self, i: int) -> ResultRow:
+        return self._rows[i]
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        r = self._rows[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if col == COL_URL:
+                return r.url
+            if col == COL_STATE:
+                if not r.active:
+                    return "Pasif"
+                return "Aktif (değişti)" if r.changed else "Aktif"
+            if col == COL_HTTP:
+                return str(r.status) if r.status else "-"
+            if col == COL_TIME:
+                return r.ts.replace("T", " ").rstrip("Z")
+            if col == COL_HTML:
+                return Path(r.html).name if r.html else ""
+            if col == COL_SHOT:
+                return Path(r.shot).name if r.shot else ""
+            if col == COL_OPEN:
+                return "Aç" if r.html else ""
+        elif role == ROW_ROLE:
+            return r
+        elif role == QtCore.Qt.ToolTipRole:
+            if col == COL_HTTP and r.error:
+                return r.error
+            if col == COL_URL:
+                return r.url
+        elif role == QtCore.Qt.ForegroundRole and col == COL_STATE:
+            return QtGui.QColor("#4ade80" if r.active else "#f87171")
+        return None
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self._index = {}
+        self.endResetModel()
+
+    def apply(self, records):
+        """Adds new URLs at the end and updates known ones in place."""
+        added = []
+        updated = []
+        for rec in records:
+            row = ResultRow(rec)
+            if not row.url:
+                continue
+            i = self._index.get(row.url)
+            if i is None:
+                self._index[row.url] = len(self._rows) + len(added)
+                added.append(row)
+            elif i >= len(self._rows):
+                added[i - len(self._rows)] = row
+            else:
+                self._rows[i] = row
+                updated.append(i)
+
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+        if updated:
+            self.dataChanged.emit(self.index(min(updated), 0), self.index(max(updated), len(RESULT_COLUMNS) - 1))
+        if added or updated:
+            self._resort()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self._sort = (column, order) if column in SORT_KEYS else None
+        self._resort()
+
+    def _resort(self):
+        if self._sort is None:
+            return
+        column, order = self._sort
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        kept = [self._rows[i.row()] for i in persistent]
+        # stream batches arrive nearly sorted, which timsort handles in about linear time
+        self._rows.sort(key=SORT_KEYS[column], reverse=order == QtCore.Qt.DescendingOrder)
+        self._index = {r.url: i for i, r in enumerate(self._rows)}
+        self.changePersistentIndexList(
+            persistent, [self.index(self._index[r.url], i.column()) for r, i in zip(kept, persistent)]
+        )
+        self.layoutChanged.emit()
+
+
+class ResultsFilter(QtCore.QSortFilterProxyModel):
+    """URL text / state / date filter over ResultsModel; with need_shot only rows with a screenshot."""
+
+    STATES = ["Tümü", "Aktif", "Pasif", "Değişen"]
+
+    def __init__(self, need_shot=False, parent=None):
+        super().__init__(parent)
+        self.need_shot = need_shot
+        self.text = ""
+        self.state = 0
+        self.since = ""  # RFC3339 UTC, compared as string
+        self.setDynamicSortFilter(True)
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        # the source model sorts; the proxy only filters and keeps the source order
+        self.sourceModel().sort(column, order)
+
+    def set_filter(self, text: str, state: int, since: str):
+        self.text = text.strip().lower()
+        self.state = state
+        self.since = since
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        r = self.sourceModel().row(source_row)
+        if self.need_shot and not r.shot:
+            return False
+        if self.text and self.text not in r.url.lower():
+            return False
+        if self.state == 1 and not r.active:
+            return False
+        if self.state == 2 and r.active:
+            return False
+        if self.state == 3 and not (r.active and r.changed):
+            return False
+        if self.since and r.ts < self.since:
+            return False
+        return True
+
+
+class OpenButtonDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints a button in the cell and reports clicks, instead of one QPushButton widget per row."""
+
+    clicked = QtCore.pyqtSignal(QtCore.QModelIndex)
+
+    def paint(self, painter, option, index):
+        text = index.data()
+        if not text:
+            super().paint(painter, option, index)
+            return
+        btn = QtWidgets.QStyleOptionButton()
+        btn.rect = option.rect.adjusted(6, 3, -6, -3)
+        btn.text = text
+        btn.state = QtWidgets.QStyle.State_Enabled | (option.state & QtWidgets.QStyle.State_MouseOver)
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        style.drawControl(QtWidgets.QStyle.CE_PushButton, btn, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if (
+            event.type() == QtCore.QEvent.MouseButtonRelease
+            and event.button() == QtCore.Qt.LeftButton
+            and index.data()
+            and option.rect.contains(event.pos())
+        ):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class ResultsTail(QtCore.QObject):
+    """Follows the scanner's scan_results.jsonl and feeds only the new lines to a ResultsModel.
+
+    Driven by a file system watcher (and by scanner output while a scan runs); a truncated
+    or replaced stream (new scan without -resume) starts over.
+    """
+
+    CHUNK = 4 << 20  # bytes parsed per event loop turn
+
+    def __init__(self, model: ResultsModel, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.tail = None
+
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watcher.directoryChanged.connect(self.schedule)
+
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(250)
+        self._debounce.timeout.connect(self.poll)
+
+    def follow(self, out_dir: Path):
+        path = out_dir / "scan_results.jsonl"
+        if self.tail is None or path != self.tail.path:
+            watched = self.watcher.files() + self.watcher.directories()
+            if watched:
+                self.watcher.removePaths(watched)
+            self.tail = JsonlTail(path)
+            self.model.clear()
+        self.poll()
+
+    def schedule(self, *_):
+        if not self._debounce.isActive():
+            self._debounce.start()
+
+    def poll(self):
+        if self.tail is None:
+            return
+        path = self.tail.path
+        out_dir = str(path.parent)
+        if out_dir not in self.watcher.directories() and os.path.isdir(out_dir):
+            self.watcher.addPath(out_dir)
+        if path.exists() and str(path) not in self.watcher.files():
+            self.watcher.addPath(str(path))
+
+        records, restarted, more = self.tail.read(self.CHUNK)
+        if restarted:
+            self.model.clear()
+        if records:
+            self.model.apply(records)
+        if more:
+            QtCore.QTimer.singleShot(0, self.poll)
+
+
+# ---------------- Thumbnail gallery ----------------
+
+THUMB_W, THUMB_H = 256, 144  # screenshots are 1366x768
+
+
+class _ThumbSignals(QtCore.QObject):
+    done = QtCore.pyqtSignal(str, QtGui.QImage)  # path, thumbnail (null image on failure)
+
+
+class ThumbJob(QtCore.QRunnable):
+    """Produces one thumbnail off the GUI thread: disk cache, else the scanner's *_thumb
+    file, else the full screenshot decoded at reduced size."""
+
+    def __init__(self, cache, path: str, source: str, signals: _ThumbSignals):
+        super().__init__()
+        self.cache = cache
+        self.path = path
+        self.source = source
+        self.signals = signals
+
+    def run(self):
+        image = QtGui.QImage()
+        try:
+            image = self.cache.load(self.path)
+            if image is None:
+                reader = QtGui.QImageReader(self.source)
+                size = reader.size()
+                if size.isValid():
+                    # decode already scaled where the format allows it (jpeg)
+                    reader.setScaledSize(size.scaled(THUMB_W, THUMB_H, QtCore.Qt.KeepAspectRatio))
+                image = reader.read()
+                if not image.isNull():
+                    if image.width() > THUMB_W or image.height() > THUMB_H:
+                        image = image.scaled(THUMB_W, THUMB_H, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+                    self.cache.store(self.path, image)
+        except OSError:
+            image = QtGui.QImage()
+        self.signals.done.emit(self.path, image)
+
+
+class ThumbnailDiskCache:
+    """Thumbnails as JPEG files named by sha1(path + mtime), shared across GUI sessions.
+
+    A hit touches the file, so eviction (oldest mtime first, down to max_bytes) is LRU.
+    """
+
+    def __init__(self, directory: Path, max_bytes=200 << 20):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            pass  # thumbnails are then only kept in memory
+
+    def key_path(self, path: str) -> Path:
+        st = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()
+        return self.dir / f"{key}.jpg"
+
+    def load(self, path: str):
+        cached = self.key_path(path)
+        image = QtGui.QImage(str(cached))
+        if image.isNull():
+            return None
+        try:
+            os.utime(cached)
+        except OSError:
+            pass
+        return image
+
+    def store(self, path: str, image: QtGui.QImage):
+        image.save(str(self.key_path(path)), "JPG", 85)
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % 200 == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        for f in self.dir.glob("*.jpg"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, f))
+        total = sum(size for _, size, _ in entries)
+        for _, size, f in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                f.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+class _EvictJob(QtCore.QRunnable):
+    def __init__(self, cache: ThumbnailDiskCache):
+        super().__init__()
+        self.cache = cache
+
+    def run(self):
+        self.cache.evict()
+
+
+class ThumbnailProvider(QtCore.QObject):
+    """Pixmaps for the gallery. Only painted (visible) items ask for one; requests are
+    served newest first and old ones are dropped, so fast scrolling does not queue up
+    thumbnails that already left the screen."""
+
+    ready = QtCore.pyqtSignal()
+
+    def __init__(self, cache: ThumbnailDiskCache, memory=300, pending=128, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.pixmaps = OrderedDict()  # path -> QPixmap, in-memory LRU
+        self.memory = memory
+        self.failed = set()
+        self.queue = deque(maxlen=pending)  # (path, source)
+        self.running = set()
+        self.pool = QtCore.QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, min(4, QtCore.QThread.idealThreadCount())))
+        self.signals = _ThumbSignals()
+        self.signals.done.connect(self.on_done)
+        self.pool.start(_EvictJob(cache))
+
+    def get(self, path: str, source: str):
+        """The cached pixmap for path, or None after scheduling it (source is what to decode)."""
+        pix = self.pixmaps.get(path)
+        if pix is not None:
+            self.pixmaps.move_to_end(path)
+            return pix
+        if path not in self.failed and path not in self.running:
+            self.queue.append((path, source))
+            self.pump()
+        return None
+
+    def pump(self):
+        while self.queue and len(self.running) < self.pool.maxThreadCount():
+            path, source = self.queue.pop()
+            if path in self.running or path in self.pixmaps:
+                continue
+            self.running.add(path)
+            self.pool.start(ThumbJob(self.cache, path, source, self.signals))
+
+    def on_done(self, path: str, image: QtGui.QImage):
+        self.running.discard(path)
+        if image.isNull():
+            self.failed.add(path)
+        else:
+            self.pixmaps[path] = QtGui.QPixmap.fromImage(image)
+            while len(self.pixmaps) > self.memory:
+                self.pixmaps.popitem(last=False)
+            self.ready.emit()
+        self.pump()
 
-    def start(self, directory: str, port: int = 0):
-        if port == 0:
-            port = pick_free_port()
+    def clear(self):
+        self.pixmaps.clear()
+        self.failed.clear()
+        self.queue.clear()
 
-        self.proc.setWorkingDirectory(directory)
-        self.proc.start(sys.executable, ["-m", "http.server", str(port)])
-        if self.proc.waitForStarted(1500):
-            self.started.emit(port)
+
+class ThumbnailDelegate(QtWidgets.QStyledItemDelegate):
+    """Gallery cell: thumbnail (placeholder until loaded) and the elided URL below it."""
+
+    def __init__(self, provider: ThumbnailProvider, resolve, parent=None):
+        super().__init__(parent)
+        self.provider = provider
+        self.resolve = resolve  # saved path from the result stream -> file on disk
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(THUMB_W + 16, THUMB_H + 36)
+
+    def paint(self, painter, option, index):
+        r = index.data(ROW_ROLE)
+        if r is None:
+            return
+        rect = option.rect.adjusted(4, 4, -4, -4)
+        painter.save()
+        if option.state & QtWidgets.QStyle.State_Selected:
+            painter.fillRect(rect, QtGui.QColor("#1ea7ff"))
+        box = QtCore.QRect(rect.left() + 4, rect.top() + 4, THUMB_W, THUMB_H)
+        shot = str(self.resolve(r.shot))
+        pix = self.provider.get(shot, str(self.resolve(r.thumb)) if r.thumb else shot)
+        if pix is None:
+            painter.fillRect(box, QtGui.QColor("#132036"))
         else:
-            raise RuntimeError("HTTP server başlatılamadı")
+            target = QtCore.QRect(QtCore.QPoint(0, 0), pix.size())
+            target.moveCenter(box.center())
+            painter.drawPixmap(target, pix)
+        text_rect = QtCore.QRect(rect.left() + 4, box.bottom() + 4, THUMB_W, rect.bottom() - box.bottom() - 4)
+        painter.setPen(QtGui.QColor("#0c1220" if option.state & QtWidgets.QStyle.State_Selected else "#cbd6ea"))
+        painter.drawText(
+            text_rect, QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+            option.fontMetrics.elidedText(r.url, QtCore.Qt.ElideMiddle, THUMB_W),
+        )
+        painter.restore()
 
-    def stop(self):
-        if self.proc.state() != QtCore.QProcess.NotRunning:
-            self.proc.kill()
+
+# ---------------- Log console ----------------
+
+LOG_LEVELS = ["Tümü", "OK", "WARN", "ERR", "WARN + ERR"]
+
+_LOG_TAGS = re.compile(r"^\s*((?:\[[^\]]*\])+)")
+_LEVEL_OF_TAG = {
+    "OK": "OK",
+    "WARN": "WARN", "RTRY": "WARN", "FALL": "WARN",
+    "ERR": "ERR", "FATAL": "ERR", "DEAD": "ERR", "STDERR": "ERR",
+}
+
+
+def log_level(line: str) -> str:
+    """OK / WARN / ERR from the scanner's [Wnn][ERR ] style prefixes, INFO otherwise."""
+    m = _LOG_TAGS.match(line)
+    if m:
+        for tag in reversed(m.group(1)[1:-1].split("][")):
+            level = _LEVEL_OF_TAG.get(tag.strip())
+            if level:
+                return level
+    return "INFO"
+
+
+class LogHighlighter(QtGui.QSyntaxHighlighter):
+    COLORS = {"OK": "#4ade80", "WARN": "#fbbf24", "ERR": "#f87171"}
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.formats = {}
+        for level, color in self.COLORS.items():
+            fmt = QtGui.QTextCharFormat()
+            fmt.setForeground(QtGui.QColor(color))
+            self.formats[level] = fmt
+
+    def highlightBlock(self, text):
+        fmt = self.formats.get(log_level(text))
+        if fmt is not None:
+            m = _LOG_TAGS.match(text)
+            self.setFormat(0, m.end() if m else len(text), fmt)
+
+
+class LogConsole(QtWidgets.QWidget):
+    """Bounded live log view.
+
+    Lines are buffered and appended in one batch per flush interval; the view and the
+    in-memory ring keep at most `cap` lines, every line also goes to the spill file (the
+    full log on disk). The level filter rebuilds the view from the ring.
+    """
+
+    FLUSH_MS = 100
+
+    def __init__(self, cap=5000, parent=None):
+        super().__init__(parent)
+        self.ring = deque(maxlen=cap)  # (level, line)
+        self.pending = []
+        self.partial = {}  # stream name -> unterminated tail of the last chunk
+        self.spill = None
+        self.spill_path = None
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        bar = QtWidgets.QHBoxLayout()
+        self.cmbLevel = QtWidgets.QComboBox()
+        self.cmbLevel.addItems(LOG_LEVELS)
+        self.txtSearch = QtWidgets.QLineEdit()
+        self.txtSearch.setPlaceholderText("Logda ara (Enter: sonraki)")
+        self.spCap = QtWidgets.QSpinBox()
+        self.spCap.setRange(500, 200000)
+        self.spCap.setSingleStep(1000)
+        self.spCap.setValue(cap)
+        self.spCap.setPrefix("Satır: ")
+        self.lblSearch = QtWidgets.QLabel("")
+        bar.addWidget(self.cmbLevel)
+        bar.addWidget(self.txtSearch, 1)
+        bar.addWidget(self.lblSearch)
+        bar.addWidget(self.spCap)
+        layout.addLayout(bar)
+
+        self.view = QtWidgets.QPlainTextEdit()
+        self.view.setReadOnly(True)
+        self.view.setUndoRedoEnabled(False)
+        self.view.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.view.setMaximumBlockCount(cap)
+        self.view.setFont(QtGui.QFont("Consolas", 10))
+        self.highlighter = LogHighlighter(self.view.document())
+        layout.addWidget(self.view)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(self.FLUSH_MS)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+        self.cmbLevel.currentIndexChanged.connect(self.rebuild)
+        self.spCap.editingFinished.connect(lambda: self.set_cap(self.spCap.value()))
+        self.txtSearch.returnPressed.connect(self.find_next)
+
+    def write(self, text: str, stream="gui", prefix=""):
+        """Queues text (possibly a partial chunk of process output) for the next flush."""
+        text = self.partial.pop(stream, "") + text.replace("\r\n", "\n")
+        lines = text.split("\n")
+        if lines[-1]:
+            self.partial[stream] = lines[-1]
+        for line in lines[:-1]:
+            if line.strip():
+                self.pending.append(prefix + line.rstrip())
+
+    def log(self, line: str):
+        self.write(line.rstrip("\n") + "\n")
+
+    def open_spill(self, path: Path):
+        self.close_spill()
+        try:
+            self.spill = open(path, "a", encoding="utf-8", buffering=1 << 16)
+            self.spill_path = path
+        except OSError as e:
+            self.pending.append(f"[GUI][WARN] Log dosyası açılamadı: {e}")
+
+    def close_spill(self):
+        for stream in list(self.partial):
+            self.write("\n", stream)
+        self.flush()
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    def flush(self):
+        if not self.pending:
+            return
+        lines, self.pending = self.pending, []
+        if self.spill is not None:
+            try:
+                self.spill.write("\n".join(lines) + "\n")
+                self.spill.flush()
+            except OSError:
+                self.spill = None
+
+        shown = []
+        for line in lines:
+            level = log_level(line)
+            self.ring.append((level, line))
+            if self.accepts(level):
+                shown.append(line)
+        if not shown:
+            return
+
+        bar = self.view.verticalScrollBar()
+        follow = bar.value() >= bar.maximum() - 2
+        # only the last cap lines can survive the append anyway
+        self.view.appendPlainText("\n".join(shown[-self.ring.maxlen:]))
+        if follow:
+            bar.setValue(bar.maximum())
+
+    def accepts(self, level: str) -> bool:
+        choice = LOG_LEVELS[self.cmbLevel.currentIndex()]
+        if choice == "Tümü":
+            return True
+        if choice == "WARN + ERR":
+            return level in ("WARN", "ERR")
+        return level == choice
+
+    def rebuild(self, *_):
+        self.flush()
+        self.view.setPlainText("\n".join(line for level, line in self.ring if self.accepts(level)))
+        self.view.moveCursor(QtGui.QTextCursor.End)
+
+    def set_cap(self, cap: int):
+        if cap == self.ring.maxlen:
+            return
+        self.ring = deque(self.ring, maxlen=cap)
+        self.view.setMaximumBlockCount(cap)
+        self.rebuild()
+
+    def clear(self):
+        self.ring.clear()
+        self.pending = []
+        self.view.clear()
+
+    def find_next(self):
+        text = self.txtSearch.text()
+        if not text:
+            self.lblSearch.setText("")
+            return
+        if not self.view.find(text):
+            # wrap around
+            self.view.moveCursor(QtGui.QTextCursor.Start)
+            if not self.view.find(text):
+                self.lblSearch.setText("bulunamadı")
+                return
+        self.lblSearch.setText("")
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -58,9 +1225,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.scraper.readyReadStandardError.connect(self.on_proc_stderr)
         self.scraper.finished.connect(self.on_proc_finished)
 
-        self.server = LocalServer(self)
-        self.server.started.connect(self.on_server_started)
-        self._open_after_server = None  # html filename
+        self.server = PreviewServer()
+
+        self.results = ResultsModel(self)
+        self.resultsTail = ResultsTail(self.results, self)
 
         self.build_ui()
         self.apply_theme()
@@ -69,11 +1237,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btnStop.setEnabled(False)
         self.refresh_outputs()
 
-        # Tor status timer
-        self.torTimer = QtCore.QTimer(self)
-        self.torTimer.timeout.connect(self.update_tor_status)
-        self.torTimer.start(1500)
-        self.update_tor_status()
+        # Tor health monitor (background thread)
+        self.torMonitor = TorMonitor(parent=self)
+        self.torMonitor.sampled.connect(self.on_tor_sample)
+        self.torMonitor.stateChanged.connect(self.on_tor_state)
+        self.update_tor_endpoint()
+        self.torMonitor.set_circuit_check(self.chkCircuit.isChecked())
+        self.torMonitor.start()
 
     # ---------------- UI ----------------
 
@@ -152,11 +1322,15 @@ class MainWindow(QtWidgets.QMainWindow):
         self.chkTorCheck = QtWidgets.QCheckBox("Tor Check (check.torproject.org)")
         self.chkTorCheck.setChecked(False)
 
+        self.chkCircuit = QtWidgets.QCheckBox("Devre testi (onion CONNECT)")
+        self.chkCircuit.setChecked(True)
+
         self.btnStart = QtWidgets.QPushButton("Başlat")
         self.btnStop = QtWidgets.QPushButton("Durdur")
 
         self.lblTorStatus = QtWidgets.QLabel("Tor: bilinmiyor")
         self.lblTorStatus.setStyleSheet("font-weight: 600;")
+        self.lblTorHealth = QtWidgets.QLabel("")
 
         r = 0
         gr.addWidget(QtWidgets.QLabel("EXE:"), r, 0, alignment=QtCore.Qt.AlignVCenter)
@@ -179,63 +1353,103 @@ class MainWindow(QtWidgets.QMainWindow):
         r += 1
         gr.addWidget(self.chkTorCheck, r, 0, 1, 3, alignment=QtCore.Qt.AlignVCenter)
         r += 1
+        gr.addWidget(self.chkCircuit, r, 0, 1, 3, alignment=QtCore.Qt.AlignVCenter)
+        r += 1
         rowBtns = QtWidgets.QHBoxLayout()
         rowBtns.addWidget(self.btnStart)
         rowBtns.addWidget(self.btnStop)
         gr.addLayout(rowBtns, r, 0, 1, 3)
         r += 1
         gr.addWidget(self.lblTorStatus, r, 0, 1, 3)
+        r += 1
+        gr.addWidget(self.lblTorHealth, r, 0, 1, 3)
 
         left_layout.addWidget(grpRun)
         left_layout.addStretch(1)
 
-        # RIGHT PANEL (Tabs)
+        # RIGHT PANEL (filter bar + tabs)
+        right = QtWidgets.QWidget()
+        vright = QtWidgets.QVBoxLayout(right)
+        vright.setContentsMargins(0, 0, 0, 0)
+        vright.setSpacing(8)
+
+        self.filterBar = QtWidgets.QWidget()
+        rowFilter = QtWidgets.QHBoxLayout(self.filterBar)
+        rowFilter.setContentsMargins(0, 0, 0, 0)
+        self.txtFilter = QtWidgets.QLineEdit()
+        self.txtFilter.setPlaceholderText("URL içinde ara...")
+        self.cmbState = QtWidgets.QComboBox()
+        self.cmbState.addItems(ResultsFilter.STATES)
+        self.cmbSince = QtWidgets.QComboBox()
+        for label, seconds in (("Tüm zamanlar", 0), ("Son 1 saat", 3600), ("Son 24 saat", 86400), ("Son 7 gün", 7 * 86400)):
+            self.cmbSince.addItem(label, seconds)
+        self.lblCount = QtWidgets.QLabel("0 kayıt")
+        rowFilter.addWidget(self.txtFilter, 1)
+        rowFilter.addWidget(self.cmbState)
+        rowFilter.addWidget(self.cmbSince)
+        rowFilter.addWidget(self.lblCount)
+        vright.addWidget(self.filterBar)
+
         self.tabs = QtWidgets.QTabWidget()
         self.tabs.setDocumentMode(True)
+        vright.addWidget(self.tabs, 1)
+
+        self.htmlProxy = ResultsFilter(parent=self)
+        self.htmlProxy.setSourceModel(self.results)
+        self.shotProxy = ResultsFilter(need_shot=True, parent=self)
+        self.shotProxy.setSourceModel(self.results)
 
         # HTML tab
         self.tabHtml = QtWidgets.QWidget()
         vhtml = QtWidgets.QVBoxLayout(self.tabHtml)
 
-        self.tblHtml = QtWidgets.QTableWidget()
-        self.tblHtml.setColumnCount(3)
-        self.tblHtml.setHorizontalHeaderLabels(["Dosya", "URL", "Aç"])
-        self.tblHtml.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeToContents)
-        self.tblHtml.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
-        self.tblHtml.horizontalHeader().setSectionResizeMode(2, QtWidgets.QHeaderView.ResizeToContents)
-        self.tblHtml.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
-        self.tblHtml.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
-        self.tblHtml.setAlternatingRowColors(True)
-        self.tblHtml.verticalHeader().setVisible(False)
+        self.tblHtml = self.make_results_view(self.htmlProxy, hidden=(COL_SHOT,))
+        self.openDelegate = OpenButtonDelegate(self.tblHtml)
+        self.tblHtml.setItemDelegateForColumn(COL_OPEN, self.openDelegate)
+        self.tblHtml.setMouseTracking(True)
         vhtml.addWidget(self.tblHtml)
+        self.btnPreviewIndex = QtWidgets.QPushButton("Önizleme Dizinini Aç")
+        vhtml.addWidget(self.btnPreviewIndex)
 
         self.tabs.addTab(self.tabHtml, "HTML")
 
         # Screenshots tab
         self.tabShots = QtWidgets.QWidget()
         vshot = QtWidgets.QVBoxLayout(self.tabShots)
-        self.listShots = QtWidgets.QListWidget()
+        cache_root = QtCore.QStandardPaths.writableLocation(QtCore.QStandardPaths.GenericCacheLocation)
+        self.thumbs = ThumbnailProvider(ThumbnailDiskCache(Path(cache_root) / "tor-scraper" / "thumbs"), parent=self)
+        self.lstShots = QtWidgets.QListView()
+        self.lstShots.setViewMode(QtWidgets.QListView.IconMode)
+        self.lstShots.setResizeMode(QtWidgets.QListView.Adjust)
+        self.lstShots.setMovement(QtWidgets.QListView.Static)
+        self.lstShots.setUniformItemSizes(True)  # no per-item size queries on layout
+        self.lstShots.setLayoutMode(QtWidgets.QListView.Batched)
+        self.lstShots.setSpacing(4)
+        self.lstShots.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.lstShots.setModel(self.shotProxy)
+        self.lstShots.setItemDelegate(ThumbnailDelegate(self.thumbs, self.output_file, self.lstShots))
+        self.thumbs.ready.connect(self.lstShots.viewport().update)
         self.btnOpenShot = QtWidgets.QPushButton("Seçileni Aç")
-        vshot.addWidget(self.listShots)
+        vshot.addWidget(self.lstShots)
         vshot.addWidget(self.btnOpenShot)
         self.tabs.addTab(self.tabShots, "Screenshots")
 
         # Logs tab
         self.tabLogs = QtWidgets.QWidget()
         vlog = QtWidgets.QVBoxLayout(self.tabLogs)
-        self.txtLog = QtWidgets.QTextEdit()
-        self.txtLog.setReadOnly(True)
-        self.txtLog.setFont(QtGui.QFont("Consolas", 10))
-        vlog.addWidget(self.txtLog)
+        self.console = LogConsole(parent=self.tabLogs)
+        vlog.addWidget(self.console)
 
         rowLogBtns = QtWidgets.QHBoxLayout()
         self.btnOpenReport = QtWidgets.QPushButton("scan_report.log Aç")
         self.btnOpenSummary = QtWidgets.QPushButton("scan_summary.log Aç")
         self.btnOpenJson = QtWidgets.QPushButton("scan_results.json Aç")
+        self.btnOpenConsole = QtWidgets.QPushButton("Tam Log Aç")
         self.btnClearLogView = QtWidgets.QPushButton("Ekranı Temizle")
         rowLogBtns.addWidget(self.btnOpenReport)
         rowLogBtns.addWidget(self.btnOpenSummary)
         rowLogBtns.addWidget(self.btnOpenJson)
+        rowLogBtns.addWidget(self.btnOpenConsole)
         rowLogBtns.addStretch(1)
         rowLogBtns.addWidget(self.btnClearLogView)
         vlog.addLayout(rowLogBtns)
@@ -244,7 +1458,30 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # Compose layout
         root.addWidget(left)
-        root.addWidget(self.tabs, 1)
+        root.addWidget(right, 1)
+
+    def make_results_view(self, proxy, hidden=()):
+        view = QtWidgets.QTableView()
+        view.setModel(proxy)
+        view.setSortingEnabled(True)
+        view.sortByColumn(COL_TIME, QtCore.Qt.DescendingOrder)
+        view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        view.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        view.setAlternatingRowColors(True)
+        view.setWordWrap(False)
+        view.verticalHeader().setVisible(False)
+        # fixed row heights and column widths: nothing is measured per row
+        view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        view.verticalHeader().setDefaultSectionSize(32)
+        header = view.horizontalHeader()
+        header.setSectionResizeMode(QtWidgets.QHeaderView.Interactive)
+        header.setSectionResizeMode(COL_URL, QtWidgets.QHeaderView.Stretch)
+        for col, width in ((COL_STATE, 120), (COL_HTTP, 60), (COL_TIME, 170), (COL_HTML, 180), (COL_SHOT, 260), (COL_OPEN, 70)):
+            header.resizeSection(col, width)
+        for col in hidden:
+            view.setColumnHidden(col, True)
+        return view
 
     def apply_theme(self):
         base_font = QtGui.QFont("Segoe UI", 10)
@@ -330,22 +1567,30 @@ class MainWindow(QtWidgets.QMainWindow):
             color: #6f7c94;
             border-color: #2a3549;
         }
-        QListWidget, QTextEdit, QTableWidget {
+        QListWidget, QTextEdit, QTableView, QComboBox {
             background-color: #101a2b;
             border: 1px solid #2b3c55;
             border-radius: 10px;
             color: #e9f0ff;
         }
-        QTableWidget {
+        QTableView {
             alternate-background-color: #0f1829;
+            margin-top: 0px;
+            padding: 0px;
         }
-        QTableWidget::item {
+        QTableView::item {
             padding: 6px 8px;
         }
-        QTableWidget::item:selected, QListWidget::item:selected {
+        QTableView::item:selected, QListWidget::item:selected {
             background-color: #1ea7ff;
             color: #0c1220;
         }
+        QHeaderView {
+            margin-top: 0px;
+            padding: 0px;
+            border: 0px;
+            border-radius: 0px;
+        }
         QHeaderView::section {
             background-color: #131f33;
             color: #cbd6ea;
@@ -401,32 +1646,83 @@ class MainWindow(QtWidgets.QMainWindow):
         self.btnBrowseExe.clicked.connect(self.browse_exe)
         self.btnBrowseOut.clicked.connect(self.browse_out)
 
+        self.txtProxy.editingFinished.connect(self.update_tor_endpoint)
+        self.chkCircuit.toggled.connect(lambda on: self.torMonitor.set_circuit_check(on))
+
         self.btnStart.clicked.connect(self.start_scan)
         self.btnStop.clicked.connect(self.stop_scan)
 
         self.btnOpenShot.clicked.connect(self.open_selected_shot)
+        self.lstShots.doubleClicked.connect(self.open_selected_shot)
+        self.openDelegate.clicked.connect(self.open_result_html)
+        self.btnPreviewIndex.clicked.connect(lambda: self.open_preview("/"))
+        self.tblHtml.doubleClicked.connect(self.open_result_html)
+
+        self._filterTimer = QtCore.QTimer(self)
+        self._filterTimer.setSingleShot(True)
+        self._filterTimer.setInterval(200)
+        self._filterTimer.timeout.connect(self.apply_filter)
+        self.txtFilter.textChanged.connect(self._filterTimer.start)
+        self.cmbState.currentIndexChanged.connect(self.apply_filter)
+        self.cmbSince.currentIndexChanged.connect(self.apply_filter)
+        self.txtOutDir.editingFinished.connect(self.refresh_outputs)
+        self.tabs.currentChanged.connect(lambda i: self.filterBar.setVisible(self.tabs.widget(i) is not self.tabLogs))
+        for proxy in (self.htmlProxy, self.shotProxy):
+            proxy.rowsInserted.connect(self.update_count)
+            proxy.rowsRemoved.connect(self.update_count)
+            proxy.modelReset.connect(self.update_count)
+            proxy.layoutChanged.connect(self.update_count)
+        self.tabs.currentChanged.connect(self.update_count)
 
         self.btnOpenReport.clicked.connect(lambda: self.open_out_file("scan_report.log"))
         self.btnOpenSummary.clicked.connect(lambda: self.open_out_file("scan_summary.log"))
         self.btnOpenJson.clicked.connect(lambda: self.open_out_file("scan_results.json"))
-        self.btnClearLogView.clicked.connect(self.txtLog.clear)
+        self.btnOpenConsole.clicked.connect(lambda: self.open_out_file("gui_console.log"))
+        self.btnClearLogView.clicked.connect(self.console.clear)
+
+    def closeEvent(self, event):
+        self.torMonitor.stop()
+        self.console.close_spill()
+        self.thumbs.clear()
+        self.thumbs.pool.waitForDone(2000)
+        self.server.stop()
+        super().closeEvent(event)
 
     # ---------------- Helpers ----------------
 
     def log(self, s: str):
-        self.txtLog.append(s.rstrip())
+        self.console.log(s)
+
+    def update_tor_endpoint(self):
+        self.torMonitor.set_endpoint(*parse_proxy(self.txtProxy.text().strip()))
+
+    def on_tor_state(self, ok: bool):
+        endpoint = "%s:%d" % parse_proxy(self.txtProxy.text().strip())
+        self.log(f"[GUI] Tor {'erişilebilir' if ok else 'erişilemiyor'} ({endpoint})")
+
+    def on_tor_sample(self, h: dict):
+        self.lblTorStatus.setText(f"Tor: {'AÇIK ✅' if h['ok'] else 'KAPALI ❌'} ({h['endpoint']})")
+
+        parts = []
+        if h["handshake_ms"] is not None:
+            parts.append(f"SOCKS {h['handshake_ms']:.0f} ms (p50 {h['handshake_p50']:.0f})")
+        parts.append(f"%{h['availability'] * 100:.0f} erişilebilir")
+        if h["circuit_ok"] is not None:
+            parts.append(f"devre {h['circuit_ms'] / 1000:.1f} s" if h["circuit_ok"] else "devre YOK")
+        spark = "".join(
+            "·" if ms is None else "▁▂▃▄▅▆▇█"[min(7, int(ms / max(h["handshake_p50"] or 1, 1) * 3))]
+            for ms in h["history"]
+        )
+        self.lblTorHealth.setText(" | ".join(parts) + "\n" + spark)
 
-    def update_tor_status(self):
-        proxy = self.txtProxy.text().strip()
-        host, port = "127.0.0.1", 9150
-        if ":" in proxy:
-            host, p = proxy.split(":", 1)
-            try:
-                port = int(p)
-            except ValueError:
-                port = 9150
-        ok = tor_port_open(host, port)
-        self.lblTorStatus.setText(f"Tor: {'AÇIK ✅' if ok else 'KAPALI ❌'} ({host}:{port})")
+        tip = [f"Son {h['window_s']:.0f} s: %{h['availability'] * 100:.1f} erişilebilir"]
+        if h["circuit_availability"] is not None:
+            tip.append(f"Devre (onion CONNECT): %{h['circuit_availability'] * 100:.0f} başarılı")
+        if h["error"]:
+            tip.append("Son hata: " + h["error"])
+        if h["circuit_error"]:
+            tip.append("Devre hatası: " + h["circuit_error"])
+        self.lblTorHealth.setToolTip("\n".join(tip))
 
     def add_url(self):
         url = self.txtUrl.text().strip()
@@ -493,6 +1789,9 @@ class MainWindow(QtWidgets.QMainWindow):
             "-screenshot=" + ("true" if take_shot else "false"),
         ]
 
+        # the view keeps only the last lines, the full scan output goes to gui_console.log
+        self.console.open_spill(out_dir / "gui_console.log")
+        self.log(f"[GUI] ==== {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ====")
         self.log(f"[GUI] Çalıştırılıyor: {exe} {' '.join(args)}")
         self.btnStart.setEnabled(False)
         self.btnStop.setEnabled(True)
@@ -504,6 +1803,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         if not self.scraper.waitForStarted(1500):
             self.log("[GUI][ERR] Process başlatılamadı.")
+            self.console.close_spill()
             self.btnStart.setEnabled(True)
             self.btnStop.setEnabled(False)
 
@@ -514,16 +1814,18 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def on_proc_stdout(self):
         data = bytes(self.scraper.readAllStandardOutput()).decode(errors="ignore")
-        if data.strip():
-            self.log(data)
+        if data:
+            self.console.write(data, "stdout")
+            self.resultsTail.schedule()
 
     def on_proc_stderr(self):
         data = bytes(self.scraper.readAllStandardError()).decode(errors="ignore")
-        if data.strip():
-            self.log("[STDERR] " + data)
+        if data:
+            self.console.write(data, "stderr", prefix="[STDERR] ")
 
     def on_proc_finished(self):
         self.log("[GUI] Tarama bitti. Dosyalar yenileniyor...")
+        self.console.close_spill()
         self.btnStart.setEnabled(True)
         self.btnStop.setEnabled(False)
         self.refresh_outputs()
@@ -531,52 +1833,38 @@ class MainWindow(QtWidgets.QMainWindow):
     # ---------------- Outputs ----------------
 
     def refresh_outputs(self):
-        out_dir = Path(self.txtOutDir.text().strip())
-        html_dir = out_dir / "html"
-        shot_dir = out_dir / "screenshots"
-        json_path = out_dir / "scan_results.json"
-
-        results = []
-        if json_path.exists():
-            try:
-                results = json.loads(json_path.read_text(encoding="utf-8"))
-            except Exception as e:
-                self.log(f"[GUI][WARN] JSON okunamadı: {e}")
-
-        url_by_html = {}
-        for r in results:
-            saved = r.get("saved_html")
-            if saved:
-                url_by_html[Path(saved).name] = r.get("normalized_url", r.get("url", ""))
-
-        # Fill HTML table
-        self.tblHtml.setRowCount(0)
-        if html_dir.exists():
-            files = sorted(html_dir.glob("*.html"), key=lambda p: p.stat().st_mtime, reverse=True)
-            for f in files:
-                self.add_html_row(f, url_by_html.get(f.name, ""))
-
-        # Screenshots list
-        self.listShots.clear()
-        if shot_dir.exists():
-            shots = sorted(shot_dir.glob("*.png"), key=lambda p: p.stat().st_mtime, reverse=True)
-            for p in shots:
-                self.listShots.addItem(str(p))
-
-    def add_html_row(self, html_path: Path, url: str):
-        row = self.tblHtml.rowCount()
-        self.tblHtml.insertRow(row)
-        self.tblHtml.setItem(row, 0, QtWidgets.QTableWidgetItem(html_path.name))
-        self.tblHtml.setItem(row, 1, QtWidgets.QTableWidgetItem(url))
-
-        btn_serve = QtWidgets.QPushButton("Aç")
-        btn_serve.clicked.connect(lambda _, p=str(html_path): self.serve_and_open(p))
-        self.tblHtml.setCellWidget(row, 2, btn_serve)
-
-    def open_selected_shot(self):
-        item = self.listShots.currentItem()
-        if item:
-            self.open_file(item.text())
+        # incremental: only lines appended to the result stream since the last call are read
+        self.resultsTail.follow(Path(self.txtOutDir.text().strip()))
+        self.thumbs.failed.clear()  # screenshots may have been written since
+
+    def apply_filter(self):
+        since = ""
+        seconds = self.cmbSince.currentData()
+        if seconds:
+            since = (datetime.now(timezone.utc) - timedelta(seconds=seconds)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for proxy in (self.htmlProxy, self.shotProxy):
+            proxy.set_filter(self.txtFilter.text(), self.cmbState.currentIndex(), since)
+        self.update_count()
+
+    def update_count(self, *_):
+        proxy = self.shotProxy if self.tabs.currentWidget() is self.tabShots else self.htmlProxy
+        self.lblCount.setText(f"{proxy.rowCount()} / {self.results.rowCount()} kayıt")
+
+    def output_file(self, saved: str) -> Path:
+        # the same <out>/<dir>/<name> mapping the preview server uses
+        p = Path(saved)
+        return Path(self.txtOutDir.text().strip()) / p.parent.name / p.name
+
+    def open_result_html(self, index: QtCore.QModelIndex):
+        r = index.data(ROW_ROLE)
+        if r is not None and r.html:
+            self.serve_and_open(r.html)
+
+    def open_selected_shot(self, *_):
+        index = self.lstShots.currentIndex()
+        r = index.data(ROW_ROLE) if index.isValid() else None
+        if r is not None and r.shot:
+            self.open_preview(preview_url_path(r.shot))
 
     def open_out_file(self, name: str):
         out_dir = Path(self.txtOutDir.text().strip())
@@ -592,29 +1880,22 @@ class MainWindow(QtWidgets.QMainWindow):
         except Exception:
             webbrowser.open("file:///" + str(Path(path).resolve()).replace("\\", "/"))
 
-    # ------------- Live server equivalent -------------
+    # ------------- Preview server -------------
 
-    def serve_and_open(self, html_path: str):
+    def open_preview(self, url_path: str):
         out_dir = Path(self.txtOutDir.text().strip())
-        html_dir = out_dir / "html"
-        if not html_dir.exists():
-            QtWidgets.QMessageBox.warning(self, "Uyarı", "HTML klasörü bulunamadı.")
+        if not out_dir.exists():
+            QtWidgets.QMessageBox.warning(self, "Uyarı", "Output klasörü bulunamadı.")
             return
-
-        self._open_after_server = Path(html_path).name
-
         try:
-            self.server.stop()
-            self.server.start(str(html_dir), port=0)
-        except Exception as e:
+            base = self.server.serve(out_dir)
+        except OSError as e:
             QtWidgets.QMessageBox.critical(self, "Hata", f"Server başlatılamadı:\n{e}")
-
-    def on_server_started(self, port: int):
-        if not self._open_after_server:
             return
-        url = f"http://127.0.0.1:{port}/{self._open_after_server}"
-        self.log(f"[GUI] Local server: {url}")
-        webbrowser.open(url)
+        webbrowser.open(base + url_path)
+
+    def serve_and_open(self, html_path: str):
+        self.open_preview(preview_url_path(html_path))
 
 
 def main():
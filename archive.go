@@ -0,0 +1,213 @@
+// archive.go
+package main
+
+import (
+	"bufio"
+	"compress/gzip"
+	"crypto/sha256"
+	"encoding/hex"
+	"encoding/json"
+	"io"
+	"os"
+	"path/filepath"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// HTML Archive (content-addressed, streamed)
+// -------------------------
+
+// htmlArchive stores response bodies once per content: a body is streamed to a temp
+// file while it is hashed, then renamed to <sha256>.html (or .html.gz). A page that did
+// not change since the last scan hits the existing blob and costs no disk space, so
+// repeated scans only grow the archive by changed pages. Bodies are capped at maxBody
+// bytes; longer ones are stored truncated. Every store appends a line to the manifest
+// (url, time, hash) so the history of a URL can be rebuilt.
+type htmlArchive struct {
+	dir      string
+	maxBody  int64
+	compress bool
+
+	mu       sync.Mutex
+	manifest *os.File
+	mw       *bufio.Writer
+}
+
+// archivedBody describes one stored body.
+type archivedBody struct {
+	Path      string
+	SHA256    string
+	Size      int64 // uncompressed bytes stored
+	Truncated bool
+	New       bool // false when an identical blob already existed
+
+	NotModified bool   // server answered 304, the blob is the one of a previous scan
+	Screenshot  string // screenshot of that previous scan, if any
+}
+
+type manifestEntry struct {
+	URL          string `json:"url"`
+	TimestampUTC string `json:"timestamp_utc"`
+	SHA256       string `json:"sha256"`
+	Size         int64  `json:"size"`
+	Path         string `json:"path"`
+	Truncated    bool   `json:"truncated,omitempty"`
+	New          bool   `json:"new,omitempty"`
+}
+
+func openHTMLArchive(dir, manifestPath string, maxBody int64, compress bool) (*htmlArchive, error) {
+	if err := os.MkdirAll(dir, 0755); err != nil {
+		return nil, err
+	}
+	f, err := os.OpenFile(manifestPath, os.O_CREATE|os.O_WRONLY|os.O_APPEND, 0644)
+	if err != nil {
+		return nil, err
+	}
+	return &htmlArchive{
+		dir:      dir,
+		maxBody:  maxBody,
+		compress: compress,
+		manifest: f,
+		mw:       bufio.NewWriter(f),
+	}, nil
+}
+
+// Store streams r into the archive and records it in the manifest under url.
+func (a *htmlArchive) Store(url string, r io.Reader) (archivedBody, error) {
+	var out archivedBody
+
+	tmp, err := os.CreateTemp(a.dir, ".part-*")
+	if err != nil {
+		return out, err
+	}
+	defer func() {
+		if tmp != nil {
+			tmp.Close()
+			os.Remove(tmp.Name())
+		}
+	}()
+
+	var sink io.Writer = tmp
+	var gz *gzip.Writer
+	if a.compress {
+		gz, _ = gzip.NewWriterLevel(tmp, gzip.BestSpeed)
+		sink = gz
+	}
+	h := sha256.New()
+	bw := bufio.NewWriterSize(io.MultiWriter(h, sink), 32*1024)
+
+	src := r
+	if a.maxBody > 0 {
+		src = io.LimitReader(r, a.maxBody)
+	}
+	n, err := io.Copy(bw, src)
+	if err != nil {
+		return out, err
+	}
+	if a.maxBody > 0 && n == a.maxBody {
+		var one [1]byte
+		if m, _ := io.ReadFull(r, one[:]); m > 0 {
+			out.Truncated = true
+		}
+	}
+	if err := bw.Flush(); err != nil {
+		return out, err
+	}
+	if gz != nil {
+		if err := gz.Close(); err != nil {
+			return out, err
+		}
+	}
+	if err := tmp.Close(); err != nil {
+		return out, err
+	}
+
+	out.SHA256 = hex.EncodeToString(h.Sum(nil))
+	out.Size = n
+	ext := ".html"
+	if a.compress {
+		ext = ".html.gz"
+	}
+	out.Path = filepath.Join(a.dir, out.SHA256+ext)
+
+	if _, err := os.Stat(out.Path); err == nil {
+		os.Remove(tmp.Name())
+	} else {
+		if err := os.Rename(tmp.Name(), out.Path); err != nil {
+			return out, err
+		}
+		out.New = true
+	}
+	tmp = nil
+
+	a.record(manifestEntry{
+		URL:          url,
+		TimestampUTC: time.Now().UTC().Format(time.RFC3339),
+		SHA256:       out.SHA256,
+		Size:         out.Size,
+		Path:         out.Path,
+		Truncated:    out.Truncated,
+		New:          out.New,
+	})
+	return out, nil
+}
+
+func (a *htmlArchive) record(e manifestEntry) {
+	line, err := json.Marshal(e)
+	if err != nil {
+		return
+	}
+	a.mu.Lock()
+	defer a.mu.Unlock()
+	_, _ = a.mw.Write(append(line, '\n'))
+}
+
+// Close flushes the manifest.
+func (a *htmlArchive) Close() error {
+	a.mu.Lock()
+	defer a.mu.Unlock()
+	err := a.mw.Flush()
+	if cerr := a.manifest.Close(); err == nil {
+		err = cerr
+	}
+	return err
+}
+
+// readArchivedHTML returns the (decompressed) content of an archived body.
+func readArchivedHTML(path string) ([]byte, error) {
+	r, err := openArchivedHTML(path)
+	if err != nil {
+		return nil, err
+	}
+	defer r.Close()
+	return io.ReadAll(r)
+}
+
+// openArchivedHTML opens an archived body for streaming, decompressing .gz blobs.
+func openArchivedHTML(path string) (io.ReadCloser, error) {
+	f, err := os.Open(path)
+	if err != nil {
+		return nil, err
+	}
+	if !strings.HasSuffix(path, ".gz") {
+		return f, nil
+	}
+	gz, err := gzip.NewReader(f)
+	if err != nil {
+		f.Close()
+		return nil, err
+	}
+	return gzipFile{gz, f}, nil
+}
+
+type gzipFile struct {
+	*gzip.Reader
+	f *os.File
+}
+
+func (g gzipFile) Close() error {
+	g.Reader.Close()
+	return g.f.Close()
+}
@@ -0,0 +1,286 @@
+// bench.go
+package main
+
+import (
+	"bufio"
+	"compress/gzip"
+	"fmt"
+	"io"
+	"math/rand"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"path/filepath"
+	"runtime"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// -------------------------
+// Offline Benchmarks (-bench)
+// -------------------------
+
+func runBenchmark(cfg Config) int {
+	switch cfg.Bench {
+	case "scan":
+		return benchScan(cfg)
+	case "screenshot":
+		return benchScreenshots(cfg)
+	case "ingest":
+		return benchIngest(cfg)
+	default:
+		fmt.Println("[FATAL] unknown benchmark:", cfg.Bench)
+		return 1
+	}
+}
+
+// benchScreenshots renders -bench-pages local pages with -workers concurrency, once with a
+// fresh Chrome per page (captureScreenshotTor) and once through the browserPool.
+// Chrome never proxies loopback addresses, so no Tor is needed.
+func benchScreenshots(cfg Config) int {
+	srv := httptest.NewServer(http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
+		w.Header().Set("Content-Type", "text/html; charset=utf-8")
+		fmt.Fprintf(w, "<html><head><title>%s</title></head><body><h1>bench %s</h1>", r.URL.Path, r.URL.Path)
+		for i := 0; i < 200; i++ {
+			fmt.Fprintf(w, "<p>paragraph %d lorem ipsum dolor sit amet</p>", i)
+		}
+		fmt.Fprint(w, "</body></html>")
+	}))
+	defer srv.Close()
+
+	dir, err := os.MkdirTemp("", "tor-scraper-bench-")
+	if err != nil {
+		fmt.Println("[FATAL] bench temp dir:", err)
+		return 1
+	}
+	defer os.RemoveAll(dir)
+
+	fmt.Printf("[BENCH] screenshots: %d pages, %d workers, %d browsers x %d tabs\n",
+		cfg.BenchPages, cfg.Workers, cfg.Browsers, cfg.BrowserTabs)
+
+	perCall := func(url, out string) error {
+		return captureScreenshotTor(url, out, cfg.ProxyAddr, cfg.ScreenshotTimeout, cfg.ScreenshotWaitMS)
+	}
+	benchRenderRun("per-call launch", cfg, srv.URL, dir, perCall)
+
+	pool := newBrowserPool([]string{cfg.ProxyAddr}, cfg.Browsers, cfg.BrowserTabs, cfg.BrowserRecycle)
+	pooled := func(url, out string) error {
+		return pool.Capture(url, nil, out, screenshotOptions{Timeout: cfg.ScreenshotTimeout, WaitMS: cfg.ScreenshotWaitMS})
+	}
+	benchRenderRun("browser pool", cfg, srv.URL, dir, pooled)
+	_, restarts := pool.Stats()
+	pool.Close()
+	fmt.Printf("[BENCH] browser pool restarts: %d\n", restarts)
+	return 0
+}
+
+func benchRenderRun(name string, cfg Config, baseURL, dir string, render func(url, out string) error) {
+	sampler := startRSSSampler(200 * time.Millisecond)
+
+	var ok, failed int64
+	jobs := make(chan int)
+	var wg sync.WaitGroup
+	start := time.Now()
+	for w := 0; w < cfg.Workers; w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			for i := range jobs {
+				url := fmt.Sprintf("%s/page/%d", baseURL, i)
+				out := filepath.Join(dir, fmt.Sprintf("%s_%d.png", safeFileNameFromURL(name), i))
+				if err := render(url, out); err != nil {
+					atomic.AddInt64(&failed, 1)
+					fmt.Printf("[BENCH][ERR ] %s %s -> %v\n", name, url, err)
+					continue
+				}
+				atomic.AddInt64(&ok, 1)
+			}
+		}()
+	}
+	for i := 0; i < cfg.BenchPages; i++ {
+		jobs <- i
+	}
+	close(jobs)
+	wg.Wait()
+	elapsed := time.Since(start)
+	peak, haveRSS := sampler.Stop()
+
+	perMin := float64(ok) / elapsed.Minutes()
+	rss := "n/a"
+	if haveRSS {
+		rss = formatBytes(peak)
+	}
+	fmt.Printf("[BENCH] %-16s ok=%d failed=%d in %s -> %.1f pages/min | peak RSS (incl. Chrome) %s\n",
+		name, ok, failed, elapsed.Round(time.Millisecond), perMin, rss)
+}
+
+// benchIngest writes a synthetic target list of -bench-lines lines (plain and gzip) and
+// streams it through openTargets into -workers consumers, reporting time to the first
+// request, total time and peak RSS. RSS should stay flat regardless of the line count.
+func benchIngest(cfg Config) int {
+	dir, err := os.MkdirTemp("", "tor-scraper-bench-")
+	if err != nil {
+		fmt.Println("[FATAL] bench temp dir:", err)
+		return 1
+	}
+	defer os.RemoveAll(dir)
+
+	plain := filepath.Join(dir, "targets.yaml")
+	gz := filepath.Join(dir, "targets.yaml.gz")
+	fmt.Printf("[BENCH] ingest: generating %d lines...\n", cfg.BenchLines)
+	if err := writeSyntheticTargets(plain, cfg.BenchLines, false); err != nil {
+		fmt.Println("[FATAL] bench targets:", err)
+		return 1
+	}
+	if err := writeSyntheticTargets(gz, cfg.BenchLines, true); err != nil {
+		fmt.Println("[FATAL] bench targets:", err)
+		return 1
+	}
+
+	for _, path := range []string{plain, gz} {
+		runtime.GC()
+		sampler := startRSSSampler(100 * time.Millisecond)
+		start := time.Now()
+
+		src, err := openTargets(path)
+		if err != nil {
+			sampler.Stop()
+			fmt.Println("[FATAL] bench open:", err)
+			return 1
+		}
+
+		jobs := make(chan string)
+		var first time.Duration
+		var firstOnce sync.Once
+		var consumed int64
+		var wg sync.WaitGroup
+		for w := 0; w < cfg.Workers; w++ {
+			wg.Add(1)
+			go func() {
+				defer wg.Done()
+				for u := range jobs {
+					firstOnce.Do(func() { first = time.Since(start) })
+					_ = normalizeURL(u)
+					atomic.AddInt64(&consumed, 1)
+				}
+			}()
+		}
+		for {
+			t, ok := src.Next()
+			if !ok {
+				break
+			}
+			jobs <- t
+		}
+		close(jobs)
+		wg.Wait()
+		readErr := src.Err()
+		src.Close()
+
+		elapsed := time.Since(start)
+		peak, haveRSS := sampler.Stop()
+		rss := "n/a"
+		if haveRSS {
+			rss = formatBytes(peak)
+		}
+		st, _ := os.Stat(path)
+		fmt.Printf("[BENCH] %-16s file=%s targets=%d first request after %s | total %s | peak RSS %s\n",
+			filepath.Base(path), formatBytes(uint64(st.Size())), consumed, first.Round(time.Microsecond), elapsed.Round(time.Millisecond), rss)
+		if readErr != nil {
+			fmt.Println("[BENCH][ERR ] read:", readErr)
+		}
+	}
+	return 0
+}
+
+func writeSyntheticTargets(path string, lines int, compress bool) error {
+	f, err := os.Create(path)
+	if err != nil {
+		return err
+	}
+	defer f.Close()
+
+	var w io.Writer = f
+	var gzw *gzip.Writer
+	if compress {
+		gzw = gzip.NewWriter(f)
+		w = gzw
+	}
+	bw := bufio.NewWriterSize(w, 1<<20)
+
+	const alphabet = "abcdefghijklmnopqrstuvwxyz234567"
+	rng := rand.New(rand.NewSource(1))
+	host := make([]byte, 56)
+	for i := 0; i < lines; i++ {
+		for j := range host {
+			host[j] = alphabet[rng.Intn(len(alphabet))]
+		}
+		fmt.Fprintf(bw, "- http://%s.onion/page/%d\n", host, i)
+	}
+	if err := bw.Flush(); err != nil {
+		return err
+	}
+	if gzw != nil {
+		if err := gzw.Close(); err != nil {
+			return err
+		}
+	}
+	return f.Close()
+}
+
+// rssSampler polls processTreeRSS and remembers the highest value seen. It also keeps
+// the highest goroutine count.
+type rssSampler struct {
+	stop       chan struct{}
+	done       chan struct{}
+	peak       uint64
+	ok         bool
+	goroutines int
+}
+
+func startRSSSampler(every time.Duration) *rssSampler {
+	s := &rssSampler{stop: make(chan struct{}), done: make(chan struct{})}
+	go func() {
+		defer close(s.done)
+		t := time.NewTicker(every)
+		defer t.Stop()
+		for {
+			if v, ok := processTreeRSS(); ok {
+				s.ok = true
+				if v > s.peak {
+					s.peak = v
+				}
+			}
+			if n := runtime.NumGoroutine(); n > s.goroutines {
+				s.goroutines = n
+			}
+			select {
+			case <-s.stop:
+				return
+			case <-t.C:
+			}
+		}
+	}()
+	return s
+}
+
+// Stop ends sampling and returns (peak bytes, supported on this OS).
+func (s *rssSampler) Stop() (uint64, bool) {
+	close(s.stop)
+	<-s.done
+	return s.peak, s.ok
+}
+
+func formatBytes(n uint64) string {
+	const unit = 1024
+	if n < unit {
+		return fmt.Sprintf("%d B", n)
+	}
+	div, exp := uint64(unit), 0
+	for v := n / unit; v >= unit; v /= unit {
+		div *= unit
+		exp++
+	}
+	return fmt.Sprintf("%.1f %ciB", float64(n)/float64(div), "KMGTPE"[exp])
+}
@@ -0,0 +1,501 @@
+// benchscan.go
+package main
+
+import (
+	"bufio"
+	"bytes"
+	"crypto/sha3"
+	"encoding/binary"
+	"fmt"
+	"io"
+	"log"
+	"math/rand"
+	"net"
+	"net/http"
+	"net/http/httptest"
+	"os"
+	"path/filepath"
+	"runtime"
+	"sort"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Scan Benchmark (-bench scan)
+// -------------------------
+
+// benchScan measures the whole scan pipeline (runScanPool) without Tor. An in-process
+// SOCKS5 server stands in for Tor: every CONNECT waits a jittered -bench-latency (the
+// descriptor lookup + rendezvous) and a share of the hosts (-bench-fail) answers with
+// Tor's onion errors 0xF0/0xF1. Behind it two local servers play the onion sites: fast
+// pages, pages whose body trickles in over -bench-slow-body, large pages, and https
+// sites with a self-signed certificate (port 443, which exercises -http-fallback).
+//
+// The same synthetic target list (-bench-pages valid v3 onion URLs) is scanned once per
+// worker count in -bench-workers, with screenshots off and, with -screenshot, on.
+// Every run reports URLs/sec, fetch latency percentiles, peak RSS and peak goroutines.
+// The scan's own console output is discarded while a run is in progress.
+func benchScan(cfg Config) int {
+	counts, err := parseBenchWorkers(cfg.BenchWorkers)
+	if err != nil {
+		fmt.Println("[FATAL] -bench-workers:", err)
+		return 1
+	}
+
+	sites := newBenchSites(cfg.BenchPages, cfg.BenchFail, cfg.BenchSlowBody)
+	plain := httptest.NewServer(sites)
+	defer plain.Close()
+	secure := httptest.NewUnstartedServer(sites)
+	secure.Config.ErrorLog = log.New(io.Discard, "", 0) // rejected self-signed certs are expected
+	secure.StartTLS()
+	defer secure.Close()
+
+	socks, err := startBenchSOCKS(sites, cfg.BenchLatency, plain.Listener.Addr().String(), secure.Listener.Addr().String())
+	if err != nil {
+		fmt.Println("[FATAL] bench socks:", err)
+		return 1
+	}
+	defer socks.Close()
+
+	dir, err := os.MkdirTemp("", "tor-scraper-bench-")
+	if err != nil {
+		fmt.Println("[FATAL] bench temp dir:", err)
+		return 1
+	}
+	defer os.RemoveAll(dir)
+
+	fmt.Printf("[BENCH] scan: %d targets (%s) | connect latency %s | slow body %s | mode %s | retries %d\n",
+		len(sites.targets), sites.Mix(), cfg.BenchLatency, cfg.BenchSlowBody, cfg.Mode, cfg.Retries)
+
+	shotModes := []bool{false}
+	if cfg.TakeScreenshots {
+		shotModes = append(shotModes, true)
+	}
+	for _, workers := range counts {
+		for _, shots := range shotModes {
+			run := cfg
+			run.Workers = workers
+			run.TakeScreenshots = shots
+			run.ProxyAddr = socks.Addr()
+			run.OutDir = filepath.Join(dir, fmt.Sprintf("w%d_shots%v", workers, shots))
+			if err := benchScanRun(run, sites.targets); err != nil {
+				fmt.Println("[FATAL] bench run:", err)
+				return 1
+			}
+			plain.CloseClientConnections()
+			secure.CloseClientConnections()
+		}
+	}
+	return 0
+}
+
+func benchScanRun(cfg Config, targets []string) error {
+	htmlDir := filepath.Join(cfg.OutDir, "html")
+	shotDir := filepath.Join(cfg.OutDir, "screenshots")
+	for _, d := range []string{htmlDir, shotDir} {
+		if err := os.MkdirAll(d, 0755); err != nil {
+			return err
+		}
+	}
+	archive, err := openHTMLArchive(htmlDir, filepath.Join(cfg.OutDir, "html_manifest.jsonl"), cfg.MaxBody, cfg.HTMLCompress)
+	if err != nil {
+		return err
+	}
+	proxies, err := torProxyPool(cfg)
+	if err != nil {
+		return err
+	}
+	var shots *browserPool
+	if cfg.TakeScreenshots {
+		shots = newBrowserPool(proxies.Addrs(), cfg.Browsers, cfg.BrowserTabs, cfg.BrowserRecycle)
+	}
+
+	i := 0
+	next := func() (scanTarget, bool) {
+		if i >= len(targets) {
+			return scanTarget{}, false
+		}
+		raw := targets[i]
+		i++
+		return scanTarget{Raw: raw, URL: normalizeURL(raw)}, true
+	}
+	var latencies []int64
+	var ok, failed, rendered int
+	classes := map[string]int{}
+	emit := func(r ScanResult) {
+		if !r.Active {
+			failed++
+			classes[r.ErrorClass]++
+			return
+		}
+		ok++
+		latencies = append(latencies, r.DurationMS)
+		if r.SavedScreenshot != "" {
+			rendered++
+		}
+	}
+
+	runtime.GC()
+	stdout := os.Stdout
+	if null, err := os.OpenFile(os.DevNull, os.O_WRONLY, 0); err == nil {
+		os.Stdout = null
+		defer null.Close()
+	}
+	sampler := startRSSSampler(100 * time.Millisecond)
+	start := time.Now()
+	runScanPool(cfg, proxies, shots, next, nil, archive, nil, shotDir, filepath.Join(cfg.OutDir, "scan_report.log"), emit)
+	elapsed := time.Since(start)
+	peak, haveRSS := sampler.Stop()
+	if shots != nil {
+		shots.Close()
+	}
+	proxies.CloseIdleConnections()
+	closeLogs()
+	os.Stdout = stdout
+	if err := archive.Close(); err != nil {
+		return err
+	}
+
+	sort.Slice(latencies, func(a, b int) bool { return latencies[a] < latencies[b] })
+	pct := func(q float64) time.Duration {
+		if len(latencies) == 0 {
+			return 0
+		}
+		return time.Duration(latencies[int(q*float64(len(latencies)-1)+0.5)]) * time.Millisecond
+	}
+	rss := "n/a"
+	if haveRSS {
+		rss = formatBytes(peak)
+	}
+	shotInfo := "off"
+	if cfg.TakeScreenshots {
+		shotInfo = fmt.Sprintf("on (%d rendered)", rendered)
+	}
+	fmt.Printf("[BENCH] workers=%-3d screenshots=%s ok=%d failed=%d in %s -> %.1f URLs/s\n",
+		cfg.Workers, shotInfo, ok, failed, elapsed.Round(time.Millisecond), float64(ok+failed)/elapsed.Seconds())
+	fmt.Printf("[BENCH]   latency p50 %s p90 %s p99 %s max %s | peak RSS %s | peak goroutines %d (incl. simulated sites)\n",
+		pct(0.5), pct(0.9), pct(0.99), pct(1), rss, sampler.goroutines)
+	if len(classes) > 0 {
+		parts := make([]string, 0, len(classes))
+		for _, k := range sortedKeys(classes) {
+			parts = append(parts, fmt.Sprintf("%s=%d", k, classes[k]))
+		}
+		fmt.Printf("[BENCH]   errors: %s\n", strings.Join(parts, " "))
+	}
+	return nil
+}
+
+func parseBenchWorkers(spec string) ([]int, error) {
+	var out []int
+	for _, item := range strings.Split(spec, ",") {
+		item = strings.TrimSpace(item)
+		if item == "" {
+			continue
+		}
+		n, err := strconv.Atoi(item)
+		if err != nil || n < 1 {
+			return nil, fmt.Errorf("bad worker count %q", item)
+		}
+		out = append(out, n)
+	}
+	if len(out) == 0 {
+		return nil, fmt.Errorf("no worker counts in %q", spec)
+	}
+	return out, nil
+}
+
+// -------------------------
+// Simulated Onion Sites
+// -------------------------
+
+// benchSites maps every synthetic onion host to a behavior and serves the pages of the
+// alive ones.
+type benchSites struct {
+	kinds    map[string]string // host -> fast | slow | large | tls | dead | invalid | circuit
+	targets  []string
+	slowBody time.Duration
+	large    []byte
+}
+
+func newBenchSites(n int, fail float64, slowBody time.Duration) *benchSites {
+	s := &benchSites{kinds: map[string]string{}, slowBody: slowBody}
+	rng := rand.New(rand.NewSource(1))
+	for i := 0; i < n; i++ {
+		host := benchOnionHost(rng)
+		kind := "fast"
+		switch r := rng.Float64(); {
+		case r < fail*2/3:
+			kind = "dead"
+		case r < fail:
+			kind = "invalid"
+		default:
+			switch r := rng.Float64(); {
+			case r < 0.15:
+				kind = "slow"
+			case r < 0.25:
+				kind = "large"
+			case r < 0.40:
+				kind = "tls"
+			}
+		}
+		s.kinds[host] = kind
+		scheme := "http"
+		if kind == "tls" {
+			scheme = "https"
+		}
+		s.targets = append(s.targets, fmt.Sprintf("%s://%s/page/%d", scheme, host, i))
+	}
+
+	var b bytes.Buffer
+	for b.Len() < 2<<20 {
+		fmt.Fprintf(&b, "<p>%d lorem ipsum dolor sit amet, consectetur adipiscing elit</p>\n", b.Len())
+	}
+	s.large = b.Bytes()
+	return s
+}
+
+// Mix summarizes how many hosts have each behavior.
+func (s *benchSites) Mix() string {
+	n := map[string]int{}
+	for _, k := range s.kinds {
+		n[k]++
+	}
+	parts := make([]string, 0, len(n))
+	for _, k := range sortedKeys(n) {
+		parts = append(parts, fmt.Sprintf("%s %d", k, n[k]))
+	}
+	return strings.Join(parts, ", ")
+}
+
+func (s *benchSites) ServeHTTP(w http.ResponseWriter, r *http.Request) {
+	host := r.Host
+	if h, _, err := net.SplitHostPort(host); err == nil {
+		host = h
+	}
+	w.Header().Set("Content-Type", "text/html; charset=utf-8")
+	fmt.Fprintf(w, "<html><head><title>%s</title></head><body><h1>%s</h1>\n", host, r.URL.Path)
+	switch s.kinds[host] {
+	case "slow":
+		const chunks = 10
+		flusher, _ := w.(http.Flusher)
+		for i := 0; i < chunks; i++ {
+			fmt.Fprintf(w, "<p>chunk %d</p>\n", i)
+			if flusher != nil {
+				flusher.Flush()
+			}
+			select {
+			case <-r.Context().Done():
+				return
+			case <-time.After(s.slowBody / chunks):
+			}
+		}
+	case "large":
+		_, _ = w.Write(s.large)
+	default:
+		for i := 0; i < 50; i++ {
+			fmt.Fprintf(w, "<p>paragraph %d <a href=\"/page/%d\">next</a></p>\n", i, i+1)
+		}
+	}
+	fmt.Fprint(w, "</body></html>")
+}
+
+// benchOnionHost returns a random but valid v3 onion address (see validateOnionHost).
+func benchOnionHost(rng *rand.Rand) string {
+	raw := make([]byte, 35)
+	rng.Read(raw[:32])
+	raw[34] = 3
+	h := sha3.New256()
+	h.Write([]byte(".onion checksum"))
+	h.Write(raw[:32])
+	h.Write(raw[34:])
+	copy(raw[32:34], h.Sum(nil))
+	return strings.ToLower(onionBase32.EncodeToString(raw)) + ".onion"
+}
+
+// -------------------------
+// Fake Tor SOCKS5 Proxy
+// -------------------------
+
+// benchSOCKS is a minimal SOCKS5 server (no auth or RFC 1929 auth, CONNECT only) that
+// behaves like Tor for the synthetic onion hosts: it delays every CONNECT, answers 0xF0
+// for dead, 0xF1 for invalid and 0xF2 for circuit hosts, and otherwise connects port
+// 443 to the TLS site and any other port to the plain one. It counts the usernames it
+// was sent (the isolation keys).
+type benchSOCKS struct {
+	ln      net.Listener
+	sites   *benchSites
+	latency time.Duration
+	plain   string
+	secure  string
+
+	mu    sync.Mutex
+	rng   *rand.Rand
+	users map[string]int
+}
+
+func startBenchSOCKS(sites *benchSites, latency time.Duration, plain, secure string) (*benchSOCKS, error) {
+	ln, err := net.Listen("tcp", "127.0.0.1:0")
+	if err != nil {
+		return nil, err
+	}
+	s := &benchSOCKS{ln: ln, sites: sites, latency: latency, plain: plain, secure: secure, rng: rand.New(rand.NewSource(2)), users: map[string]int{}}
+	go func() {
+		for {
+			c, err := ln.Accept()
+			if err != nil {
+				return
+			}
+			go s.handle(c)
+		}
+	}()
+	return s, nil
+}
+
+func (s *benchSOCKS) Addr() string { return s.ln.Addr().String() }
+
+func (s *benchSOCKS) Close() error { return s.ln.Close() }
+
+// Users returns how many handshakes used each SOCKS username.
+func (s *benchSOCKS) Users() map[string]int {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	out := make(map[string]int, len(s.users))
+	for u, n := range s.users {
+		out[u] = n
+	}
+	return out
+}
+
+// delay returns the connect latency with +-50% jitter.
+func (s *benchSOCKS) delay() time.Duration {
+	if s.latency <= 0 {
+		return 0
+	}
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	return s.latency/2 + time.Duration(s.rng.Int63n(int64(s.latency)))
+}
+
+func (s *benchSOCKS) handle(c net.Conn) {
+	defer c.Close()
+	br := bufio.NewReader(c)
+
+	var head [2]byte
+	if _, err := io.ReadFull(br, head[:]); err != nil || head[0] != 0x05 {
+		return
+	}
+	methods := make([]byte, head[1])
+	if _, err := io.ReadFull(br, methods); err != nil {
+		return
+	}
+	method := byte(0x00)
+	if bytes.IndexByte(methods, 0x02) >= 0 {
+		method = 0x02
+	}
+	if _, err := c.Write([]byte{0x05, method}); err != nil {
+		return
+	}
+	if method == 0x02 {
+		// VER ULEN UNAME PLEN PASSWD; any credentials are accepted (isolation keys)
+		var ver [2]byte
+		if _, err := io.ReadFull(br, ver[:]); err != nil {
+			return
+		}
+		user := make([]byte, ver[1])
+		if _, err := io.ReadFull(br, user); err != nil {
+			return
+		}
+		s.mu.Lock()
+		s.users[string(user)]++
+		s.mu.Unlock()
+		plen, err := br.ReadByte()
+		if err != nil {
+			return
+		}
+		if _, err := br.Discard(int(plen)); err != nil {
+			return
+		}
+		if _, err := c.Write([]byte{0x01, 0x00}); err != nil {
+			return
+		}
+	}
+
+	var req [4]byte
+	if _, err := io.ReadFull(br, req[:]); err != nil {
+		return
+	}
+	var host string
+	switch req[3] {
+	case 0x01, 0x04:
+		ip := make(net.IP, 4)
+		if req[3] == 0x04 {
+			ip = make(net.IP, 16)
+		}
+		if _, err := io.ReadFull(br, ip); err != nil {
+			return
+		}
+		host = ip.String()
+	case 0x03:
+		n, err := br.ReadByte()
+		if err != nil {
+			return
+		}
+		name := make([]byte, n)
+		if _, err := io.ReadFull(br, name); err != nil {
+			return
+		}
+		host = string(name)
+	default:
+		return
+	}
+	var portBuf [2]byte
+	if _, err := io.ReadFull(br, portBuf[:]); err != nil {
+		return
+	}
+	port := binary.BigEndian.Uint16(portBuf[:])
+
+	reply := func(code byte) error {
+		_, err := c.Write([]byte{0x05, code, 0x00, 0x01, 0, 0, 0, 0, 0, 0})
+		return err
+	}
+	if req[1] != 0x01 {
+		_ = reply(0x07)
+		return
+	}
+
+	time.Sleep(s.delay())
+	switch s.sites.kinds[host] {
+	case "dead", "":
+		_ = reply(0xF0)
+		return
+	case "invalid":
+		_ = reply(0xF1)
+		return
+	case "circuit":
+		_ = reply(0xF2)
+		return
+	}
+	backend := s.plain
+	if port == 443 {
+		backend = s.secure
+	}
+	up, err := net.Dial("tcp", backend)
+	if err != nil {
+		_ = reply(0x01)
+		return
+	}
+	defer up.Close()
+	if err := reply(0x00); err != nil {
+		return
+	}
+	go func() {
+		_, _ = io.Copy(up, br)
+		if tc, ok := up.(*net.TCPConn); ok {
+			_ = tc.CloseWrite()
+		}
+	}()
+	_, _ = io.Copy(c, up)
+}
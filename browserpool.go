@@ -0,0 +1,516 @@
+// browserpool.go
+package main
+
+import (
+	"context"
+	"errors"
+	"fmt"
+	htmlpkg "html"
+	"os"
+	"path/filepath"
+	"regexp"
+	"strings"
+	"sync"
+	"time"
+
+	"github.com/chromedp/cdproto/cdp"
+	"github.com/chromedp/cdproto/fetch"
+	"github.com/chromedp/cdproto/network"
+	"github.com/chromedp/cdproto/page"
+	"github.com/chromedp/chromedp"
+)
+
+// -------------------------
+// Browser Pool (long-lived headless Chrome)
+// -------------------------
+
+// browserPool keeps a fixed number of Chrome processes alive for the whole scan and
+// leases tabs on them to screenshot workers. A browser is restarted after it served
+// recycleAfter pages or when it is found dead (crash, killed by the OS, ...).
+type browserPool struct {
+	proxies      []string // browser i uses proxies[i%len]
+	tabsPer      int
+	recycleAfter int
+
+	sem chan struct{} // total concurrent tabs (browsers * tabsPer)
+
+	mu       sync.Mutex
+	browsers []*pooledBrowser
+	closed   bool
+}
+
+type pooledBrowser struct {
+	id            int
+	ctx           context.Context // browser (first tab) context; nil until started
+	allocCancel   context.CancelFunc
+	browserCancel context.CancelFunc
+	startMu       sync.Mutex
+	pages         int // pages served by the current process
+	inflight      int
+	restarts      int
+	broken        bool
+}
+
+// browserLease is one tab on a pooled browser. Release must be called exactly once.
+type browserLease struct {
+	pool    *browserPool
+	browser *pooledBrowser
+	ctx     context.Context
+	cancel  context.CancelFunc
+}
+
+func newBrowserPool(proxies []string, browsers, tabsPer, recycleAfter int) *browserPool {
+	if browsers < 1 {
+		browsers = 1
+	}
+	if tabsPer < 1 {
+		tabsPer = 1
+	}
+	p := &browserPool{
+		proxies:      proxies,
+		tabsPer:      tabsPer,
+		recycleAfter: recycleAfter,
+		sem:          make(chan struct{}, browsers*tabsPer),
+	}
+	for i := 0; i < browsers; i++ {
+		p.browsers = append(p.browsers, &pooledBrowser{id: i + 1})
+	}
+	return p
+}
+
+// Acquire waits for a free tab slot and opens a new tab on the least loaded healthy browser.
+// Browsers are started lazily, so a scan without any active page never launches Chrome.
+func (p *browserPool) Acquire(ctx context.Context) (*browserLease, error) {
+	select {
+	case p.sem <- struct{}{}:
+	case <-ctx.Done():
+		return nil, ctx.Err()
+	}
+
+	p.mu.Lock()
+	if p.closed {
+		p.mu.Unlock()
+		<-p.sem
+		return nil, errors.New("browser pool closed")
+	}
+	b := p.pickLocked()
+	if b.ctx != nil && b.inflight == 0 && p.needsRestartLocked(b) {
+		b.stop()
+		b.restarts++
+	}
+	b.inflight++
+	b.pages++
+	p.mu.Unlock()
+
+	browserCtx, err := p.ensureStarted(b)
+	if err != nil {
+		p.mu.Lock()
+		b.inflight--
+		p.mu.Unlock()
+		<-p.sem
+		return nil, err
+	}
+
+	tabCtx, cancel := chromedp.NewContext(browserCtx)
+	return &browserLease{pool: p, browser: b, ctx: tabCtx, cancel: cancel}, nil
+}
+
+// pickLocked returns the browser that should serve the next tab. Browsers that are due
+// for a restart are only picked once they are idle, so in-flight renders are never killed.
+func (p *browserPool) pickLocked() *pooledBrowser {
+	var best, fallback *pooledBrowser
+	for _, b := range p.browsers {
+		if b.inflight >= p.tabsPer {
+			continue
+		}
+		if p.needsRestartLocked(b) && b.inflight > 0 {
+			if fallback == nil || b.inflight < fallback.inflight {
+				fallback = b
+			}
+			continue
+		}
+		if best == nil || b.inflight < best.inflight {
+			best = b
+		}
+	}
+	if best != nil {
+		return best
+	}
+	// every browser with spare capacity is draining; overshoot the recycle limit a little
+	return fallback
+}
+
+func (p *browserPool) needsRestartLocked(b *pooledBrowser) bool {
+	if b.ctx == nil {
+		return false
+	}
+	if b.broken || b.ctx.Err() != nil {
+		return true
+	}
+	return p.recycleAfter > 0 && b.pages >= p.recycleAfter
+}
+
+// ensureStarted launches the browser process if it is not running. Launching takes
+// seconds, so it happens outside p.mu and only blocks callers of the same browser.
+func (p *browserPool) ensureStarted(b *pooledBrowser) (context.Context, error) {
+	b.startMu.Lock()
+	defer b.startMu.Unlock()
+
+	p.mu.Lock()
+	browserCtx := b.ctx
+	p.mu.Unlock()
+	if browserCtx != nil {
+		return browserCtx, nil
+	}
+
+	// Chrome cannot send SOCKS credentials, so isolation is per browser process/endpoint
+	proxyAddr := p.proxies[(b.id-1)%len(p.proxies)]
+	allocCtx, allocCancel := chromedp.NewExecAllocator(context.Background(), browserAllocOptions(proxyAddr)...)
+	browserCtx, browserCancel := chromedp.NewContext(allocCtx)
+	// running with no actions launches the process and opens the first (keep-alive) tab
+	if err := chromedp.Run(browserCtx); err != nil {
+		browserCancel()
+		allocCancel()
+		return nil, fmt.Errorf("browser #%d start failed: %w", b.id, err)
+	}
+
+	p.mu.Lock()
+	if p.closed {
+		p.mu.Unlock()
+		browserCancel()
+		allocCancel()
+		return nil, errors.New("browser pool closed")
+	}
+	b.ctx = browserCtx
+	b.allocCancel = allocCancel
+	b.browserCancel = browserCancel
+	b.pages = b.inflight
+	b.broken = false
+	p.mu.Unlock()
+	return browserCtx, nil
+}
+
+func (b *pooledBrowser) stop() {
+	if b.browserCancel != nil {
+		b.browserCancel()
+	}
+	if b.allocCancel != nil {
+		b.allocCancel()
+	}
+	b.ctx, b.browserCancel, b.allocCancel = nil, nil, nil
+}
+
+// Release closes the tab and returns its slot. renderErr is the error of the work done
+// on the tab; if the browser process died meanwhile it is marked for restart.
+func (l *browserLease) Release(renderErr error) {
+	l.cancel()
+
+	p := l.pool
+	p.mu.Lock()
+	browserCtx := l.browser.ctx
+	p.mu.Unlock()
+
+	dead := browserCtx == nil || browserCtx.Err() != nil
+	if !dead && renderErr != nil && !errors.Is(renderErr, context.DeadlineExceeded) && !errors.Is(renderErr, context.Canceled) {
+		// a non-timeout failure can also mean the browser connection is gone; probe it
+		dead = chromedp.Run(browserCtx) != nil
+	}
+
+	p.mu.Lock()
+	l.browser.inflight--
+	if dead && l.browser.ctx == browserCtx {
+		l.browser.broken = true
+	}
+	p.mu.Unlock()
+
+	<-p.sem
+}
+
+// Stats returns (running browsers, total restarts).
+func (p *browserPool) Stats() (running, restarts int) {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	for _, b := range p.browsers {
+		if b.ctx != nil {
+			running++
+		}
+		restarts += b.restarts
+	}
+	return running, restarts
+}
+
+// Busy returns the number of tabs currently leased.
+func (p *browserPool) Busy() int { return len(p.sem) }
+
+// Close shuts down every browser process. Pending Acquire calls fail afterwards.
+func (p *browserPool) Close() {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	p.closed = true
+	for _, b := range p.browsers {
+		b.stop()
+	}
+}
+
+// Screenshot browser window (and capture) size.
+const (
+	screenshotWidth  = 1366
+	screenshotHeight = 768
+)
+
+// screenshotOptions controls how a page is rendered and captured.
+type screenshotOptions struct {
+	Timeout  time.Duration
+	WaitMS   int
+	WaitIdle bool // wait until no request was in flight for WaitMS instead of sleeping WaitMS
+	TextOnly bool // fail every subresource request (images, css, scripts, ...)
+
+	Block      map[network.ResourceType]bool // subresource types to fail (images, fonts, media, ...)
+	Format     string                        // png | jpeg | webp
+	Quality    int                           // jpeg / webp quality, 1-100
+	ThumbWidth int                           // also capture a thumbnail this many pixels wide (0 = off)
+}
+
+// parseResourceTypes turns "image,font,media" into the resource types to block and
+// returns the names it did not recognize.
+func parseResourceTypes(spec string) (map[network.ResourceType]bool, []string) {
+	known := map[string]network.ResourceType{
+		"image":      network.ResourceTypeImage,
+		"font":       network.ResourceTypeFont,
+		"media":      network.ResourceTypeMedia,
+		"stylesheet": network.ResourceTypeStylesheet,
+		"script":     network.ResourceTypeScript,
+	}
+	var types map[network.ResourceType]bool
+	var unknown []string
+	for _, name := range strings.Split(spec, ",") {
+		name = strings.ToLower(strings.TrimSpace(name))
+		if name == "" {
+			continue
+		}
+		t, ok := known[name]
+		if !ok {
+			unknown = append(unknown, name)
+			continue
+		}
+		if types == nil {
+			types = map[network.ResourceType]bool{}
+		}
+		types[t] = true
+	}
+	return types, unknown
+}
+
+// screenshotExt is the file extension of a screenshot format.
+func screenshotExt(format string) string {
+	switch format {
+	case "jpeg":
+		return ".jpg"
+	case "webp":
+		return ".webp"
+	default:
+		return ".png"
+	}
+}
+
+// thumbnailPath is where the thumbnail of the screenshot at path is written.
+func thumbnailPath(path string) string {
+	ext := filepath.Ext(path)
+	return strings.TrimSuffix(path, ext) + "_thumb" + ext
+}
+
+// Capture renders url on a pooled tab and writes a screenshot to outPath (and a
+// thumbnail next to it with opts.ThumbWidth). When html is not nil it is loaded as the
+// document (with url as base) instead of fetching the page again over Tor; only its
+// subresources go through the proxy.
+func (p *browserPool) Capture(url string, html []byte, outPath string, opts screenshotOptions) error {
+	lease, err := p.Acquire(context.Background())
+	if err != nil {
+		return err
+	}
+
+	ctx, cancel := context.WithTimeout(lease.ctx, opts.Timeout)
+	var buf, thumb []byte
+	err = chromedp.Run(ctx, screenshotActions(url, html, opts, &buf, &thumb))
+	cancel()
+	lease.Release(err)
+	if err != nil {
+		return err
+	}
+	if err := os.WriteFile(outPath, buf, 0644); err != nil {
+		return err
+	}
+	if len(thumb) > 0 {
+		return os.WriteFile(thumbnailPath(outPath), thumb, 0644)
+	}
+	return nil
+}
+
+// screenshotActions loads the page (live or from html), waits (opts.WaitMS, or for the
+// network to go idle) and captures the viewport into buf, and a scaled-down copy into
+// thumb when opts.ThumbWidth is set and thumb is not nil. Encoding (png, jpeg, webp) and
+// scaling happen inside Chrome.
+func screenshotActions(url string, html []byte, opts screenshotOptions, buf, thumb *[]byte) chromedp.Tasks {
+	var tasks chromedp.Tasks
+	switch {
+	case opts.TextOnly:
+		tasks = append(tasks, blockSubresources(nil))
+	case len(opts.Block) > 0:
+		tasks = append(tasks, blockSubresources(opts.Block))
+	}
+	var idle *networkIdle
+	if opts.WaitIdle {
+		idle = newNetworkIdle()
+		tasks = append(tasks, idle.listen())
+	}
+	if html == nil {
+		tasks = append(tasks, chromedp.Navigate(url))
+	} else {
+		tasks = append(tasks,
+			chromedp.Navigate("about:blank"),
+			chromedp.ActionFunc(func(ctx context.Context) error {
+				tree, err := page.GetFrameTree().Do(ctx)
+				if err != nil {
+					return err
+				}
+				return page.SetDocumentContent(tree.Frame.ID, withBaseHref(string(html), url)).Do(ctx)
+			}),
+		)
+	}
+	quiet := time.Duration(opts.WaitMS) * time.Millisecond
+	if idle != nil {
+		// pages that never go quiet (long polling, streams) are captured after half the timeout
+		tasks = append(tasks, idle.wait(quiet, opts.Timeout/2))
+	} else {
+		// biraz render bekle
+		tasks = append(tasks, chromedp.Sleep(quiet))
+	}
+
+	format := page.CaptureScreenshotFormatPng
+	switch opts.Format {
+	case "jpeg":
+		format = page.CaptureScreenshotFormatJpeg
+	case "webp":
+		format = page.CaptureScreenshotFormatWebp
+	}
+	capture := func() *page.CaptureScreenshotParams {
+		c := page.CaptureScreenshot().WithFormat(format).WithFromSurface(true)
+		if format != page.CaptureScreenshotFormatPng && opts.Quality > 0 {
+			c = c.WithQuality(int64(opts.Quality))
+		}
+		return c
+	}
+	return append(tasks,
+		chromedp.ActionFunc(func(ctx context.Context) error {
+			var err error
+			*buf, err = capture().Do(ctx)
+			if err != nil || thumb == nil || opts.ThumbWidth <= 0 {
+				return err
+			}
+			// the page is already rendered; a scaled clip costs only the encoding
+			*thumb, err = capture().WithClip(&page.Viewport{
+				Width:  screenshotWidth,
+				Height: screenshotHeight,
+				Scale:  float64(opts.ThumbWidth) / screenshotWidth,
+			}).Do(ctx)
+			return err
+		}),
+	)
+}
+
+// networkIdle counts the tab's in-flight requests to tell when the page stopped loading.
+type networkIdle struct {
+	mu       sync.Mutex
+	inflight map[network.RequestID]struct{}
+	last     time.Time
+}
+
+func newNetworkIdle() *networkIdle {
+	return &networkIdle{inflight: map[network.RequestID]struct{}{}, last: time.Now()}
+}
+
+func (n *networkIdle) listen() chromedp.Action {
+	return chromedp.ActionFunc(func(ctx context.Context) error {
+		chromedp.ListenTarget(ctx, func(ev interface{}) {
+			n.mu.Lock()
+			defer n.mu.Unlock()
+			switch e := ev.(type) {
+			case *network.EventRequestWillBeSent:
+				n.inflight[e.RequestID] = struct{}{}
+			case *network.EventLoadingFinished:
+				delete(n.inflight, e.RequestID)
+			case *network.EventLoadingFailed:
+				delete(n.inflight, e.RequestID)
+			default:
+				return
+			}
+			n.last = time.Now()
+		})
+		return network.Enable().Do(ctx)
+	})
+}
+
+// wait returns once no request was in flight for quiet, or after max.
+func (n *networkIdle) wait(quiet, max time.Duration) chromedp.Action {
+	return chromedp.ActionFunc(func(ctx context.Context) error {
+		deadline := time.Now().Add(max)
+		t := time.NewTicker(50 * time.Millisecond)
+		defer t.Stop()
+		for {
+			n.mu.Lock()
+			idle := len(n.inflight) == 0 && time.Since(n.last) >= quiet
+			n.mu.Unlock()
+			if idle || (max > 0 && time.Now().After(deadline)) {
+				return nil
+			}
+			select {
+			case <-ctx.Done():
+				return ctx.Err()
+			case <-t.C:
+			}
+		}
+	})
+}
+
+// blockSubresources intercepts every request of the tab and fails the subresources of
+// the given types; with types == nil it fails all of them except top-level documents,
+// which gives a "text-only" render without any extra Tor traffic.
+func blockSubresources(types map[network.ResourceType]bool) chromedp.Action {
+	return chromedp.ActionFunc(func(ctx context.Context) error {
+		chromedp.ListenTarget(ctx, func(ev interface{}) {
+			e, ok := ev.(*fetch.EventRequestPaused)
+			if !ok {
+				return
+			}
+			go func() {
+				c := chromedp.FromContext(ctx)
+				if c == nil || c.Target == nil {
+					return
+				}
+				execCtx := cdp.WithExecutor(ctx, c.Target)
+				if e.ResourceType == network.ResourceTypeDocument || (types != nil && !types[e.ResourceType]) {
+					_ = fetch.ContinueRequest(e.RequestID).Do(execCtx)
+					return
+				}
+				_ = fetch.FailRequest(e.RequestID, network.ErrorReasonBlockedByClient).Do(execCtx)
+			}()
+		})
+		return fetch.Enable().Do(ctx)
+	})
+}
+
+var reHeadOpen = regexp.MustCompile(`(?i)<head(?:\s[^>]*)?>`) // not <header>
+var reBaseTag = regexp.MustCompile(`(?i)<base[\s>]`)
+
+// withBaseHref makes relative links of a document loaded via SetDocumentContent resolve
+// against its original url. An existing <base> tag is left alone.
+func withBaseHref(doc, url string) string {
+	if reBaseTag.MatchString(doc) {
+		return doc
+	}
+	tag := `<base href="` + htmlpkg.EscapeString(url) + `">`
+	if loc := reHeadOpen.FindStringIndex(doc); loc != nil {
+		return doc[:loc[1]] + tag + doc[loc[1]:]
+	}
+	return tag + doc
+}
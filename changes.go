@@ -0,0 +1,292 @@
+// changes.go
+package main
+
+import (
+	"bufio"
+	"fmt"
+	"hash/fnv"
+	"io"
+	"math/bits"
+	"os"
+	"sort"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+	"unicode"
+
+	"golang.org/x/net/html"
+)
+
+// -------------------------
+// Change Detection (fingerprints across scans)
+// -------------------------
+
+// pageFingerprints remembers, per URL, the fingerprint of the page fetched in the last
+// scan: the exact body hash and a 64-bit simhash of its visible text. The simhash
+// ignores markup, scripts and styles, so a rotated session token or a reordered
+// attribute does not count as a change while edited text does. It is kept in
+// <out>/page_fingerprints.json and bootstrapped from an existing result stream.
+type pageFingerprints struct {
+	path string
+
+	mu      sync.Mutex
+	entries map[string]*pageFingerprint
+	dirty   bool
+}
+
+type pageFingerprint struct {
+	SHA256     string `json:"sha256"`
+	Simhash    string `json:"simhash"`
+	Screenshot string `json:"screenshot,omitempty"`
+	Seen       string `json:"seen"`
+}
+
+// loadPageFingerprints reads the fingerprints at path. Without them, bootstrapPath (a
+// result stream of an earlier run) is replayed instead. The returned store is always
+// usable.
+func loadPageFingerprints(path, bootstrapPath string) (*pageFingerprints, error) {
+	p := &pageFingerprints{path: path, entries: map[string]*pageFingerprint{}}
+	err := loadJSONState(path, &p.entries)
+	switch {
+	case err == nil:
+	case os.IsNotExist(err):
+		err = forEachResult(bootstrapPath, func(r ScanResult) error {
+			p.Observe(r)
+			return nil
+		})
+		if os.IsNotExist(err) {
+			err = nil
+		}
+	default:
+		p.entries = nil
+	}
+	if p.entries == nil {
+		p.entries = map[string]*pageFingerprint{}
+	}
+	return p, err
+}
+
+// Attach wraps a target iterator and attaches the previous fingerprint of each target,
+// so it travels with the target (also to distributed worker nodes).
+func (p *pageFingerprints) Attach(next func() (scanTarget, bool)) func() (scanTarget, bool) {
+	return func() (scanTarget, bool) {
+		t, ok := next()
+		if !ok {
+			return t, false
+		}
+		p.mu.Lock()
+		if e, found := p.entries[t.URL]; found {
+			prev := *e
+			t.Prev = &prev
+		}
+		p.mu.Unlock()
+		return t, true
+	}
+}
+
+// Observe records the fingerprint of a fetched page.
+func (p *pageFingerprints) Observe(r ScanResult) {
+	if !r.Active || r.Simhash == "" {
+		return
+	}
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	e := &pageFingerprint{SHA256: r.HTMLSHA256, Simhash: r.Simhash, Screenshot: r.SavedScreenshot, Seen: r.TimestampUTC}
+	if prev := p.entries[r.Normalized]; prev != nil && e.Screenshot == "" && !r.Changed {
+		e.Screenshot = prev.Screenshot
+	}
+	p.entries[r.Normalized] = e
+	p.dirty = true
+}
+
+// Len returns the number of URLs with a fingerprint.
+func (p *pageFingerprints) Len() int {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	return len(p.entries)
+}
+
+// Save writes the fingerprints back if they changed.
+func (p *pageFingerprints) Save() error {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	if !p.dirty {
+		return nil
+	}
+	if err := saveJSONState(p.path, p.entries); err != nil {
+		return err
+	}
+	p.dirty = false
+	return nil
+}
+
+func (e *pageFingerprint) simhash() (uint64, bool) {
+	v, err := strconv.ParseUint(e.Simhash, 16, 64)
+	return v, err == nil
+}
+
+// compareFingerprint fills in the change fields of res from the page's simhash and the
+// target's previous fingerprint. Pages seen for the first time count as changed (with no
+// similarity); a known page whose stored simhash is unreadable counts as changed with
+// similarity 0.
+func compareFingerprint(res *ScanResult, simhash uint64, prev *pageFingerprint, threshold float64) {
+	res.Simhash = fmt.Sprintf("%016x", simhash)
+	if prev == nil {
+		res.Changed = true
+		return
+	}
+	sim := 1.0
+	if prev.SHA256 != res.HTMLSHA256 {
+		old, ok := prev.simhash()
+		if !ok {
+			sim = 0
+			res.Similarity, res.Changed = &sim, true
+			return
+		}
+		sim = simhashSimilarity(simhash, old)
+	}
+	res.Similarity = &sim
+	res.Changed = sim < threshold
+}
+
+// -------------------------
+// Simhash (visible text)
+// -------------------------
+
+// textSimhash returns Charikar's simhash over the word bigrams of the visible text of
+// an HTML document (script, style, noscript and template content is skipped).
+// Near-identical texts give hashes a few bits apart.
+func textSimhash(r io.Reader) uint64 {
+	var v [64]int
+	var prev string
+	add := func(word string) {
+		h := fnv.New64a()
+		h.Write([]byte(prev))
+		h.Write([]byte{' '})
+		h.Write([]byte(word))
+		f := h.Sum64()
+		for i := 0; i < 64; i++ {
+			if f&(1<<i) != 0 {
+				v[i]++
+			} else {
+				v[i]--
+			}
+		}
+		prev = word
+	}
+
+	z := html.NewTokenizer(r)
+	skip := 0
+	for {
+		switch z.Next() {
+		case html.ErrorToken:
+			var out uint64
+			for i := 0; i < 64; i++ {
+				if v[i] > 0 {
+					out |= 1 << i
+				}
+			}
+			return out
+		case html.StartTagToken:
+			if name, _ := z.TagName(); isHiddenTextTag(string(name)) {
+				skip++
+			}
+		case html.EndTagToken:
+			if name, _ := z.TagName(); isHiddenTextTag(string(name)) && skip > 0 {
+				skip--
+			}
+		case html.TextToken:
+			if skip > 0 {
+				continue
+			}
+			words := strings.FieldsFunc(string(z.Text()), func(c rune) bool {
+				return !unicode.IsLetter(c) && !unicode.IsNumber(c)
+			})
+			for _, w := range words {
+				add(strings.ToLower(w))
+			}
+		}
+	}
+}
+
+func isHiddenTextTag(name string) bool {
+	switch name {
+	case "script", "style", "noscript", "template":
+		return true
+	}
+	return false
+}
+
+// simhashSimilarity is 1 - hamming distance / 64.
+func simhashSimilarity(a, b uint64) float64 {
+	return 1 - float64(bits.OnesCount64(a^b))/64
+}
+
+// -------------------------
+// Change Report
+// -------------------------
+
+// writeChanges writes the change report (new and changed pages, most changed first) from
+// the result stream.
+func writeChanges(path, streamPath string) error {
+	type changed struct {
+		url string
+		sim float64
+	}
+	var fetched, unchanged int
+	var news []string
+	var diffs []changed
+	err := forEachResult(streamPath, func(r ScanResult) error {
+		if !r.Active || r.Simhash == "" {
+			return nil
+		}
+		fetched++
+		switch {
+		case r.Changed && r.Similarity == nil:
+			news = append(news, r.Normalized)
+		case r.Changed:
+			diffs = append(diffs, changed{r.Normalized, *r.Similarity})
+		default:
+			unchanged++
+		}
+		return nil
+	})
+	if err != nil && !os.IsNotExist(err) {
+		return err
+	}
+	sort.SliceStable(diffs, func(i, j int) bool { return diffs[i].sim < diffs[j].sim })
+
+	tmp := path + ".tmp"
+	f, err := os.Create(tmp)
+	if err != nil {
+		return err
+	}
+	defer f.Close()
+	b := bufio.NewWriter(f)
+
+	b.WriteString("=== Change Report ===\n")
+	b.WriteString(fmt.Sprintf("Timestamp (UTC): %s\n", time.Now().UTC().Format(time.RFC3339)))
+	b.WriteString(fmt.Sprintf("Fetched: %d | Changed: %d | New: %d | Unchanged: %d\n\n", fetched, len(diffs), len(news), unchanged))
+
+	b.WriteString("== Changed URLs ==\n")
+	if len(diffs) == 0 {
+		b.WriteString("(none)\n")
+	}
+	for _, d := range diffs {
+		b.WriteString(fmt.Sprintf("- %s (similarity %.2f)\n", d.url, d.sim))
+	}
+	b.WriteString("\n== New URLs ==\n")
+	if len(news) == 0 {
+		b.WriteString("(none)\n")
+	}
+	for _, u := range news {
+		b.WriteString("- " + u + "\n")
+	}
+
+	if err := b.Flush(); err != nil {
+		return err
+	}
+	_ = f.Close()
+	return os.Rename(tmp, path)
+}
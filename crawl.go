@@ -0,0 +1,316 @@
+// crawl.go
+package main
+
+import (
+	"hash/fnv"
+	"io"
+	"math"
+	"net/url"
+	"strings"
+	"sync"
+
+	"golang.org/x/net/html"
+)
+
+// -------------------------
+// Crawl Frontier (-crawl)
+// -------------------------
+
+// crawlFrontier feeds runScanPool in -crawl mode. It hands out the planned seed targets
+// first and then links discovered in fetched pages, breadth first. Discovered URLs are
+// canonicalized with canonicalURL and deduplicated by a bloom filter in front of an
+// exact set of 64-bit hashes (the bloom filter answers the common "already seen" case
+// without touching the map). Politeness: every host has its own queue, hosts are served
+// round robin, at most hostConns pages of one host are in flight at a time and at most
+// hostPages pages of one host are ever scheduled.
+//
+// A page stays in flight until its result reaches the emit loop, so the crawl ends when
+// the seeds are exhausted, every queue is empty and nothing is in flight.
+type crawlFrontier struct {
+	seeds     func() (scanTarget, bool)
+	maxDepth  int
+	hostPages int
+	hostConns int
+	maxPages  int
+	scope     string // onion | host | all
+
+	mu        sync.Mutex
+	cond      *sync.Cond
+	seedsDone bool
+	hosts     map[string]*crawlHost
+	ring      []string // hosts with queued pages, served round robin
+	cursor    int
+	queued    int
+	inflight  int
+	scheduled int
+
+	bloom *bloomFilter
+	seen  map[uint64]struct{}
+
+	Discovered int
+}
+
+type crawlHost struct {
+	queue     []scanTarget
+	inflight  int
+	scheduled int
+}
+
+func newCrawlFrontier(seeds func() (scanTarget, bool), maxDepth, hostPages, hostConns, maxPages int, scope string) *crawlFrontier {
+	expected := maxPages
+	if expected <= 0 {
+		expected = 1 << 20
+	}
+	f := &crawlFrontier{
+		seeds:     seeds,
+		maxDepth:  maxDepth,
+		hostPages: hostPages,
+		hostConns: hostConns,
+		maxPages:  maxPages,
+		scope:     scope,
+		hosts:     map[string]*crawlHost{},
+		bloom:     newBloomFilter(expected, 0.01),
+		seen:      map[uint64]struct{}{},
+	}
+	f.cond = sync.NewCond(&f.mu)
+	return f
+}
+
+// Next returns the next target to fetch, blocking while pages are in flight that may
+// still add links. It returns false once the crawl is complete.
+func (f *crawlFrontier) Next() (scanTarget, bool) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	for {
+		if t, ok := f.popLocked(); ok {
+			return t, true
+		}
+		if !f.seedsDone {
+			// pull seeds lazily; the planner may log/emit, so do not hold the lock
+			f.mu.Unlock()
+			t, ok := f.seeds()
+			f.mu.Lock()
+			if !ok {
+				f.seedsDone = true
+			} else if f.markSeenLocked(t.URL) {
+				f.pushLocked(t, true)
+			}
+			continue
+		}
+		if f.queued == 0 && f.inflight == 0 {
+			return scanTarget{}, false
+		}
+		f.cond.Wait()
+	}
+}
+
+// popLocked takes the next page of the next host (round robin) that is under its
+// concurrency cap.
+func (f *crawlFrontier) popLocked() (scanTarget, bool) {
+	for i := 0; i < len(f.ring); i++ {
+		idx := (f.cursor + i) % len(f.ring)
+		name := f.ring[idx]
+		h := f.hosts[name]
+		if f.hostConns > 0 && h.inflight >= f.hostConns {
+			continue
+		}
+		t := h.queue[0]
+		h.queue = h.queue[1:]
+		h.inflight++
+		f.queued--
+		f.inflight++
+		if len(h.queue) == 0 {
+			h.queue = nil
+			f.ring = append(f.ring[:idx], f.ring[idx+1:]...)
+			f.cursor = idx
+		} else {
+			f.cursor = idx + 1
+		}
+		if len(f.ring) > 0 {
+			f.cursor %= len(f.ring)
+		} else {
+			f.cursor = 0
+		}
+		return t, true
+	}
+	return scanTarget{}, false
+}
+
+func (f *crawlFrontier) pushLocked(t scanTarget, seed bool) bool {
+	name := urlHost(t.URL)
+	h := f.hosts[name]
+	if h == nil {
+		h = &crawlHost{}
+		f.hosts[name] = h
+	}
+	if !seed {
+		if f.hostPages > 0 && h.scheduled >= f.hostPages {
+			return false
+		}
+		if f.maxPages > 0 && f.scheduled >= f.maxPages {
+			return false
+		}
+		f.Discovered++
+	}
+	if len(h.queue) == 0 {
+		f.ring = append(f.ring, name)
+	}
+	h.queue = append(h.queue, t)
+	h.scheduled++
+	f.scheduled++
+	f.queued++
+	f.cond.Broadcast()
+	return true
+}
+
+// markSeenLocked reports whether canon was not seen before and remembers it.
+func (f *crawlFrontier) markSeenLocked(canon string) bool {
+	h := fnv.New64a()
+	h.Write([]byte(canon))
+	key := h.Sum64()
+	if f.bloom.TestAndAdd(key) {
+		if _, ok := f.seen[key]; ok {
+			return false
+		}
+	}
+	f.seen[key] = struct{}{}
+	return true
+}
+
+// Add queues the links found on parent's page and returns how many were new.
+func (f *crawlFrontier) Add(parent scanTarget, links []string) int {
+	if parent.Depth >= f.maxDepth {
+		return 0
+	}
+	parentHost := urlHost(parent.URL)
+
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	added := 0
+	for _, l := range links {
+		canon, err := canonicalURL(l)
+		if err != nil {
+			continue
+		}
+		host := urlHost(canon)
+		switch f.scope {
+		case "onion":
+			if !strings.HasSuffix(host, ".onion") {
+				continue
+			}
+		case "host":
+			if host != parentHost {
+				continue
+			}
+		}
+		if !f.markSeenLocked(canon) {
+			continue
+		}
+		if f.pushLocked(scanTarget{Raw: canon, URL: canon, Depth: parent.Depth + 1, Parent: parent.URL}, false) {
+			added++
+		}
+	}
+	return added
+}
+
+// Done marks the page of rawURL as finished (its links, if any, were added).
+func (f *crawlFrontier) Done(rawURL string) {
+	f.mu.Lock()
+	defer f.mu.Unlock()
+	if h := f.hosts[urlHost(rawURL)]; h != nil && h.inflight > 0 {
+		h.inflight--
+	}
+	if f.inflight > 0 {
+		f.inflight--
+	}
+	f.cond.Broadcast()
+}
+
+// extractLinks returns the absolute http(s) links of an HTML document (a, area, frame
+// and iframe targets), resolved against base and an optional <base href>.
+func extractLinks(r io.Reader, base string) []string {
+	baseURL, err := url.Parse(base)
+	if err != nil {
+		return nil
+	}
+	var out []string
+	z := html.NewTokenizer(r)
+	for {
+		switch z.Next() {
+		case html.ErrorToken:
+			return out
+		case html.StartTagToken, html.SelfClosingTagToken:
+			name, hasAttr := z.TagName()
+			var want string
+			switch string(name) {
+			case "a", "area", "base":
+				want = "href"
+			case "frame", "iframe":
+				want = "src"
+			default:
+				continue
+			}
+			for hasAttr {
+				var key, val []byte
+				key, val, hasAttr = z.TagAttr()
+				if string(key) != want {
+					continue
+				}
+				ref, err := url.Parse(strings.TrimSpace(string(val)))
+				if err != nil {
+					break
+				}
+				abs := baseURL.ResolveReference(ref)
+				if string(name) == "base" {
+					baseURL = abs
+					break
+				}
+				if abs.Scheme == "http" || abs.Scheme == "https" {
+					abs.Fragment = ""
+					out = append(out, abs.String())
+				}
+				break
+			}
+		}
+	}
+}
+
+// -------------------------
+// Bloom Filter
+// -------------------------
+
+// bloomFilter is a fixed-size bloom filter over 64-bit keys, using double hashing
+// (h1 + i*h2) to derive its k bit positions.
+type bloomFilter struct {
+	bits []uint64
+	m    uint64
+	k    int
+}
+
+func newBloomFilter(n int, p float64) *bloomFilter {
+	m := uint64(math.Ceil(-float64(n) * math.Log(p) / (math.Ln2 * math.Ln2)))
+	if m < 64 {
+		m = 64
+	}
+	k := int(math.Round(float64(m) / float64(n) * math.Ln2))
+	if k < 1 {
+		k = 1
+	}
+	return &bloomFilter{bits: make([]uint64, (m+63)/64), m: m, k: k}
+}
+
+// TestAndAdd sets the key's bits and reports whether all of them were already set.
+func (b *bloomFilter) TestAndAdd(key uint64) bool {
+	h1, h2 := key, key>>33|key<<31
+	h2 |= 1
+	present := true
+	for i := 0; i < b.k; i++ {
+		pos := (h1 + uint64(i)*h2) % b.m
+		w, bit := pos/64, uint64(1)<<(pos%64)
+		if b.bits[w]&bit == 0 {
+			present = false
+			b.bits[w] |= bit
+		}
+	}
+	return present
+}
@@ -0,0 +1,273 @@
+// crawl_test.go
+package main
+
+import (
+	"fmt"
+	"net"
+	"net/http"
+	"net/http/httptest"
+	"strings"
+	"sync"
+	"testing"
+	"time"
+)
+
+// -------------------------
+// Crawl Frontier Tests
+// -------------------------
+
+// crawlSite is one host of the test web: pages /p/0 .. /p/n-1, every page linking to
+// the next two pages of its own host, back to the root and to the root of every other
+// host. It records how many requests it served and the most it saw at once.
+type crawlSite struct {
+	pages int
+	peers []string // root URLs of the other hosts
+
+	mu       sync.Mutex
+	inflight int
+	peak     int
+	hits     map[string]int
+}
+
+func (s *crawlSite) ServeHTTP(w http.ResponseWriter, r *http.Request) {
+	s.mu.Lock()
+	s.inflight++
+	if s.inflight > s.peak {
+		s.peak = s.inflight
+	}
+	s.hits[r.URL.Path]++
+	s.mu.Unlock()
+	defer func() {
+		s.mu.Lock()
+		s.inflight--
+		s.mu.Unlock()
+	}()
+
+	time.Sleep(2 * time.Millisecond) // let other workers pile up on this host
+
+	var n int
+	if r.URL.Path != "/" {
+		if _, err := fmt.Sscanf(r.URL.Path, "/p/%d", &n); err != nil || n >= s.pages {
+			http.NotFound(w, r)
+			return
+		}
+	}
+	w.Header().Set("Content-Type", "text/html; charset=utf-8")
+	fmt.Fprint(w, "<html><body>")
+	for i := n + 1; i <= n+2 && i < s.pages; i++ {
+		fmt.Fprintf(w, `<a href="/p/%d">next</a> <a href="/p/%d#frag">same page</a>`, i, i)
+	}
+	fmt.Fprint(w, `<a href="/">home</a> <a href="mailto:x@example.org">mail</a>`)
+	for _, p := range s.peers {
+		fmt.Fprintf(w, `<a href="%s/">peer</a>`, p)
+	}
+	fmt.Fprint(w, "</body></html>")
+}
+
+// startCrawlSites starts one site per loopback address 127.0.0.1 .. 127.0.0.n, so the
+// frontier sees n distinct hosts (ports do not count towards the host).
+func startCrawlSites(t *testing.T, n, pages int) ([]*crawlSite, []string) {
+	t.Helper()
+	sites := make([]*crawlSite, n)
+	roots := make([]string, n)
+	servers := make([]*httptest.Server, n)
+	for i := range sites {
+		ln, err := net.Listen("tcp", fmt.Sprintf("127.0.0.%d:0", i+1))
+		if err != nil {
+			t.Skipf("loopback address 127.0.0.%d not available: %v", i+1, err)
+		}
+		sites[i] = &crawlSite{pages: pages, hits: map[string]int{}}
+		servers[i] = &httptest.Server{Listener: ln, Config: &http.Server{Handler: sites[i]}}
+		servers[i].Start()
+		t.Cleanup(servers[i].Close)
+		roots[i] = servers[i].URL
+	}
+	for i := range sites {
+		for j, r := range roots {
+			if j != i {
+				sites[i].peers = append(sites[i].peers, r)
+			}
+		}
+	}
+	return sites, roots
+}
+
+// runCrawl drives f the way runScanPool does: workers take targets from Next, queue the
+// links of every fetched page with Add and then report the page with Done.
+func runCrawl(t *testing.T, f *crawlFrontier, workers int) []scanTarget {
+	t.Helper()
+	client := &http.Client{Timeout: 5 * time.Second}
+	var mu sync.Mutex
+	var fetched []scanTarget
+	var wg sync.WaitGroup
+	for w := 0; w < workers; w++ {
+		wg.Add(1)
+		go func() {
+			defer wg.Done()
+			for {
+				tgt, ok := f.Next()
+				if !ok {
+					return
+				}
+				mu.Lock()
+				fetched = append(fetched, tgt)
+				mu.Unlock()
+				resp, err := client.Get(tgt.URL)
+				if err == nil {
+					f.Add(tgt, extractLinks(resp.Body, tgt.URL))
+					resp.Body.Close()
+				} else {
+					t.Errorf("fetch %s: %v", tgt.URL, err)
+				}
+				f.Done(tgt.URL)
+			}
+		}()
+	}
+
+	finished := make(chan struct{})
+	go func() {
+		wg.Wait()
+		close(finished)
+	}()
+	select {
+	case <-finished:
+	case <-time.After(30 * time.Second):
+		t.Fatal("crawl did not finish")
+	}
+	return fetched
+}
+
+func seedList(urls ...string) func() (scanTarget, bool) {
+	i := 0
+	return func() (scanTarget, bool) {
+		if i >= len(urls) {
+			return scanTarget{}, false
+		}
+		u, err := canonicalURL(urls[i])
+		i++
+		if err != nil {
+			return scanTarget{}, false
+		}
+		return scanTarget{Raw: u, URL: u}, true
+	}
+}
+
+func TestCrawlFrontierMultiHost(t *testing.T) {
+	const hosts, pages, hostConns = 3, 12, 2
+	sites, roots := startCrawlSites(t, hosts, pages)
+
+	f := newCrawlFrontier(seedList(roots[0]+"/"), 100, 0, hostConns, 0, "all")
+	fetched := runCrawl(t, f, 8)
+
+	// every page of every host exactly once: the root, /p/1 .. /p/n-1 (/p/0 is never linked)
+	if want := hosts * pages; len(fetched) != want {
+		t.Errorf("fetched %d pages, want %d", len(fetched), want)
+	}
+	seen := map[string]bool{}
+	for _, tgt := range fetched {
+		if seen[tgt.URL] {
+			t.Errorf("%s fetched twice", tgt.URL)
+		}
+		seen[tgt.URL] = true
+		if tgt.Depth > 0 && tgt.Parent == "" {
+			t.Errorf("%s at depth %d has no parent", tgt.URL, tgt.Depth)
+		}
+	}
+	for i, s := range sites {
+		s.mu.Lock()
+		if s.peak > hostConns {
+			t.Errorf("host %d: %d concurrent requests, cap is %d", i, s.peak, hostConns)
+		}
+		for path, n := range s.hits {
+			if n != 1 {
+				t.Errorf("host %d: %s requested %d times", i, path, n)
+			}
+		}
+		s.mu.Unlock()
+	}
+	if want := hosts*pages - 1; f.Discovered != want {
+		t.Errorf("Discovered = %d, want %d", f.Discovered, want)
+	}
+}
+
+func TestCrawlFrontierLimits(t *testing.T) {
+	_, roots := startCrawlSites(t, 3, 20)
+
+	t.Run("host scope", func(t *testing.T) {
+		f := newCrawlFrontier(seedList(roots[1]+"/"), 100, 0, 0, 0, "host")
+		fetched := runCrawl(t, f, 4)
+		for _, tgt := range fetched {
+			if urlHost(tgt.URL) != "127.0.0.2" {
+				t.Errorf("left the seed host: %s", tgt.URL)
+			}
+		}
+		if len(fetched) != 20 {
+			t.Errorf("fetched %d pages, want 20", len(fetched))
+		}
+	})
+
+	t.Run("depth", func(t *testing.T) {
+		// root -> /p/1 /p/2 -> /p/3 /p/4 : depth 2 reaches five pages of the seed host
+		f := newCrawlFrontier(seedList(roots[0]+"/"), 2, 0, 0, 0, "host")
+		fetched := runCrawl(t, f, 4)
+		for _, tgt := range fetched {
+			if tgt.Depth > 2 {
+				t.Errorf("%s at depth %d", tgt.URL, tgt.Depth)
+			}
+		}
+		if len(fetched) != 5 {
+			t.Errorf("fetched %d pages, want 5", len(fetched))
+		}
+	})
+
+	t.Run("pages per host and total", func(t *testing.T) {
+		f := newCrawlFrontier(seedList(roots...), 100, 4, 0, 7, "all")
+		fetched := runCrawl(t, f, 4)
+		perHost := map[string]int{}
+		discovered := 0
+		for _, tgt := range fetched {
+			perHost[urlHost(tgt.URL)]++
+			if tgt.Depth > 0 {
+				discovered++
+			}
+		}
+		for h, n := range perHost {
+			if n > 4 {
+				t.Errorf("%s: %d pages scheduled, cap is 4", h, n)
+			}
+		}
+		// the seeds count towards the caps but are always scheduled
+		if len(fetched) > 7 || discovered != f.Discovered {
+			t.Errorf("fetched %d pages (%d discovered, frontier says %d), cap is 7",
+				len(fetched), discovered, f.Discovered)
+		}
+	})
+
+	t.Run("onion scope", func(t *testing.T) {
+		f := newCrawlFrontier(seedList(roots[2]+"/"), 100, 0, 0, 0, "onion")
+		fetched := runCrawl(t, f, 2)
+		if len(fetched) != 1 || !strings.HasPrefix(fetched[0].URL, roots[2]) {
+			t.Errorf("onion scope followed clearnet links: %v", fetched)
+		}
+	})
+}
+
+func TestBloomFilterNoFalseNegatives(t *testing.T) {
+	// probes add their keys too, so size for both sets
+	b := newBloomFilter(2000, 0.01)
+	for k := uint64(0); k < 1000; k++ {
+		b.TestAndAdd(k * 0x9E3779B97F4A7C15)
+	}
+	falsePos := 0
+	for k := uint64(0); k < 1000; k++ {
+		if !b.TestAndAdd(k * 0x9E3779B97F4A7C15) {
+			t.Fatalf("key %d lost", k)
+		}
+		if b.TestAndAdd(k*0x9E3779B97F4A7C15 + 1) {
+			falsePos++
+		}
+	}
+	if falsePos > 30 {
+		t.Errorf("%d false positives in 1000 lookups at p=0.01", falsePos)
+	}
+}
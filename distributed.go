@@ -0,0 +1,627 @@
+// distributed.go
+package main
+
+import (
+	"bytes"
+	"context"
+	"crypto/rand"
+	"encoding/hex"
+	"encoding/json"
+	"fmt"
+	"net/http"
+	"os"
+	"path/filepath"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Distributed Scan (-role coordinator | worker)
+// -------------------------
+
+// Protocol (JSON over HTTP, coordinator side):
+//
+//	POST /lease     leaseRequest  -> leaseResponse   a batch of planned targets
+//	POST /results   resultBatch   -> 204             finished results, streamed in batches
+//	POST /heartbeat heartbeat     -> 204             extends the node's leases
+//
+// The coordinator plans the targets exactly like a standalone scan (dedup, resume,
+// negative cache, history) and hands them out in leases of -lease-size. A lease that is
+// not extended within -lease-ttl (the node died or hung) expires and its unfinished
+// targets go back to the front of the queue for the next node. Results are accepted
+// once per target, so a slow node that reports after its lease was re-dispatched does
+// not produce duplicates. Accepted results go through the usual emit path, so the
+// coordinator's <out> holds the single merged result stream and summary; HTML and
+// screenshots stay on the node that fetched them.
+
+type leaseRequest struct {
+	Node string `json:"node"`
+	Max  int    `json:"max"`
+}
+
+type leaseResponse struct {
+	Lease   string       `json:"lease,omitempty"`
+	Targets []scanTarget `json:"targets,omitempty"`
+	TTLMS   int64        `json:"ttl_ms,omitempty"`
+	RetryMS int64        `json:"retry_ms,omitempty"` // nothing to hand out right now, ask again later
+	Done    bool         `json:"done,omitempty"`     // the scan is complete, the node can exit
+}
+
+type resultBatch struct {
+	Node    string       `json:"node"`
+	Results []wireResult `json:"results"`
+}
+
+// wireResult carries the fields of ScanResult that are not part of the result stream.
+type wireResult struct {
+	ScanResult
+	HostDead bool `json:"host_dead,omitempty"`
+}
+
+type heartbeat struct {
+	Node   string   `json:"node"`
+	Leases []string `json:"leases"`
+}
+
+// -------------------------
+// Coordinator
+// -------------------------
+
+type coordinator struct {
+	targets   func() (scanTarget, bool)
+	emit      func(ScanResult)
+	logPath   string
+	leaseSize int
+	ttl       time.Duration
+
+	mu       sync.Mutex
+	seq      int
+	leases   map[string]*scanLease
+	owner    map[string]*scanLease // target URL -> lease holding it (nil: requeued)
+	requeue  []scanTarget
+	srcDone  bool
+	finished chan struct{}
+	closed   bool
+
+	Leased     int
+	Expired    int
+	Duplicates int
+	nodes      map[string]time.Time
+}
+
+type scanLease struct {
+	ID       string
+	Node     string
+	Deadline time.Time
+	targets  []scanTarget
+	pending  int
+}
+
+func newCoordinator(targets func() (scanTarget, bool), emit func(ScanResult), logPath string, leaseSize int, ttl time.Duration) *coordinator {
+	return &coordinator{
+		targets:   targets,
+		emit:      emit,
+		logPath:   logPath,
+		leaseSize: leaseSize,
+		ttl:       ttl,
+		leases:    map[string]*scanLease{},
+		owner:     map[string]*scanLease{},
+		finished:  make(chan struct{}),
+		nodes:     map[string]time.Time{},
+	}
+}
+
+// Handler returns the coordinator's HTTP API (see Protocol above).
+func (c *coordinator) Handler() http.Handler {
+	mux := http.NewServeMux()
+	mux.HandleFunc("/lease", c.handleLease)
+	mux.HandleFunc("/results", c.handleResults)
+	mux.HandleFunc("/heartbeat", c.handleHeartbeat)
+	return mux
+}
+
+// runCoordinator serves leases on cfg.Listen until every target has a result.
+func runCoordinator(cfg Config, targets func() (scanTarget, bool), emit func(ScanResult), logPath string) error {
+	c := newCoordinator(targets, emit, logPath, cfg.LeaseSize, cfg.LeaseTTL)
+	srv := &http.Server{Addr: cfg.Listen, Handler: c.Handler(), ReadHeaderTimeout: 10 * time.Second}
+
+	errCh := make(chan error, 1)
+	go func() { errCh <- srv.ListenAndServe() }()
+	fmt.Printf("[INFO] Coordinator: listening on %s | Lease: %d targets, TTL %s\n", cfg.Listen, cfg.LeaseSize, cfg.LeaseTTL)
+
+	tick := time.NewTicker(time.Second)
+	defer tick.Stop()
+loop:
+	for {
+		select {
+		case err := <-errCh:
+			return err
+		case <-c.finished:
+			break loop
+		case <-tick.C:
+			c.expire()
+		}
+	}
+
+	// keep answering "done" for a moment so polling nodes exit cleanly
+	time.Sleep(2 * time.Second)
+	ctx, cancel := context.WithTimeout(context.Background(), 5*time.Second)
+	defer cancel()
+	_ = srv.Shutdown(ctx)
+	fmt.Printf("[INFO] Coordinator: %d leases | %d expired and re-dispatched | %d duplicate results dropped | %d nodes\n",
+		c.Leased, c.Expired, c.Duplicates, len(c.nodes))
+	return nil
+}
+
+func (c *coordinator) handleLease(w http.ResponseWriter, r *http.Request) {
+	var req leaseRequest
+	if !decodeRequest(w, r, &req) {
+		return
+	}
+	max := req.Max
+	if max < 1 || max > c.leaseSize {
+		max = c.leaseSize
+	}
+
+	c.mu.Lock()
+	c.nodes[req.Node] = time.Now()
+	var batch []scanTarget
+	for len(batch) < max && len(c.requeue) > 0 {
+		t := c.requeue[0]
+		c.requeue = c.requeue[1:]
+		if l, ok := c.owner[t.URL]; ok && l == nil {
+			batch = append(batch, t)
+		}
+	}
+	for len(batch) < max && !c.srcDone {
+		// planning may emit (invalid / negative-cache targets); that happens under c.mu
+		t, ok := c.targets()
+		if !ok {
+			c.srcDone = true
+			break
+		}
+		if _, dup := c.owner[t.URL]; dup {
+			continue
+		}
+		batch = append(batch, t)
+	}
+
+	var resp leaseResponse
+	switch {
+	case len(batch) > 0:
+		c.seq++
+		l := &scanLease{ID: fmt.Sprintf("L%06d", c.seq), Node: req.Node, Deadline: time.Now().Add(c.ttl), targets: batch, pending: len(batch)}
+		c.leases[l.ID] = l
+		for _, t := range batch {
+			c.owner[t.URL] = l
+		}
+		c.Leased++
+		resp = leaseResponse{Lease: l.ID, Targets: batch, TTLMS: c.ttl.Milliseconds()}
+		c.logLocked(fmt.Sprintf("[COORD][LEAS] %s -> %s (%d targets)", l.ID, req.Node, len(batch)))
+	case len(c.owner) == 0 && c.srcDone:
+		resp.Done = true
+		c.finishLocked()
+	default:
+		resp.RetryMS = 1000
+	}
+	c.mu.Unlock()
+
+	writeJSONResponse(w, resp)
+}
+
+func (c *coordinator) handleResults(w http.ResponseWriter, r *http.Request) {
+	var batch resultBatch
+	if !decodeRequest(w, r, &batch) {
+		return
+	}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.nodes[batch.Node] = time.Now()
+	for _, wr := range batch.Results {
+		res := wr.ScanResult
+		res.hostDead = wr.HostDead
+		l, ok := c.owner[res.Normalized]
+		if !ok {
+			c.Duplicates++
+			continue
+		}
+		delete(c.owner, res.Normalized)
+		if l != nil {
+			l.pending--
+			if l.pending <= 0 {
+				delete(c.leases, l.ID)
+			}
+		}
+		c.emit(res)
+	}
+	if len(c.owner) == 0 && c.srcDone {
+		c.finishLocked()
+	}
+	w.WriteHeader(http.StatusNoContent)
+}
+
+func (c *coordinator) handleHeartbeat(w http.ResponseWriter, r *http.Request) {
+	var hb heartbeat
+	if !decodeRequest(w, r, &hb) {
+		return
+	}
+	c.mu.Lock()
+	c.nodes[hb.Node] = time.Now()
+	deadline := time.Now().Add(c.ttl)
+	for _, id := range hb.Leases {
+		if l := c.leases[id]; l != nil && l.Node == hb.Node {
+			l.Deadline = deadline
+		}
+	}
+	c.mu.Unlock()
+	w.WriteHeader(http.StatusNoContent)
+}
+
+// expire returns the unfinished targets of overdue leases to the front of the queue.
+func (c *coordinator) expire() {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	now := time.Now()
+	var back []scanTarget
+	for id, l := range c.leases {
+		if now.Before(l.Deadline) {
+			continue
+		}
+		delete(c.leases, id)
+		c.Expired++
+		n := 0
+		for _, t := range l.targets {
+			if c.owner[t.URL] == l {
+				c.owner[t.URL] = nil
+				back = append(back, t)
+				n++
+			}
+		}
+		msg := fmt.Sprintf("[COORD][EXPR] %s of %s expired, %d targets re-queued", id, l.Node, n)
+		fmt.Println(msg)
+		c.logLocked(msg)
+	}
+	if len(back) > 0 {
+		c.requeue = append(back, c.requeue...)
+	}
+}
+
+func (c *coordinator) finishLocked() {
+	if !c.closed {
+		c.closed = true
+		close(c.finished)
+	}
+}
+
+func (c *coordinator) logLocked(msg string) {
+	logEvent(c.logPath, logEntry{Stage: "coordinator", Msg: msg})
+}
+
+func decodeRequest(w http.ResponseWriter, r *http.Request, v any) bool {
+	if r.Method != http.MethodPost {
+		http.Error(w, "POST only", http.StatusMethodNotAllowed)
+		return false
+	}
+	if err := json.NewDecoder(r.Body).Decode(v); err != nil {
+		http.Error(w, err.Error(), http.StatusBadRequest)
+		return false
+	}
+	return true
+}
+
+func writeJSONResponse(w http.ResponseWriter, v any) {
+	w.Header().Set("Content-Type", "application/json")
+	_ = json.NewEncoder(w).Encode(v)
+}
+
+// -------------------------
+// Worker Node
+// -------------------------
+
+// workerNode pulls leases from the coordinator, scans them with its own proxies and
+// streams the results back. A new lease is requested as soon as the workers have taken
+// every target of the current one, so the pipeline does not drain between leases.
+type workerNode struct {
+	id      string
+	base    string
+	client  *http.Client
+	logPath string
+	max     int
+
+	retry    time.Duration // wait between failed lease requests
+	maxFails int           // consecutive failed lease requests before the node gives up
+
+	mu       sync.Mutex
+	leaseOf  map[string]string // target URL -> lease ID
+	active   map[string]int    // lease ID -> results still missing
+	queue    []scanTarget
+	done     bool
+	outbox   []wireResult
+	flushReq chan struct{}
+	lost     bool // gave up on an unreachable coordinator
+}
+
+// Lease requests that fail this many times in a row (2s apart) end the node.
+const leaseMaxFailures = 15
+
+// runWorkerNode is main for -role worker.
+func runWorkerNode(cfg Config) int {
+	htmlDir := filepath.Join(cfg.OutDir, "html")
+	shotDir := filepath.Join(cfg.OutDir, "screenshots")
+	if err := os.MkdirAll(htmlDir, 0755); err != nil {
+		fmt.Println("[FATAL] output dir create failed:", err)
+		return 1
+	}
+	if cfg.TakeScreenshots {
+		if err := os.MkdirAll(shotDir, 0755); err != nil {
+			fmt.Println("[FATAL] screenshots dir create failed:", err)
+			return 1
+		}
+	}
+	archive, err := openHTMLArchive(htmlDir, filepath.Join(cfg.OutDir, "html_manifest.jsonl"), cfg.MaxBody, cfg.HTMLCompress)
+	if err != nil {
+		fmt.Println("[FATAL] html archive open failed:", err)
+		return 1
+	}
+	var revisit *validatorCache
+	if cfg.Revisit {
+		revisit, err = loadValidatorCache(filepath.Join(cfg.OutDir, "revisit_cache.json"))
+		if err != nil {
+			fmt.Println("[WARN] revisit cache read failed, starting empty:", err)
+		}
+	}
+	proxies, err := torProxyPool(cfg)
+	if err != nil {
+		fmt.Println("[FATAL] tor client init failed:", err)
+		return 1
+	}
+	logPath := filepath.Join(cfg.OutDir, "scan_report.log")
+	if cfg.CheckTor && !checkTor(proxies.Client(cfg.Timeout, 0), logPath) {
+		fmt.Println("[WARN] Tor check failed. Continue anyway (you may not be using Tor).")
+	}
+	var shots *browserPool
+	if cfg.TakeScreenshots {
+		shots = newBrowserPool(proxies.Addrs(), cfg.Browsers, cfg.BrowserTabs, cfg.BrowserRecycle)
+	}
+
+	n := &workerNode{
+		id:       cfg.NodeID,
+		base:     strings.TrimRight(cfg.Coordinator, "/"),
+		client:   &http.Client{Timeout: 30 * time.Second},
+		logPath:  logPath,
+		max:      cfg.LeaseSize,
+		retry:    2 * time.Second,
+		maxFails: leaseMaxFailures,
+		leaseOf:  map[string]string{},
+		active:   map[string]int{},
+		flushReq: make(chan struct{}, 1),
+	}
+	fmt.Printf("[INFO] Worker node %s | Coordinator: %s | Proxy: %s | Workers: %d\n", n.id, n.base, cfg.ProxyAddr, cfg.Workers)
+
+	stop := make(chan struct{})
+	var bg sync.WaitGroup
+	bg.Add(2)
+	go func() { defer bg.Done(); n.heartbeatLoop(cfg.LeaseTTL/3, stop) }()
+	go func() { defer bg.Done(); n.flushLoop(time.Second, stop) }()
+
+	start := time.Now()
+	emit := func(r ScanResult) {
+		revisit.Observe(r)
+		n.add(r)
+	}
+	runScanPool(cfg, proxies, shots, n.Next, nil, archive, revisit, shotDir, logPath, emit)
+
+	close(stop)
+	bg.Wait()
+	n.flush()
+	if shots != nil {
+		shots.Close()
+	}
+	if err := archive.Close(); err != nil {
+		fmt.Println("[WARN] html manifest close failed:", err)
+	}
+	if revisit != nil {
+		if err := revisit.Save(); err != nil {
+			fmt.Println("[WARN] revisit cache write failed:", err)
+		}
+	}
+	for _, line := range proxies.Report() {
+		logLine(logPath, "[INFO] Proxy "+line)
+		fmt.Println("[INFO] Proxy", line)
+	}
+	closeLogs()
+	if n.lost {
+		return 1
+	}
+	fmt.Printf("[DONE] Worker node %s finished in %s\n", n.id, time.Since(start).Round(time.Second))
+	return 0
+}
+
+// Next is the target iterator for runScanPool: it serves the current lease and asks
+// the coordinator for the next one when it runs dry.
+func (n *workerNode) Next() (scanTarget, bool) {
+	fails := 0
+	for {
+		n.mu.Lock()
+		if len(n.queue) > 0 {
+			t := n.queue[0]
+			n.queue = n.queue[1:]
+			n.mu.Unlock()
+			return t, true
+		}
+		if n.done {
+			n.mu.Unlock()
+			return scanTarget{}, false
+		}
+		n.mu.Unlock()
+
+		var resp leaseResponse
+		if err := n.post("/lease", leaseRequest{Node: n.id, Max: n.max}, &resp); err != nil {
+			fails++
+			msg := fmt.Sprintf("[NODE][ERR ] lease request failed (%d/%d): %v", fails, n.maxFails, err)
+			fmt.Println(msg)
+			logLine(n.logPath, msg)
+			if fails >= n.maxFails {
+				n.giveUp()
+				return scanTarget{}, false
+			}
+			time.Sleep(n.retry)
+			continue
+		}
+		fails = 0
+		switch {
+		case resp.Done:
+			n.mu.Lock()
+			n.done = true
+			n.mu.Unlock()
+		case len(resp.Targets) > 0:
+			msg := fmt.Sprintf("[NODE][LEAS] %s: %d targets", resp.Lease, len(resp.Targets))
+			fmt.Println(msg)
+			logLine(n.logPath, msg)
+			n.mu.Lock()
+			for _, t := range resp.Targets {
+				n.leaseOf[t.URL] = resp.Lease
+			}
+			n.active[resp.Lease] = len(resp.Targets)
+			n.queue = resp.Targets
+			n.mu.Unlock()
+			n.heartbeat() // the first beat may be late if the lease TTL is short
+		default:
+			// our own results may be what the coordinator is waiting for
+			n.requestFlush()
+			time.Sleep(time.Duration(resp.RetryMS) * time.Millisecond)
+		}
+	}
+}
+
+// giveUp ends the node after the coordinator stopped answering: one last attempt to
+// deliver the queued results, then Next reports the end of the targets.
+func (n *workerNode) giveUp() {
+	n.flush()
+	n.mu.Lock()
+	n.done, n.lost = true, true
+	undelivered := len(n.outbox)
+	n.mu.Unlock()
+	msg := fmt.Sprintf("[NODE][ERR ] coordinator %s unreachable, giving up (%d results not delivered)", n.base, undelivered)
+	fmt.Println(msg)
+	logLine(n.logPath, msg)
+}
+
+// add queues a finished result for the coordinator.
+func (n *workerNode) add(r ScanResult) {
+	n.mu.Lock()
+	n.outbox = append(n.outbox, wireResult{ScanResult: r, HostDead: r.hostDead})
+	if id, ok := n.leaseOf[r.Normalized]; ok {
+		delete(n.leaseOf, r.Normalized)
+		if n.active[id]--; n.active[id] <= 0 {
+			delete(n.active, id)
+		}
+	}
+	full := len(n.outbox) >= 50
+	n.mu.Unlock()
+	if full {
+		n.requestFlush()
+	}
+}
+
+func (n *workerNode) requestFlush() {
+	select {
+	case n.flushReq <- struct{}{}:
+	default:
+	}
+}
+
+func (n *workerNode) flushLoop(every time.Duration, stop chan struct{}) {
+	t := time.NewTicker(every)
+	defer t.Stop()
+	for {
+		select {
+		case <-stop:
+			return
+		case <-t.C:
+		case <-n.flushReq:
+		}
+		n.flush()
+	}
+}
+
+// flush sends the queued results; on failure they stay queued for the next attempt.
+func (n *workerNode) flush() {
+	n.mu.Lock()
+	batch := n.outbox
+	n.outbox = nil
+	n.mu.Unlock()
+	if len(batch) == 0 {
+		return
+	}
+	if err := n.post("/results", resultBatch{Node: n.id, Results: batch}, nil); err != nil {
+		msg := fmt.Sprintf("[NODE][ERR ] sending %d results failed: %v", len(batch), err)
+		fmt.Println(msg)
+		logLine(n.logPath, msg)
+		n.mu.Lock()
+		n.outbox = append(batch, n.outbox...)
+		n.mu.Unlock()
+	}
+}
+
+func (n *workerNode) heartbeatLoop(every time.Duration, stop chan struct{}) {
+	if every < time.Second {
+		every = time.Second
+	}
+	t := time.NewTicker(every)
+	defer t.Stop()
+	for {
+		select {
+		case <-stop:
+			return
+		case <-t.C:
+			n.heartbeat()
+		}
+	}
+}
+
+func (n *workerNode) heartbeat() {
+	n.mu.Lock()
+	ids := make([]string, 0, len(n.active))
+	for id := range n.active {
+		ids = append(ids, id)
+	}
+	n.mu.Unlock()
+	if len(ids) == 0 {
+		return
+	}
+	if err := n.post("/heartbeat", heartbeat{Node: n.id, Leases: ids}, nil); err != nil {
+		fmt.Println("[NODE][WARN] heartbeat failed:", err)
+	}
+}
+
+func (n *workerNode) post(path string, in, out any) error {
+	body, err := json.Marshal(in)
+	if err != nil {
+		return err
+	}
+	resp, err := n.client.Post(n.base+path, "application/json", bytes.NewReader(body))
+	if err != nil {
+		return err
+	}
+	defer resp.Body.Close()
+	if resp.StatusCode >= 300 {
+		return fmt.Errorf("coordinator answered %s", resp.Status)
+	}
+	if out == nil {
+		return nil
+	}
+	return json.NewDecoder(resp.Body).Decode(out)
+}
+
+// defaultNodeID is hostname-pid-random, unique enough for local multi-process tests.
+func defaultNodeID() string {
+	host, err := os.Hostname()
+	if err != nil || host == "" {
+		host = "node"
+	}
+	var b [2]byte
+	_, _ = rand.Read(b[:])
+	return fmt.Sprintf("%s-%d-%s", host, os.Getpid(), hex.EncodeToString(b[:]))
+}
@@ -0,0 +1,264 @@
+// distributed_test.go
+package main
+
+import (
+	"fmt"
+	"net/http"
+	"net/http/httptest"
+	"path/filepath"
+	"sync"
+	"testing"
+	"time"
+)
+
+// -------------------------
+// Coordinator / Worker Node Tests
+// -------------------------
+
+// testCoordinator serves a coordinator for n synthetic targets on a loopback port and
+// collects what it emits.
+type testCoordinator struct {
+	*coordinator
+	srv *httptest.Server
+
+	mu      sync.Mutex
+	emitted map[string]int
+}
+
+func startTestCoordinator(t *testing.T, n, leaseSize int, ttl time.Duration) *testCoordinator {
+	t.Helper()
+	i := 0
+	next := func() (scanTarget, bool) {
+		if i >= n {
+			return scanTarget{}, false
+		}
+		u := fmt.Sprintf("http://site%03d.example/", i)
+		i++
+		return scanTarget{Raw: u, URL: u}, true
+	}
+	tc := &testCoordinator{emitted: map[string]int{}}
+	emit := func(r ScanResult) {
+		tc.mu.Lock()
+		tc.emitted[r.Normalized]++
+		tc.mu.Unlock()
+	}
+	logPath := filepath.Join(t.TempDir(), "coordinator.log")
+	tc.coordinator = newCoordinator(next, emit, logPath, leaseSize, ttl)
+	tc.srv = httptest.NewServer(tc.Handler())
+	t.Cleanup(func() {
+		tc.srv.Close()
+		closeLogs()
+	})
+	return tc
+}
+
+// counters reads the coordinator's counters under its lock (the handlers run on the
+// server's goroutines).
+func (tc *testCoordinator) counters() (expired, duplicates, nodes int) {
+	tc.coordinator.mu.Lock()
+	defer tc.coordinator.mu.Unlock()
+	return tc.Expired, tc.Duplicates, len(tc.nodes)
+}
+
+// results returns how often each target was emitted.
+func (tc *testCoordinator) results() map[string]int {
+	tc.mu.Lock()
+	defer tc.mu.Unlock()
+	out := make(map[string]int, len(tc.emitted))
+	for u, n := range tc.emitted {
+		out[u] = n
+	}
+	return out
+}
+
+func newTestNode(t *testing.T, id, base string, max int) *workerNode {
+	return &workerNode{
+		id:       id,
+		base:     base,
+		client:   &http.Client{Timeout: 5 * time.Second},
+		logPath:  filepath.Join(t.TempDir(), id+".log"),
+		max:      max,
+		retry:    10 * time.Millisecond,
+		maxFails: leaseMaxFailures,
+		leaseOf:  map[string]string{},
+		active:   map[string]int{},
+		flushReq: make(chan struct{}, 1),
+	}
+}
+
+// runTestNode plays runWorkerNode with a scan pool that answers every target at once.
+func runTestNode(n *workerNode, ttl time.Duration, scanned *int) {
+	stop := make(chan struct{})
+	var bg sync.WaitGroup
+	bg.Add(2)
+	go func() { defer bg.Done(); n.heartbeatLoop(ttl/3, stop) }()
+	go func() { defer bg.Done(); n.flushLoop(50*time.Millisecond, stop) }()
+	for {
+		t, ok := n.Next()
+		if !ok {
+			break
+		}
+		*scanned++
+		n.add(ScanResult{URL: t.Raw, Normalized: t.URL, Active: true})
+	}
+	close(stop)
+	bg.Wait()
+	n.flush()
+}
+
+func TestCoordinatorTwoNodes(t *testing.T) {
+	const targets = 120
+	tc := startTestCoordinator(t, targets, 7, time.Minute)
+
+	var wg sync.WaitGroup
+	scanned := make([]int, 2)
+	for i := range scanned {
+		n := newTestNode(t, fmt.Sprintf("node%d", i+1), tc.srv.URL, 7)
+		wg.Add(1)
+		go func(i int) {
+			defer wg.Done()
+			runTestNode(n, time.Minute, &scanned[i])
+		}(i)
+	}
+	wg.Wait()
+
+	select {
+	case <-tc.finished:
+	default:
+		t.Fatal("coordinator did not finish after both nodes exited")
+	}
+	emitted := tc.results()
+	if len(emitted) != targets {
+		t.Errorf("emitted %d targets, want %d", len(emitted), targets)
+	}
+	for u, n := range emitted {
+		if n != 1 {
+			t.Errorf("%s emitted %d times", u, n)
+		}
+	}
+	if scanned[0] == 0 || scanned[1] == 0 {
+		t.Errorf("work was not shared: node1=%d node2=%d", scanned[0], scanned[1])
+	}
+	if scanned[0]+scanned[1] != targets {
+		t.Errorf("nodes scanned %d targets, want %d", scanned[0]+scanned[1], targets)
+	}
+	if expired, dups, nodes := tc.counters(); expired != 0 || dups != 0 || nodes != 2 {
+		t.Errorf("expired=%d duplicates=%d nodes=%d", expired, dups, nodes)
+	}
+}
+
+func TestCoordinatorLeaseExpiry(t *testing.T) {
+	const ttl = 300 * time.Millisecond
+	tc := startTestCoordinator(t, 10, 4, ttl)
+
+	// node1 takes a lease and then goes quiet
+	dead := newTestNode(t, "node1", tc.srv.URL, 4)
+	var stale leaseResponse
+	if err := dead.post("/lease", leaseRequest{Node: dead.id, Max: 4}, &stale); err != nil {
+		t.Fatal(err)
+	}
+	if len(stale.Targets) != 4 {
+		t.Fatalf("lease has %d targets, want 4", len(stale.Targets))
+	}
+
+	// a heartbeat from another node does not extend it, one from the holder does
+	time.Sleep(ttl * 2 / 3)
+	if err := dead.post("/heartbeat", heartbeat{Node: "node2", Leases: []string{stale.Lease}}, nil); err != nil {
+		t.Fatal(err)
+	}
+	if err := dead.post("/heartbeat", heartbeat{Node: dead.id, Leases: []string{stale.Lease}}, nil); err != nil {
+		t.Fatal(err)
+	}
+	time.Sleep(ttl * 2 / 3)
+	tc.expire()
+	if expired, _, _ := tc.counters(); expired != 0 {
+		t.Fatalf("lease expired although it was extended")
+	}
+
+	time.Sleep(ttl + 50*time.Millisecond)
+	tc.expire()
+	if expired, _, _ := tc.counters(); expired != 1 {
+		t.Fatalf("Expired = %d, want 1", expired)
+	}
+
+	// the re-queued targets go out first, to whoever asks next
+	live := newTestNode(t, "node2", tc.srv.URL, 4)
+	var next leaseResponse
+	if err := live.post("/lease", leaseRequest{Node: live.id, Max: 4}, &next); err != nil {
+		t.Fatal(err)
+	}
+	for i, tgt := range next.Targets {
+		if tgt.URL != stale.Targets[i].URL {
+			t.Errorf("lease %s target %d = %s, want re-queued %s", next.Lease, i, tgt.URL, stale.Targets[i].URL)
+		}
+	}
+	var results []wireResult
+	for _, tgt := range next.Targets {
+		results = append(results, wireResult{ScanResult: ScanResult{Normalized: tgt.URL, Active: true}})
+	}
+	if err := live.post("/results", resultBatch{Node: live.id, Results: results}, nil); err != nil {
+		t.Fatal(err)
+	}
+
+	// the late node reports its expired lease after all: dropped as duplicates
+	var late []wireResult
+	for _, tgt := range stale.Targets {
+		late = append(late, wireResult{ScanResult: ScanResult{Normalized: tgt.URL}})
+	}
+	if err := dead.post("/results", resultBatch{Node: dead.id, Results: late}, nil); err != nil {
+		t.Fatal(err)
+	}
+	if _, dups, _ := tc.counters(); dups != len(stale.Targets) {
+		t.Errorf("Duplicates = %d, want %d", dups, len(stale.Targets))
+	}
+
+	// node2 finishes the rest
+	scanned := 0
+	runTestNode(live, ttl, &scanned)
+	if scanned != 6 {
+		t.Errorf("node2 scanned %d more targets, want 6", scanned)
+	}
+	emitted := tc.results()
+	if len(emitted) != 10 {
+		t.Errorf("emitted %d targets, want 10", len(emitted))
+	}
+	for u, n := range emitted {
+		if n != 1 {
+			t.Errorf("%s emitted %d times", u, n)
+		}
+	}
+}
+
+func TestWorkerNodeGivesUp(t *testing.T) {
+	tc := startTestCoordinator(t, 10, 4, time.Minute)
+	n := newTestNode(t, "node1", tc.srv.URL, 4)
+	n.maxFails = 3
+	tgt, ok := n.Next()
+	if !ok {
+		t.Fatal("no lease from a live coordinator")
+	}
+	n.add(ScanResult{URL: tgt.Raw, Normalized: tgt.URL, Active: true})
+	n.mu.Lock()
+	n.queue = nil // the rest of the lease is lost with the coordinator
+	n.mu.Unlock()
+	tc.srv.Close()
+
+	done := make(chan bool)
+	go func() {
+		_, ok := n.Next()
+		done <- ok
+	}()
+	select {
+	case ok := <-done:
+		if ok {
+			t.Fatal("Next returned a target without a coordinator")
+		}
+	case <-time.After(10 * time.Second):
+		t.Fatal("worker node kept retrying a dead coordinator")
+	}
+	n.mu.Lock()
+	defer n.mu.Unlock()
+	if !n.lost || len(n.outbox) != 1 {
+		t.Errorf("lost=%v undelivered=%d, want true and 1", n.lost, len(n.outbox))
+	}
+}
@@ -0,0 +1,127 @@
+// errclass.go
+package main
+
+import (
+	"context"
+	"crypto/tls"
+	"crypto/x509"
+	"errors"
+	"fmt"
+	"math/rand"
+	"net"
+	"strings"
+	"time"
+)
+
+// -------------------------
+// Error Taxonomy + Retry Policy
+// -------------------------
+
+// errorClass is the structured form of a failed request. String() is what ends up in
+// ScanResult.ErrorClass, e.g. "socks:0xF0", "timeout:ttfb", "tls-cert", "http:503".
+type errorClass struct {
+	Kind  string // socks, proxy, timeout, tls-cert, tls, http, invalid, network
+	Code  int    // SOCKS reply code or HTTP status
+	Phase string // phase the request was in (see phaseTimes.phase)
+}
+
+func (c errorClass) String() string {
+	switch c.Kind {
+	case "socks":
+		return fmt.Sprintf("socks:0x%02X", c.Code)
+	case "http":
+		return fmt.Sprintf("http:%d", c.Code)
+	case "timeout":
+		return "timeout:" + c.Phase
+	default:
+		return c.Kind
+	}
+}
+
+// classifyError maps an error from the fetch or probe path to an errorClass.
+func classifyError(err error, status int, phase string) errorClass {
+	c := errorClass{Kind: "network", Phase: phase}
+
+	var se *socksError
+	var certErr *tls.CertificateVerificationError
+	var unknownAuth x509.UnknownAuthorityError
+	var hostErr x509.HostnameError
+	var invalidCert x509.CertificateInvalidError
+	var recErr tls.RecordHeaderError
+	var netErr net.Error
+
+	switch {
+	case errors.As(err, &se):
+		c.Kind, c.Code = "socks", int(se.Code)
+	case isProxyUnreachable(err):
+		c.Kind = "proxy"
+	case errors.As(err, &certErr), errors.As(err, &unknownAuth), errors.As(err, &hostErr), errors.As(err, &invalidCert):
+		c.Kind = "tls-cert"
+	case errors.As(err, &recErr):
+		c.Kind = "tls"
+	case errors.Is(err, context.DeadlineExceeded), strings.Contains(err.Error(), "timeout"),
+		errors.As(err, &netErr) && netErr.Timeout():
+		c.Kind = "timeout"
+	case status != 0 && (status < 200 || status >= 300):
+		c.Kind, c.Code = "http", status
+	}
+	return c
+}
+
+// Retryable reports whether another attempt may succeed. Onion circuit failures are
+// often transient (intro/rendezvous failed, TTL expired); "descriptor not found" is the
+// normal answer for a dead onion and, like bad addresses, missing client auth and HTTP
+// client errors, is not retried (the negative cache takes it from there).
+func (c errorClass) Retryable() bool {
+	switch c.Kind {
+	case "proxy":
+		return true // the pool benches the endpoint and picks another one
+	case "socks":
+		switch c.Code {
+		case 0x01, 0x06, 0xF2, 0xF3, 0xF7:
+			return true
+		}
+		return false
+	case "timeout":
+		return c.Phase != "body"
+	case "http":
+		return c.Code == 429 || c.Code == 502 || c.Code == 503 || c.Code == 504
+	case "network", "tls":
+		return true
+	default:
+		return false
+	}
+}
+
+// CircuitFailure reports whether Tor failed to build or use a circuit (rendezvous or
+// intro failed, TTL expired, general failure), as opposed to an answer about the target
+// such as "descriptor not found" or "bad address". Only these warrant a NEWNYM.
+func (c errorClass) CircuitFailure() bool {
+	if c.Kind != "socks" {
+		return false
+	}
+	switch c.Code {
+	case 0x01, 0x06, 0xF2, 0xF3, 0xF7:
+		return true
+	}
+	return false
+}
+
+// HostDead reports whether the failure says the host itself is unreachable, which is
+// what the negative cache remembers. HTTP errors mean the host is up.
+func (c errorClass) HostDead() bool {
+	switch c.Kind {
+	case "socks":
+		return c.Code != 0x02 && c.Code != 0x07 && c.Code != 0x08
+	case "timeout":
+		return c.Phase == "socks"
+	default:
+		return false
+	}
+}
+
+// retryBackoff returns a jittered exponential delay: base * 2^(attempt-1) * [0.5, 1.5).
+func retryBackoff(base time.Duration, attempt int) time.Duration {
+	d := base << uint(minInt(attempt-1, 6))
+	return time.Duration(float64(d) * (0.5 + rand.Float64()))
+}
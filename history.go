@@ -0,0 +1,286 @@
+// history.go
+package main
+
+import (
+	"bufio"
+	"encoding/json"
+	"os"
+	"sort"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Scan History (per-host latency + liveness)
+// -------------------------
+
+const historySamples = 16
+
+// scanHistory keeps a small per-host record of earlier scans: the last successful fetch
+// durations and how often the host was alive or dead. It is kept in
+// <out>/host_history.json and bootstrapped from an existing result stream.
+type scanHistory struct {
+	path string
+
+	mu    sync.Mutex
+	hosts map[string]*hostHistory
+	dirty bool
+}
+
+type hostHistory struct {
+	SamplesMS  []int64   `json:"samples_ms,omitempty"`
+	Alive      int       `json:"alive"`
+	Dead       int       `json:"dead"`
+	ConsecDead int       `json:"consec_dead"`
+	LastAlive  time.Time `json:"last_alive,omitempty"`
+}
+
+// quantile returns the q-quantile (0..1) of the latency samples.
+func (h *hostHistory) quantile(q float64) time.Duration {
+	if len(h.SamplesMS) == 0 {
+		return 0
+	}
+	s := append([]int64(nil), h.SamplesMS...)
+	sort.Slice(s, func(i, j int) bool { return s[i] < s[j] })
+	idx := int(q*float64(len(s)-1) + 0.5)
+	return time.Duration(s[idx]) * time.Millisecond
+}
+
+// loadScanHistory reads the history at path. Without one, bootstrapPath (a result
+// stream of an earlier run) is replayed instead. The returned history is always usable.
+func loadScanHistory(path, bootstrapPath string) (*scanHistory, error) {
+	h := &scanHistory{path: path, hosts: map[string]*hostHistory{}}
+	err := loadJSONState(path, &h.hosts)
+	switch {
+	case err == nil:
+	case os.IsNotExist(err):
+		err = forEachResult(bootstrapPath, func(r ScanResult) error {
+			h.Observe(r)
+			return nil
+		})
+		if os.IsNotExist(err) {
+			err = nil
+		}
+	default:
+		h.hosts = nil
+	}
+	if h.hosts == nil {
+		h.hosts = map[string]*hostHistory{}
+	}
+	return h, err
+}
+
+// Observe adds a finished result to the history of its host.
+func (h *scanHistory) Observe(r ScanResult) {
+	host := urlHost(r.Normalized)
+	if host == "" || r.ErrorClass == "invalid" || r.ErrorClass == "negative-cache" {
+		return
+	}
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	e := h.hosts[host]
+	if e == nil {
+		e = &hostHistory{}
+		h.hosts[host] = e
+	}
+	h.dirty = true
+
+	// an HTTP error still means the host answered
+	if !r.Active && r.HTTPStatus == 0 {
+		e.Dead++
+		e.ConsecDead++
+		return
+	}
+	e.Alive++
+	e.ConsecDead = 0
+	e.LastAlive = time.Now().UTC()
+	if ts, err := time.Parse(time.RFC3339, r.TimestampUTC); err == nil {
+		e.LastAlive = ts
+	}
+	if r.Active && !r.Probe && r.DurationMS > 0 {
+		e.SamplesMS = append(e.SamplesMS, r.DurationMS)
+		if len(e.SamplesMS) > historySamples {
+			e.SamplesMS = e.SamplesMS[len(e.SamplesMS)-historySamples:]
+		}
+	}
+}
+
+// Lookup returns a copy of the host's history.
+func (h *scanHistory) Lookup(host string) (hostHistory, bool) {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	e, ok := h.hosts[host]
+	if !ok {
+		return hostHistory{}, false
+	}
+	return *e, true
+}
+
+// Len returns the number of hosts with history.
+func (h *scanHistory) Len() int {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	return len(h.hosts)
+}
+
+// Save writes the history back if it changed.
+func (h *scanHistory) Save() error {
+	h.mu.Lock()
+	defer h.mu.Unlock()
+	if !h.dirty {
+		return nil
+	}
+	if err := saveJSONState(h.path, h.hosts); err != nil {
+		return err
+	}
+	h.dirty = false
+	return nil
+}
+
+// -------------------------
+// History Scheduler (ordering + adaptive timeouts)
+// -------------------------
+
+// historyScheduler reorders the target stream by host history, one window of targets
+// at a time (the stream is never loaded as a whole): hosts that were alive and fast go
+// first, unknown hosts next, flaky ones after them. Hosts that failed deadAfter times
+// in a row are spilled to a temp file and scanned last, with a short timeout. Alive
+// hosts with enough samples get an adaptive timeout of p95 * factor, clamped to
+// [minTimeout, maxTimeout].
+type historyScheduler struct {
+	src        func() (scanTarget, bool)
+	history    *scanHistory
+	window     int
+	factor     float64
+	minTimeout time.Duration
+	maxTimeout time.Duration
+	deadAfter  int
+	deadTime   time.Duration
+	tailDir    string
+
+	buf     []scheduled
+	pos     int
+	srcDone bool
+
+	tail     *os.File
+	tailW    *bufio.Writer
+	tailR    *bufio.Scanner
+	tailRead bool
+
+	FastTracked int
+	Tail        int
+}
+
+type scheduled struct {
+	t    scanTarget
+	rank int // 0 alive, 1 unknown, 2 flaky, 3 dead (no tail file)
+	p50  time.Duration
+}
+
+// Next returns the next target in scheduled order.
+func (s *historyScheduler) Next() (scanTarget, bool) {
+	for {
+		if s.pos < len(s.buf) {
+			t := s.buf[s.pos].t
+			s.pos++
+			return t, true
+		}
+		if !s.srcDone {
+			s.fill()
+			continue
+		}
+		return s.nextTail()
+	}
+}
+
+func (s *historyScheduler) fill() {
+	s.buf, s.pos = s.buf[:0], 0
+	for len(s.buf) < s.window {
+		t, ok := s.src()
+		if !ok {
+			s.srcDone = true
+			break
+		}
+		e, known := s.history.Lookup(urlHost(t.URL))
+		switch {
+		case !known:
+			s.buf = append(s.buf, scheduled{t: t, rank: 1})
+		case e.ConsecDead >= s.deadAfter:
+			t.Timeout = s.deadTime
+			if s.maxTimeout > 0 && t.Timeout > s.maxTimeout {
+				t.Timeout = s.maxTimeout
+			}
+			s.spill(t)
+		case e.ConsecDead > 0:
+			s.buf = append(s.buf, scheduled{t: t, rank: 2})
+		default:
+			if len(e.SamplesMS) >= 3 {
+				t.Timeout = time.Duration(float64(e.quantile(0.95)) * s.factor)
+				if t.Timeout < s.minTimeout {
+					t.Timeout = s.minTimeout
+				}
+				if s.maxTimeout > 0 && t.Timeout > s.maxTimeout {
+					t.Timeout = s.maxTimeout
+				}
+			}
+			s.FastTracked++
+			s.buf = append(s.buf, scheduled{t: t, rank: 0, p50: e.quantile(0.5)})
+		}
+	}
+	sort.SliceStable(s.buf, func(i, j int) bool {
+		if s.buf[i].rank != s.buf[j].rank {
+			return s.buf[i].rank < s.buf[j].rank
+		}
+		return s.buf[i].p50 < s.buf[j].p50
+	})
+}
+
+// spill appends a target to the low-priority tail file; if the file cannot be used the
+// target is simply scheduled in the current window, last.
+func (s *historyScheduler) spill(t scanTarget) {
+	s.Tail++
+	if s.tail == nil {
+		f, err := os.CreateTemp(s.tailDir, ".tail-*.jsonl")
+		if err == nil {
+			s.tail, s.tailW = f, bufio.NewWriter(f)
+		}
+	}
+	if s.tail != nil {
+		if line, err := json.Marshal(t); err == nil {
+			_, _ = s.tailW.Write(append(line, '\n'))
+			return
+		}
+	}
+	s.buf = append(s.buf, scheduled{t: t, rank: 3})
+}
+
+func (s *historyScheduler) nextTail() (scanTarget, bool) {
+	if s.tail == nil {
+		return scanTarget{}, false
+	}
+	if !s.tailRead {
+		s.tailRead = true
+		if err := s.tailW.Flush(); err != nil {
+			return scanTarget{}, false
+		}
+		if _, err := s.tail.Seek(0, 0); err != nil {
+			return scanTarget{}, false
+		}
+		s.tailR = bufio.NewScanner(s.tail)
+	}
+	for s.tailR.Scan() {
+		var t scanTarget
+		if err := json.Unmarshal(s.tailR.Bytes(), &t); err == nil {
+			return t, true
+		}
+	}
+	return scanTarget{}, false
+}
+
+// Close removes the tail file.
+func (s *historyScheduler) Close() {
+	if s.tail != nil {
+		s.tail.Close()
+		os.Remove(s.tail.Name())
+	}
+}
@@ -0,0 +1,240 @@
+// logger.go
+package main
+
+import (
+	"bufio"
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"os"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Report Logger (async, batched, rotated)
+// -------------------------
+
+// logEntry is one report log event. Msg is the text line as printed to the console;
+// the other fields are filled in by the worker call sites and show up as typed fields
+// in -log-format=json.
+type logEntry struct {
+	Time   time.Time `json:"ts"`
+	Level  string    `json:"level,omitempty"`
+	Stage  string    `json:"stage,omitempty"` // plan, probe, fetch, render
+	Worker int       `json:"worker,omitempty"`
+	URL    string    `json:"url,omitempty"`
+	Phase  string    `json:"phase,omitempty"`
+	Status int       `json:"status,omitempty"`
+	Msg    string    `json:"msg"`
+}
+
+// logSettings are applied to every report logger opened afterwards (set once from flags).
+var logSettings = struct {
+	Format  string // text | json
+	MaxSize int64  // rotate when the file would grow past this (0 = never)
+	Keep    int    // rotated files kept (.1 .. .Keep)
+	Flush   time.Duration
+	Queue   int
+}{Format: "text", MaxSize: 100 << 20, Keep: 3, Flush: time.Second, Queue: 4096}
+
+var (
+	loggersMu sync.Mutex
+	loggers   = map[string]*asyncLogger{}
+)
+
+// asyncLogger owns one report file. Events go through a bounded channel to a single
+// writer goroutine that batches them into a buffered writer, flushes periodically and
+// on shutdown, and rotates the file by size. Producers block when the channel is full
+// rather than dropping report lines; events that arrive after closeLogs are dropped.
+type asyncLogger struct {
+	path string
+	ch   chan logEntry
+	done chan struct{}
+
+	mu     sync.RWMutex // held for reading while sending, for writing while closing ch
+	closed bool
+
+	f    *os.File
+	w    *bufio.Writer
+	size int64
+	buf  bytes.Buffer
+	enc  *json.Encoder
+}
+
+// logLine appends a text message to the report log at logPath.
+func logLine(logPath, msg string) {
+	logEvent(logPath, logEntry{Msg: msg})
+}
+
+// logEvent appends an event to the report log at logPath.
+func logEvent(logPath string, e logEntry) {
+	if e.Time.IsZero() {
+		e.Time = time.Now()
+	}
+	if e.Level == "" {
+		e.Level = levelFromMsg(e.Msg)
+	}
+	l := loggerFor(logPath)
+	l.mu.RLock()
+	if !l.closed {
+		l.ch <- e
+	}
+	l.mu.RUnlock()
+}
+
+func loggerFor(path string) *asyncLogger {
+	loggersMu.Lock()
+	defer loggersMu.Unlock()
+	if l, ok := loggers[path]; ok {
+		return l
+	}
+	l := &asyncLogger{
+		path: path,
+		ch:   make(chan logEntry, logSettings.Queue),
+		done: make(chan struct{}),
+	}
+	loggers[path] = l
+	go l.run()
+	return l
+}
+
+// closeLogs flushes and closes every report log. Call it before the process exits.
+// Closed loggers stay in the map, so later events for their paths are dropped instead
+// of starting a logger that nobody closes.
+func closeLogs() {
+	loggersMu.Lock()
+	defer loggersMu.Unlock()
+	for _, l := range loggers {
+		l.mu.Lock()
+		if l.closed {
+			l.mu.Unlock()
+			continue
+		}
+		l.closed = true
+		close(l.ch)
+		l.mu.Unlock()
+		<-l.done
+	}
+}
+
+// fatal prints a [FATAL] line, flushes the report logs and exits with status 1.
+func fatal(args ...interface{}) {
+	fmt.Println(append([]interface{}{"[FATAL]"}, args...)...)
+	closeLogs()
+	os.Exit(1)
+}
+
+func (l *asyncLogger) run() {
+	defer close(l.done)
+	tick := time.NewTicker(logSettings.Flush)
+	defer tick.Stop()
+	defer l.closeFile()
+
+	for {
+		select {
+		case e, ok := <-l.ch:
+			if !ok {
+				return
+			}
+			l.write(e)
+			// drain what is already queued as one batch
+			for n := len(l.ch); n > 0; n-- {
+				e, ok := <-l.ch
+				if !ok {
+					return
+				}
+				l.write(e)
+			}
+		case <-tick.C:
+			if l.w != nil {
+				if err := l.w.Flush(); err != nil {
+					fmt.Println("[WARN] log write failed:", err)
+				}
+			}
+		}
+	}
+}
+
+func (l *asyncLogger) write(e logEntry) {
+	l.buf.Reset()
+	if logSettings.Format == "json" {
+		if l.enc == nil {
+			l.enc = json.NewEncoder(&l.buf)
+			l.enc.SetEscapeHTML(false)
+		}
+		if err := l.enc.Encode(e); err != nil {
+			return
+		}
+	} else {
+		l.buf.WriteString(e.Time.Format(time.RFC3339))
+		l.buf.WriteByte(' ')
+		l.buf.WriteString(e.Msg)
+		l.buf.WriteByte('\n')
+	}
+	line := l.buf.Bytes()
+
+	if l.f != nil && logSettings.MaxSize > 0 && l.size+int64(len(line)) > logSettings.MaxSize {
+		l.rotate()
+	}
+	if l.f == nil && !l.open() {
+		return
+	}
+	n, err := l.w.Write(line)
+	l.size += int64(n)
+	if err != nil {
+		fmt.Println("[WARN] log write failed:", err)
+	}
+}
+
+func (l *asyncLogger) open() bool {
+	f, err := os.OpenFile(l.path, os.O_APPEND|os.O_CREATE|os.O_WRONLY, 0644)
+	if err != nil {
+		fmt.Println("[WARN] log write failed:", err)
+		return false
+	}
+	l.f, l.w, l.size = f, bufio.NewWriterSize(f, 64*1024), 0
+	if st, err := f.Stat(); err == nil {
+		l.size = st.Size()
+	}
+	return true
+}
+
+// rotate shifts path -> path.1 -> ... -> path.Keep (the oldest is dropped).
+func (l *asyncLogger) rotate() {
+	l.closeFile()
+	if logSettings.Keep < 1 {
+		_ = os.Remove(l.path)
+		return
+	}
+	for i := logSettings.Keep - 1; i >= 1; i-- {
+		_ = os.Rename(fmt.Sprintf("%s.%d", l.path, i), fmt.Sprintf("%s.%d", l.path, i+1))
+	}
+	_ = os.Rename(l.path, l.path+".1")
+}
+
+func (l *asyncLogger) closeFile() {
+	if l.f == nil {
+		return
+	}
+	if err := l.w.Flush(); err != nil {
+		fmt.Println("[WARN] log write failed:", err)
+	}
+	l.f.Close()
+	l.f, l.w = nil, nil
+}
+
+// levelFromMsg returns the last leading [TAG] of a message ("[W01][ERR ] ..." -> ERR).
+func levelFromMsg(msg string) string {
+	level := ""
+	for strings.HasPrefix(msg, "[") {
+		end := strings.IndexByte(msg, ']')
+		if end < 0 {
+			break
+		}
+		level = strings.TrimSpace(msg[1:end])
+		msg = msg[end+1:]
+	}
+	return level
+}
@@ -3,6 +3,7 @@ package main
 
 import (
 	"bufio"
+	"compress/gzip"
 	"context"
 	"crypto/sha1"
 	"encoding/hex"
@@ -10,18 +11,18 @@ import (
 	"flag"
 	"fmt"
 	"io"
-	"net"
 	"net/http"
+	"net/http/httptrace"
 	"os"
 	"path/filepath"
 	"regexp"
+	"sort"
 	"strings"
 	"sync"
+	"sync/atomic"
 	"time"
 
-	"github.com/chromedp/cdproto/page"
 	"github.com/chromedp/chromedp"
-	"golang.org/x/net/proxy"
 )
 
 type Config struct {
@@ -34,6 +35,90 @@ type Config struct {
 	TakeScreenshots   bool
 	ScreenshotTimeout time.Duration
 	ScreenshotWaitMS  int
+	Browsers          int
+	BrowserTabs       int
+	BrowserRecycle    int
+	ScreenshotWorkers int
+	ScreenshotQueue   int
+	ScreenshotSource  string
+	ScreenshotText    bool
+
+	ScreenshotBlock   string
+	ScreenshotWait    string
+	ScreenshotFormat  string
+	ScreenshotQuality int
+	ScreenshotThumb   int
+
+	Isolate            string
+	TorControl         string
+	TorControlPassword string
+	NewnymAfter        int
+
+	Mode         string
+	ProbeWorkers int
+	ProbeTimeout time.Duration
+
+	SocksTimeout time.Duration
+	TLSTimeout   time.Duration
+	TTFBTimeout  time.Duration
+	BodyTimeout  time.Duration
+
+	Dedup bool
+
+	Retries              int
+	RetryBackoff         time.Duration
+	HTTPFallback         bool
+	NegativeTTL          time.Duration
+	NegativeAction       string
+	NegativeProbeTimeout time.Duration
+
+	Changes         bool
+	ChangeThreshold float64
+	ShotChangedOnly bool
+
+	MaxBody      int64
+	HTMLCompress bool
+	Revisit      bool
+
+	Crawl          bool
+	CrawlDepth     int
+	CrawlHostPages int
+	CrawlHostConns int
+	CrawlMaxPages  int
+	CrawlScope     string
+
+	History            bool
+	HistoryWindow      int
+	HistoryFactor      float64
+	HistoryMinTimeout  time.Duration
+	HistoryDeadAfter   int
+	HistoryDeadTimeout time.Duration
+
+	ResultsPath   string
+	Resume        bool
+	FsyncEvery    int
+	FsyncInterval time.Duration
+
+	Role        string
+	Listen      string
+	Coordinator string
+	NodeID      string
+	LeaseSize   int
+	LeaseTTL    time.Duration
+
+	MetricsAddr string
+	LogFormat   string
+	LogMaxMB    int64
+	LogKeep     int
+
+	Bench      string
+	BenchPages int
+	BenchLines int
+
+	BenchWorkers  string
+	BenchLatency  time.Duration
+	BenchFail     float64
+	BenchSlowBody time.Duration
 }
 
 type ScanResult struct {
@@ -43,82 +128,392 @@ type ScanResult struct {
 	HTTPStatus      int    `json:"http_status,omitempty"`
 	Error           string `json:"error,omitempty"`
 	SavedHTML       string `json:"saved_html,omitempty"`
+	HTMLSHA256      string `json:"html_sha256,omitempty"`
+	HTMLBytes       int64  `json:"html_bytes,omitempty"`
+	BodyTruncated   bool   `json:"body_truncated,omitempty"`
+	NotModified     bool   `json:"not_modified,omitempty"`
 	SavedScreenshot string `json:"saved_screenshot,omitempty"`
+	SavedThumbnail  string `json:"saved_thumbnail,omitempty"`
 	ScreenshotError string `json:"screenshot_error,omitempty"`
 	TimestampUTC    string `json:"timestamp_utc"`
 	DurationMS      int64  `json:"duration_ms"`
+	SocksMS         int64  `json:"socks_ms,omitempty"`
+	TLSMS           int64  `json:"tls_ms,omitempty"`
+	TTFBMS          int64  `json:"ttfb_ms,omitempty"`
+	BodyMS          int64  `json:"body_ms,omitempty"`
+	FailedPhase     string `json:"failed_phase,omitempty"`
+	Probe           bool   `json:"probe,omitempty"`
+	SocksReply      int    `json:"socks_reply,omitempty"`
+	ErrorClass      string `json:"error_class,omitempty"`
+	Attempts        int    `json:"attempts,omitempty"`
+	FetchedURL      string `json:"fetched_url,omitempty"`
+	Depth           int    `json:"depth,omitempty"`
+	Parent          string `json:"parent,omitempty"`
+	LinksFound      int    `json:"links_found,omitempty"`
+	TimeoutMS       int64  `json:"timeout_ms,omitempty"`
+
+	// change detection against the last scan; Similarity is unset for new pages
+	Simhash    string   `json:"simhash,omitempty"`
+	Changed    bool     `json:"changed,omitempty"`
+	Similarity *float64 `json:"similarity,omitempty"`
+
+	hostDead bool // failure says the host is unreachable (feeds the negative cache)
 }
 
 func main() {
 	cfg := parseFlags()
+	logSettings.Format = cfg.LogFormat
+	logSettings.MaxSize = cfg.LogMaxMB << 20
+	logSettings.Keep = cfg.LogKeep
+
+	if cfg.Bench != "" {
+		code := runBenchmark(cfg)
+		closeLogs()
+		os.Exit(code)
+	}
+
+	if cfg.MetricsAddr != "" {
+		startMetricsServer(cfg.MetricsAddr)
+		fmt.Printf("[INFO] Metrics: http://%s/metrics (pprof: /debug/pprof/)\n", cfg.MetricsAddr)
+	}
+
+	// Distributed worker node: targets come from the coordinator
+	if cfg.Role == "worker" {
+		code := runWorkerNode(cfg)
+		closeLogs()
+		os.Exit(code)
+	}
 
 	// Output directories
 	htmlDir := filepath.Join(cfg.OutDir, "html")
 	shotDir := filepath.Join(cfg.OutDir, "screenshots")
 
 	if err := os.MkdirAll(htmlDir, 0755); err != nil {
-		fmt.Println("[FATAL] output dir create failed:", err)
-		os.Exit(1)
+		fatal("output dir create failed:", err)
 	}
 	if cfg.TakeScreenshots {
 		if err := os.MkdirAll(shotDir, 0755); err != nil {
-			fmt.Println("[FATAL] screenshots dir create failed:", err)
-			os.Exit(1)
+			fatal("screenshots dir create failed:", err)
 		}
 	}
 
+	// Content-addressed HTML archive (identical pages are stored once)
+	archive, err := openHTMLArchive(htmlDir, filepath.Join(cfg.OutDir, "html_manifest.jsonl"), cfg.MaxBody, cfg.HTMLCompress)
+	if err != nil {
+		fatal("html archive open failed:", err)
+	}
+
+	// Revisit cache: conditional requests for pages seen in earlier runs
+	var revisit *validatorCache
+	if cfg.Revisit {
+		revisit, err = loadValidatorCache(filepath.Join(cfg.OutDir, "revisit_cache.json"))
+		if err != nil {
+			fmt.Println("[WARN] revisit cache read failed, starting empty:", err)
+		}
+		fmt.Printf("[INFO] Revisit cache: %d URLs\n", revisit.Len())
+	}
+
 	logPath := filepath.Join(cfg.OutDir, "scan_report.log")
 	summaryPath := filepath.Join(cfg.OutDir, "scan_summary.log")
 	jsonPath := filepath.Join(cfg.OutDir, "scan_results.json")
+	changesPath := filepath.Join(cfg.OutDir, "scan_changes.log")
+	streamPath := cfg.ResultsPath
+	if streamPath == "" {
+		streamPath = filepath.Join(cfg.OutDir, "scan_results.jsonl")
+	}
 
-	// Read targets
-	targets, err := readTargets(cfg.TargetsPath)
+	// Open targets (streamed lazily, never loaded as a whole)
+	src, err := openTargets(cfg.TargetsPath)
 	if err != nil {
-		fmt.Println("[FATAL] targets read failed:", err)
-		os.Exit(1)
+		fatal("targets read failed:", err)
+	}
+	defer src.Close()
+
+	first, ok := src.Next()
+	if !ok {
+		if err := src.Err(); err != nil {
+			fatal("targets read failed:", err)
+		}
+		fatal("no targets found in", cfg.TargetsPath)
+	}
+
+	// Resume: skip targets that already have a record in the result stream
+	var done map[string]bool
+	if cfg.Resume {
+		done, err = loadCompletedURLs(streamPath)
+		if err != nil {
+			fatal("resume read failed:", err)
+		}
+		fmt.Printf("[INFO] Resume: %d targets already done\n", len(done))
+	}
+
+	// Host history (before the stream is truncated, it bootstraps a missing history)
+	var history *scanHistory
+	if cfg.History {
+		history, err = loadScanHistory(filepath.Join(cfg.OutDir, "host_history.json"), streamPath)
+		if err != nil {
+			fmt.Println("[WARN] host history read failed:", err)
+		}
+		fmt.Printf("[INFO] History: %d hosts | Window: %d | Timeout factor: %.1f x p95\n", history.Len(), cfg.HistoryWindow, cfg.HistoryFactor)
 	}
-	if len(targets) == 0 {
-		fmt.Println("[FATAL] no targets found in", cfg.TargetsPath)
-		os.Exit(1)
+
+	// Change detection: fingerprints of the last scan (also bootstrapped from its stream)
+	var pages *pageFingerprints
+	if cfg.Changes {
+		pages, err = loadPageFingerprints(filepath.Join(cfg.OutDir, "page_fingerprints.json"), streamPath)
+		if err != nil {
+			fmt.Println("[WARN] page fingerprints read failed:", err)
+		}
+		fmt.Printf("[INFO] Change detection: %d known pages | Threshold: %.2f | Screenshots of changed pages only: %v\n",
+			pages.Len(), cfg.ChangeThreshold, cfg.ShotChangedOnly)
 	}
 
-	// Tor SOCKS5 HTTP client
-	client, err := torHTTPClient(cfg.ProxyAddr, cfg.Timeout)
+	sink, err := openResultSink(streamPath, cfg.Resume, cfg.FsyncEvery, cfg.FsyncInterval)
 	if err != nil {
-		fmt.Println("[FATAL] tor client init failed:", err)
-		os.Exit(1)
+		fatal("result stream open failed:", err)
+	}
+	// from here on a fatal exit must not lose the pending fsync batch of the stream
+	fatalWithSink := func(args ...interface{}) {
+		if err := sink.Close(); err != nil {
+			fmt.Println("[WARN] result stream close failed:", err)
+		}
+		fatal(args...)
+	}
+	// Negative cache: hosts that failed recently are skipped or only probed briefly
+	var neg *negativeCache
+	if cfg.NegativeTTL > 0 {
+		neg, err = loadNegativeCache(filepath.Join(cfg.OutDir, "negative_cache.json"), cfg.NegativeTTL)
+		if err != nil {
+			fmt.Println("[WARN] negative cache read failed, starting empty:", err)
+		}
+		fmt.Printf("[INFO] Negative cache: %d hosts | TTL: %s | Action: %s\n", neg.Len(), cfg.NegativeTTL, cfg.NegativeAction)
+	}
+
+	emit := func(r ScanResult) {
+		if err := sink.Write(r); err != nil {
+			fmt.Println("[WARN] result stream write failed:", err)
+		}
+		if neg != nil {
+			neg.Observe(r)
+		}
+		revisit.Observe(r)
+		if history != nil {
+			history.Observe(r)
+		}
+		if pages != nil {
+			pages.Observe(r)
+		}
+	}
+
+	// Planning: canonicalize, dedup and validate before anything is dialed
+	planner := newTargetPlanner(cfg.Dedup)
+	skipped, negSkipped := 0, 0
+	nextTarget := func() (scanTarget, bool) {
+		for {
+			raw := first
+			if raw != "" {
+				first = ""
+			} else if next, ok := src.Next(); ok {
+				raw = next
+			} else {
+				return scanTarget{}, false
+			}
+
+			t, dup, err := planner.Plan(raw)
+			switch {
+			case done[t.URL]:
+				skipped++
+			case err != nil:
+				msg := fmt.Sprintf("[PLAN][ERR ] %s -> %v", raw, err)
+				fmt.Println(msg)
+				logEvent(logPath, logEntry{Stage: "plan", URL: raw, Msg: msg})
+				emit(ScanResult{
+					URL:          raw,
+					Normalized:   t.URL,
+					Error:        err.Error(),
+					ErrorClass:   "invalid",
+					TimestampUTC: time.Now().UTC().Format(time.RFC3339),
+				})
+			case dup:
+				logEvent(logPath, logEntry{Stage: "plan", URL: t.URL, Msg: fmt.Sprintf("[PLAN][DUP ] %s -> %s", raw, t.URL)})
+			default:
+				if neg == nil {
+					return t, true
+				}
+				e, hit := neg.Lookup(t.URL)
+				if !hit {
+					return t, true
+				}
+				if cfg.NegativeAction == "probe" {
+					t.Suspect = true
+					return t, true
+				}
+				negSkipped++
+				msg := fmt.Sprintf("[PLAN][NEG ] %s -> skipped (%s)", t.URL, e)
+				fmt.Println(msg)
+				logEvent(logPath, logEntry{Stage: "plan", URL: t.URL, Msg: msg})
+				emit(ScanResult{
+					URL:          raw,
+					Normalized:   t.URL,
+					Error:        "skipped: failed recently (" + e.String() + ")",
+					ErrorClass:   "negative-cache",
+					TimestampUTC: time.Now().UTC().Format(time.RFC3339),
+				})
+			}
+		}
+	}
+
+	// Tor SOCKS5 proxy pool (one or more endpoints, isolated circuits)
+	proxies, err := torProxyPool(cfg)
+	if err != nil {
+		fatalWithSink("tor client init failed:", err)
 	}
 
 	// Optional Tor verification (for report proof)
 	if cfg.CheckTor {
-		ok := checkTor(client, logPath)
+		ok := checkTor(proxies.Client(cfg.Timeout, 0), logPath)
 		if !ok {
 			fmt.Println("[WARN] Tor check failed. Continue anyway (you may not be using Tor).")
 		}
 	}
 
-	fmt.Printf("[INFO] Loaded %d targets\n", len(targets))
+	fmt.Printf("[INFO] Targets: streaming from %s\n", cfg.TargetsPath)
 	fmt.Printf("[INFO] Proxy: %s | Timeout: %s | Workers: %d | Screenshots: %v\n",
 		cfg.ProxyAddr, cfg.Timeout, cfg.Workers, cfg.TakeScreenshots)
+	fmt.Printf("[INFO] Mode: %s | Probe workers: %d | Probe timeout: %s\n", cfg.Mode, cfg.ProbeWorkers, cfg.ProbeTimeout)
+	fmt.Printf("[INFO] Proxy endpoints: %d | Isolation: %s | Control ports: %d\n",
+		len(proxies.Addrs()), cfg.Isolate, len(proxies.controls))
 	fmt.Printf("[INFO] Output: %s\n", cfg.OutDir)
+	if cfg.TakeScreenshots {
+		fmt.Printf("[INFO] Browsers: %d x %d tabs | Recycle after: %d pages | Render workers: %d | Queue: %d\n",
+			cfg.Browsers, cfg.BrowserTabs, cfg.BrowserRecycle, cfg.ScreenshotWorkers, cfg.ScreenshotQueue)
+		fmt.Printf("[INFO] Screenshot source: %s | Text-only: %v\n", cfg.ScreenshotSource, cfg.ScreenshotText)
+		block := cfg.ScreenshotBlock
+		if block == "" {
+			block = "none"
+		}
+		fmt.Printf("[INFO] Screenshot format: %s | Wait: %s | Block: %s | Thumbnail: %dpx\n",
+			cfg.ScreenshotFormat, cfg.ScreenshotWait, block, cfg.ScreenshotThumb)
+	}
+
+	var shots *browserPool
+	if cfg.TakeScreenshots {
+		shots = newBrowserPool(proxies.Addrs(), cfg.Browsers, cfg.BrowserTabs, cfg.BrowserRecycle)
+	}
+
+	// History: known fast hosts first, long-dead hosts last with short timeouts
+	targets := nextTarget
+	var sched *historyScheduler
+	if history != nil {
+		sched = &historyScheduler{
+			src:        nextTarget,
+			history:    history,
+			window:     cfg.HistoryWindow,
+			factor:     cfg.HistoryFactor,
+			minTimeout: cfg.HistoryMinTimeout,
+			maxTimeout: cfg.Timeout,
+			deadAfter:  cfg.HistoryDeadAfter,
+			deadTime:   cfg.HistoryDeadTimeout,
+			tailDir:    cfg.OutDir,
+		}
+		defer sched.Close()
+		targets = sched.Next
+	}
+
+	// Crawl: seeds first, then links found in fetched pages
+	var frontier *crawlFrontier
+	if cfg.Crawl {
+		frontier = newCrawlFrontier(targets, cfg.CrawlDepth, cfg.CrawlHostPages, cfg.CrawlHostConns, cfg.CrawlMaxPages, cfg.CrawlScope)
+		targets = frontier.Next
+		fmt.Printf("[INFO] Crawl: depth %d | Scope: %s | Pages/host: %d | Conns/host: %d | Max pages: %d\n",
+			cfg.CrawlDepth, cfg.CrawlScope, cfg.CrawlHostPages, cfg.CrawlHostConns, cfg.CrawlMaxPages)
+	}
+
+	if pages != nil {
+		targets = pages.Attach(targets)
+	}
 
 	start := time.Now()
-	results := runScanPool(cfg, client, targets, htmlDir, shotDir, logPath)
+	if cfg.Role == "coordinator" {
+		// worker nodes fetch; this process plans, leases and merges their results
+		if err := runCoordinator(cfg, targets, emit, logPath); err != nil {
+			fatalWithSink("coordinator:", err)
+		}
+	} else {
+		runScanPool(cfg, proxies, shots, targets, frontier, archive, revisit, shotDir, logPath, emit)
+	}
+	if shots != nil {
+		shots.Close()
+	}
+	if err := archive.Close(); err != nil {
+		fmt.Println("[WARN] html manifest close failed:", err)
+	}
+	if err := sink.Close(); err != nil {
+		fmt.Println("[WARN] result stream close failed:", err)
+	}
+	if neg != nil {
+		if err := neg.Save(); err != nil {
+			fmt.Println("[WARN] negative cache write failed:", err)
+		}
+	}
+	if revisit != nil {
+		if err := revisit.Save(); err != nil {
+			fmt.Println("[WARN] revisit cache write failed:", err)
+		}
+	}
+	if history != nil {
+		if err := history.Save(); err != nil {
+			fmt.Println("[WARN] host history write failed:", err)
+		}
+	}
+	if pages != nil {
+		if err := pages.Save(); err != nil {
+			fmt.Println("[WARN] page fingerprints write failed:", err)
+		}
+	}
+	if err := src.Err(); err != nil {
+		fmt.Println("[WARN] targets read stopped early:", err)
+	}
+	if cfg.Role != "coordinator" {
+		for _, line := range proxies.Report() {
+			logLine(logPath, "[INFO] Proxy "+line)
+			fmt.Println("[INFO] Proxy", line)
+		}
+	}
+	fmt.Printf("[INFO] Targets read: %d | Duplicates: %d | Invalid: %d | Skipped (resume): %d | Skipped (negative cache): %d | Results: %d\n",
+		src.Read(), planner.Duplicates, planner.Invalid, skipped, negSkipped, sink.Count())
+	if sched != nil {
+		fmt.Printf("[INFO] History: %d known-alive targets scheduled first | %d long-dead targets scanned last\n", sched.FastTracked, sched.Tail)
+	}
+	if frontier != nil {
+		fmt.Printf("[INFO] Crawl: discovered %d pages\n", frontier.Discovered)
+	}
 
-	// Write JSON results
-	if err := writeJSON(jsonPath, results); err != nil {
+	// Write JSON results (legacy array, rebuilt from the stream)
+	if err := writeJSON(jsonPath, streamPath); err != nil {
 		fmt.Println("[WARN] could not write JSON results:", err)
 	}
 
 	// Write summary log
-	if err := writeSummary(summaryPath, results); err != nil {
+	if err := writeSummary(summaryPath, streamPath); err != nil {
 		fmt.Println("[WARN] could not write summary log:", err)
 	}
+	if pages != nil {
+		if err := writeChanges(changesPath, streamPath); err != nil {
+			fmt.Println("[WARN] could not write change report:", err)
+		}
+	}
+
+	closeLogs()
 
 	fmt.Printf("[DONE] Scan finished in %s\n", time.Since(start).Round(time.Second))
 	fmt.Printf("[DONE] Report: %s\n", logPath)
 	fmt.Printf("[DONE] Summary: %s\n", summaryPath)
 	fmt.Printf("[DONE] JSON: %s\n", jsonPath)
+	if pages != nil {
+		fmt.Printf("[DONE] Changes: %s\n", changesPath)
+	}
+	fmt.Printf("[DONE] Stream: %s\n", streamPath)
 }
 
 // -------------------------
@@ -127,23 +522,195 @@ func main() {
 
 func parseFlags() Config {
 	var cfg Config
-	flag.StringVar(&cfg.TargetsPath, "targets", "targets.yaml", "Path to targets file (one URL per line)")
+	flag.StringVar(&cfg.TargetsPath, "targets", "targets.yaml", "Path to targets file (one URL per line, yaml \"- url\" ok, .gz ok, - = stdin)")
 	flag.StringVar(&cfg.OutDir, "out", "output", "Output directory")
-	flag.StringVar(&cfg.ProxyAddr, "proxy", "127.0.0.1:9150", "SOCKS5 proxy address (Tor Browser usually 127.0.0.1:9150)")
-	flag.DurationVar(&cfg.Timeout, "timeout", 30*time.Second, "HTTP request timeout")
+	flag.StringVar(&cfg.ProxyAddr, "proxy", "127.0.0.1:9150", "SOCKS5 proxy address(es): host:port, comma list or port range host:9050-9053 (Tor Browser usually 127.0.0.1:9150)")
+	flag.StringVar(&cfg.Isolate, "isolate", "worker", "SOCKS auth stream isolation: worker, host or none")
+	flag.StringVar(&cfg.TorControl, "tor-control", "", "Tor control port(s) for NEWNYM, comma list matched to -proxy endpoints (empty = off)")
+	flag.StringVar(&cfg.TorControlPassword, "tor-control-password", "", "Tor control port password (HashedControlPassword)")
+	flag.IntVar(&cfg.NewnymAfter, "newnym-after", 3, "Send NEWNYM after this many consecutive circuit failures on an endpoint (0 = never)")
+	flag.DurationVar(&cfg.Timeout, "timeout", 30*time.Second, "HTTP request timeout (overall ceiling, 0 = phase timeouts only)")
+	flag.DurationVar(&cfg.SocksTimeout, "socks-timeout", 20*time.Second, "SOCKS connect + CONNECT reply timeout (onion lookup/rendezvous)")
+	flag.DurationVar(&cfg.TLSTimeout, "tls-timeout", 10*time.Second, "TLS handshake timeout")
+	flag.DurationVar(&cfg.TTFBTimeout, "ttfb-timeout", 20*time.Second, "Time to first response byte timeout")
+	flag.DurationVar(&cfg.BodyTimeout, "body-timeout", 30*time.Second, "Response body read timeout")
 	flag.IntVar(&cfg.Workers, "workers", 5, "Concurrent workers (use 1 for sequential)")
+	flag.StringVar(&cfg.Mode, "mode", "full", "Scan mode: full (fetch all), probe (SOCKS CONNECT only) or two-phase (probe, then fetch live hosts)")
+	flag.IntVar(&cfg.ProbeWorkers, "probe-workers", 50, "Concurrent liveness probes for -mode=probe/two-phase")
+	flag.DurationVar(&cfg.ProbeTimeout, "probe-timeout", 0, "Liveness probe timeout (0 = -socks-timeout)")
+	flag.IntVar(&cfg.Retries, "retries", 2, "Retries for transient failures (circuit/rendezvous errors, timeouts, 502/503/504/429)")
+	flag.DurationVar(&cfg.RetryBackoff, "retry-backoff", 2*time.Second, "Base retry delay, doubled per attempt with +-50% jitter")
+	flag.BoolVar(&cfg.HTTPFallback, "http-fallback", true, "Retry https:// targets over plain http:// when the certificate is untrusted")
+	flag.DurationVar(&cfg.NegativeTTL, "negative-ttl", 6*time.Hour, "Remember dead hosts across runs for this long, longer after repeated failures (0 = off)")
+	flag.StringVar(&cfg.NegativeAction, "negative-action", "probe", "What to do with hosts in the negative cache: probe (short liveness probe first) or skip")
+	flag.DurationVar(&cfg.NegativeProbeTimeout, "negative-probe-timeout", 8*time.Second, "Liveness probe timeout for hosts in the negative cache")
 	flag.BoolVar(&cfg.CheckTor, "check-tor", true, "Verify Tor via https://check.torproject.org/")
 
 	// NEW: screenshot flags
-	flag.BoolVar(&cfg.TakeScreenshots, "screenshot", true, "Take screenshot (PNG) of successful pages into output/screenshots")
+	flag.BoolVar(&cfg.TakeScreenshots, "screenshot", true, "Take screenshot of successful pages into output/screenshots")
 	flag.DurationVar(&cfg.ScreenshotTimeout, "screenshot-timeout", 25*time.Second, "Screenshot navigation/render timeout")
-	flag.IntVar(&cfg.ScreenshotWaitMS, "screenshot-wait-ms", 800, "Wait after page load (ms) before taking screenshot")
+	flag.IntVar(&cfg.ScreenshotWaitMS, "screenshot-wait-ms", 800, "Wait after page load (ms) before taking screenshot (with -screenshot-wait idle: network quiet period)")
+	flag.IntVar(&cfg.Browsers, "browsers", 2, "Headless Chrome processes kept alive for screenshots")
+	flag.IntVar(&cfg.BrowserTabs, "browser-tabs", 2, "Concurrent tabs per screenshot browser")
+	flag.IntVar(&cfg.BrowserRecycle, "browser-recycle", 50, "Restart a screenshot browser after this many pages (0 = never)")
+	flag.IntVar(&cfg.ScreenshotWorkers, "screenshot-workers", 0, "Concurrent screenshot render workers (0 = browsers * browser-tabs)")
+	flag.IntVar(&cfg.ScreenshotQueue, "screenshot-queue", 64, "Pending screenshots buffered before fetch workers wait")
+	flag.StringVar(&cfg.ScreenshotSource, "screenshot-source", "fetched", "Screenshot document source: fetched (render saved HTML, only subresources via Tor) or live (navigate again)")
+	flag.BoolVar(&cfg.ScreenshotText, "screenshot-text-only", false, "Block all subresources while rendering screenshots (no extra Tor traffic)")
+	flag.StringVar(&cfg.ScreenshotBlock, "screenshot-block", "", "Subresource types not loaded while rendering screenshots, comma separated: image,font,media,stylesheet,script")
+	flag.StringVar(&cfg.ScreenshotWait, "screenshot-wait", "fixed", "Screenshot wait: fixed (-screenshot-wait-ms after load) or idle (until no request was in flight for -screenshot-wait-ms)")
+	flag.StringVar(&cfg.ScreenshotFormat, "screenshot-format", "png", "Screenshot format: png, jpeg or webp")
+	flag.IntVar(&cfg.ScreenshotQuality, "screenshot-quality", 80, "Screenshot quality for jpeg/webp (1-100)")
+	flag.IntVar(&cfg.ScreenshotThumb, "screenshot-thumb", 320, "Also save a thumbnail this many pixels wide next to each screenshot (0 = off)")
+
+	flag.BoolVar(&cfg.Changes, "changes", true, "Fingerprint pages (sha256 + simhash of visible text), compare with the last scan and write scan_changes.log")
+	flag.Float64Var(&cfg.ChangeThreshold, "change-threshold", 0.95, "Pages whose text similarity to the last scan is below this count as changed (0..1)")
+	flag.BoolVar(&cfg.ShotChangedOnly, "screenshot-changed-only", true, "Reuse the last screenshot of unchanged pages instead of rendering them again")
+	flag.Int64Var(&cfg.MaxBody, "max-body", 10<<20, "Max response body bytes stored per page, longer bodies are truncated (0 = unlimited)")
+	flag.BoolVar(&cfg.HTMLCompress, "html-gzip", false, "Store archived HTML gzip-compressed (<sha256>.html.gz)")
+	flag.BoolVar(&cfg.Revisit, "revisit", true, "Send If-None-Match/If-Modified-Since for pages seen before; 304 reuses the archived page")
+	flag.BoolVar(&cfg.Crawl, "crawl", false, "Follow links found in fetched pages (targets are the seeds)")
+	flag.IntVar(&cfg.CrawlDepth, "crawl-depth", 2, "Max link depth from a seed for -crawl")
+	flag.StringVar(&cfg.CrawlScope, "crawl-scope", "onion", "Links to follow in -crawl: onion (any .onion host), host (same host as the page) or all")
+	flag.IntVar(&cfg.CrawlHostPages, "crawl-host-pages", 100, "Max pages scheduled per host in -crawl (0 = unlimited)")
+	flag.IntVar(&cfg.CrawlHostConns, "crawl-host-conns", 2, "Max concurrent fetches per host in -crawl (0 = unlimited)")
+	flag.IntVar(&cfg.CrawlMaxPages, "crawl-max-pages", 0, "Max pages discovered by -crawl in total (0 = unlimited)")
+	flag.BoolVar(&cfg.History, "history", true, "Schedule by host history (<out>/host_history.json): fast alive hosts first, adaptive timeouts, dead hosts last")
+	flag.IntVar(&cfg.HistoryWindow, "history-window", 2000, "Targets reordered at a time by -history")
+	flag.Float64Var(&cfg.HistoryFactor, "history-timeout-factor", 3, "Adaptive timeout = p95 of a host's past fetch time * factor (capped by -timeout)")
+	flag.DurationVar(&cfg.HistoryMinTimeout, "history-min-timeout", 5*time.Second, "Lower bound for adaptive timeouts")
+	flag.IntVar(&cfg.HistoryDeadAfter, "history-dead-after", 3, "Consecutive failed scans after which a host goes to the low-priority tail")
+	flag.DurationVar(&cfg.HistoryDeadTimeout, "history-dead-timeout", 10*time.Second, "Timeout for hosts in the low-priority tail")
+	flag.BoolVar(&cfg.Dedup, "dedup", true, "Skip targets whose canonical URL was already planned")
+	flag.StringVar(&cfg.ResultsPath, "results", "", "Append-only JSONL result stream (default <out>/scan_results.jsonl)")
+	flag.BoolVar(&cfg.Resume, "resume", false, "Keep the existing result stream and skip targets already in it")
+	flag.IntVar(&cfg.FsyncEvery, "fsync-every", 20, "Fsync the result stream after this many records")
+	flag.DurationVar(&cfg.FsyncInterval, "fsync-interval", 2*time.Second, "Fsync the result stream at least this often")
+
+	flag.StringVar(&cfg.LogFormat, "log-format", "text", "scan_report.log format: text or json (one object per line with worker/url/phase/status fields)")
+	flag.Int64Var(&cfg.LogMaxMB, "log-max-mb", 100, "Rotate scan_report.log at this size in MiB (0 = never)")
+	flag.IntVar(&cfg.LogKeep, "log-keep", 3, "Rotated report logs kept (scan_report.log.1 .. .N)")
+	flag.StringVar(&cfg.Role, "role", "standalone", "Distributed scan role: standalone, coordinator (plans and leases targets, merges results) or worker (scans leases)")
+	flag.StringVar(&cfg.Listen, "listen", "127.0.0.1:7070", "Coordinator listen address for -role coordinator")
+	flag.StringVar(&cfg.Coordinator, "coordinator", "", "Coordinator URL for -role worker, e.g. http://127.0.0.1:7070")
+	flag.StringVar(&cfg.NodeID, "node-id", "", "Worker node name reported to the coordinator (default host-pid-random)")
+	flag.IntVar(&cfg.LeaseSize, "lease-size", 50, "Targets per lease handed to a worker node")
+	flag.DurationVar(&cfg.LeaseTTL, "lease-ttl", 2*time.Minute, "A lease not renewed by its worker node within this time is re-dispatched")
+	flag.StringVar(&cfg.MetricsAddr, "metrics-addr", "", "Serve Prometheus metrics, expvar and pprof on this address, e.g. 127.0.0.1:9090 (empty = off)")
+
+	flag.StringVar(&cfg.Bench, "bench", "", "Run an offline benchmark instead of a scan (scan, screenshot, ingest)")
+	flag.IntVar(&cfg.BenchPages, "bench-pages", 30, "Pages per benchmark run")
+	flag.IntVar(&cfg.BenchLines, "bench-lines", 5000000, "Synthetic target lines for the ingest benchmark")
+	flag.StringVar(&cfg.BenchWorkers, "bench-workers", "5,20,50", "Worker counts compared by the scan benchmark (comma list)")
+	flag.DurationVar(&cfg.BenchLatency, "bench-latency", 300*time.Millisecond, "Simulated SOCKS CONNECT latency (+-50%) in the scan benchmark")
+	flag.Float64Var(&cfg.BenchFail, "bench-fail", 0.15, "Share of simulated onion hosts answering SOCKS 0xF0/0xF1 in the scan benchmark")
+	flag.DurationVar(&cfg.BenchSlowBody, "bench-slow-body", 2*time.Second, "Body transfer time of the simulated slow sites in the scan benchmark")
 
 	flag.Parse()
 
 	if cfg.Workers < 1 {
 		cfg.Workers = 1
 	}
+	if cfg.ScreenshotWorkers < 1 {
+		cfg.ScreenshotWorkers = cfg.Browsers * cfg.BrowserTabs
+		if cfg.ScreenshotWorkers < 1 {
+			cfg.ScreenshotWorkers = 1
+		}
+	}
+	switch cfg.Mode {
+	case "full", "probe", "two-phase":
+	default:
+		cfg.Mode = "full"
+	}
+	if cfg.ProbeWorkers < 1 {
+		cfg.ProbeWorkers = 1
+	}
+	if cfg.ProbeTimeout <= 0 {
+		cfg.ProbeTimeout = cfg.SocksTimeout
+	}
+	switch cfg.Isolate {
+	case "worker", "host", "none":
+	default:
+		cfg.Isolate = "worker"
+	}
+	if cfg.Crawl && cfg.Mode == "probe" {
+		fmt.Println("[WARN] -crawl needs page bodies, ignored with -mode=probe")
+		cfg.Crawl = false
+	}
+	switch cfg.CrawlScope {
+	case "onion", "host", "all":
+	default:
+		cfg.CrawlScope = "onion"
+	}
+	if cfg.LogFormat != "json" {
+		cfg.LogFormat = "text"
+	}
+	if cfg.HistoryWindow < 1 {
+		cfg.HistoryWindow = 1
+	}
+	if cfg.HistoryDeadAfter < 1 {
+		cfg.HistoryDeadAfter = 1
+	}
+	if cfg.Retries < 0 {
+		cfg.Retries = 0
+	}
+	if cfg.NegativeAction != "skip" {
+		cfg.NegativeAction = "probe"
+	}
+	if cfg.ScreenshotSource != "live" {
+		cfg.ScreenshotSource = "fetched"
+	}
+	if cfg.ScreenshotQueue < 0 {
+		cfg.ScreenshotQueue = 0
+	}
+	if cfg.ScreenshotWait != "idle" {
+		cfg.ScreenshotWait = "fixed"
+	}
+	switch cfg.ScreenshotFormat {
+	case "jpeg", "webp":
+	case "jpg":
+		cfg.ScreenshotFormat = "jpeg"
+	default:
+		cfg.ScreenshotFormat = "png"
+	}
+	if cfg.ScreenshotQuality < 1 || cfg.ScreenshotQuality > 100 {
+		cfg.ScreenshotQuality = 80
+	}
+	if cfg.ScreenshotThumb < 0 || cfg.ScreenshotThumb >= screenshotWidth {
+		cfg.ScreenshotThumb = 0
+	}
+	if _, unknown := parseResourceTypes(cfg.ScreenshotBlock); len(unknown) > 0 {
+		fmt.Printf("[WARN] -screenshot-block: ignoring unknown types %s\n", strings.Join(unknown, ","))
+	}
+	switch cfg.Role {
+	case "coordinator":
+		// the coordinator never dials targets itself
+		cfg.CheckTor = false
+		cfg.TakeScreenshots = false
+	case "worker":
+		if cfg.Coordinator == "" {
+			fmt.Println("[FATAL] -role worker needs -coordinator http://host:port")
+			os.Exit(2)
+		}
+		if !strings.Contains(cfg.Coordinator, "://") {
+			cfg.Coordinator = "http://" + cfg.Coordinator
+		}
+		if cfg.NodeID == "" {
+			cfg.NodeID = defaultNodeID()
+		}
+	default:
+		cfg.Role = "standalone"
+	}
+	if cfg.Role != "standalone" && cfg.Crawl {
+		fmt.Println("[WARN] -crawl is not supported in distributed mode, ignored")
+		cfg.Crawl = false
+	}
+	if cfg.LeaseSize < 1 {
+		cfg.LeaseSize = 1
+	}
+	if cfg.LeaseTTL < 3*time.Second {
+		cfg.LeaseTTL = 3 * time.Second
+	}
 	return cfg
 }
 
@@ -151,52 +718,102 @@ func parseFlags() Config {
 // Input Handler
 // -------------------------
 
-func readTargets(path string) ([]string, error) {
-	f, err := os.Open(path)
-	if err != nil {
-		return nil, err
+// targetSource reads targets lazily, one line at a time, from a file or stdin ("-").
+// Gzip-compressed input is detected by its magic bytes, so lists of millions of URLs
+// can be fed in constant memory. Accepted line formats: plain URLs and yaml style
+// "- http://....", optionally quoted; empty lines and # comments are skipped.
+type targetSource struct {
+	sc      *bufio.Scanner
+	closers []io.Closer
+	read    int
+}
+
+func openTargets(path string) (*targetSource, error) {
+	src := &targetSource{}
+
+	var r io.Reader
+	if path == "-" {
+		r = os.Stdin
+	} else {
+		f, err := os.Open(path)
+		if err != nil {
+			return nil, err
+		}
+		src.closers = append(src.closers, f)
+		r = f
 	}
-	defer f.Close()
 
-	var out []string
-	sc := bufio.NewScanner(f)
-	for sc.Scan() {
-		line := strings.TrimSpace(sc.Text())
-		if line == "" {
-			continue
+	br := bufio.NewReaderSize(r, 256*1024)
+	if magic, err := br.Peek(2); err == nil && magic[0] == 0x1f && magic[1] == 0x8b {
+		gz, err := gzip.NewReader(br)
+		if err != nil {
+			src.Close()
+			return nil, err
 		}
-		// allow yaml style "- http://...."
-		line = strings.TrimPrefix(line, "-")
-		line = strings.TrimSpace(line)
-		if line == "" {
-			continue
+		src.closers = append(src.closers, gz)
+		src.sc = bufio.NewScanner(gz)
+	} else {
+		src.sc = bufio.NewScanner(br)
+	}
+	return src, nil
+}
+
+// Next returns the next target, or false at the end of input (check Err afterwards).
+func (t *targetSource) Next() (string, bool) {
+	for t.sc.Scan() {
+		if line := parseTargetLine(t.sc.Text()); line != "" {
+			t.read++
+			return line, true
 		}
-		out = append(out, line)
 	}
-	return out, sc.Err()
+	return "", false
+}
+
+func (t *targetSource) Err() error { return t.sc.Err() }
+
+// Read returns how many targets were returned so far.
+func (t *targetSource) Read() int { return t.read }
+
+func (t *targetSource) Close() error {
+	var err error
+	for i := len(t.closers) - 1; i >= 0; i-- {
+		if cerr := t.closers[i].Close(); err == nil {
+			err = cerr
+		}
+	}
+	return err
+}
+
+func parseTargetLine(line string) string {
+	line = strings.TrimSpace(line)
+	if line == "" || strings.HasPrefix(line, "#") {
+		return ""
+	}
+	// allow yaml style "- http://...."
+	line = strings.TrimPrefix(line, "-")
+	line = strings.TrimSpace(line)
+	line = strings.Trim(line, `"'`)
+	return strings.TrimSpace(line)
 }
 
 // -------------------------
 // Tor Proxy Client
 // -------------------------
 
-func torHTTPClient(proxyAddr string, timeout time.Duration) (*http.Client, error) {
-	dialer, err := proxy.SOCKS5("tcp", proxyAddr, nil, proxy.Direct)
+// torProxyPool builds the SOCKS endpoint pool from -proxy and the optional control ports.
+func torProxyPool(cfg Config) (*proxyPool, error) {
+	addrs, err := parseProxyList(cfg.ProxyAddr)
 	if err != nil {
 		return nil, err
 	}
-
-	transport := &http.Transport{
-		DialContext: func(ctx context.Context, network, addr string) (net.Conn, error) {
-			return dialer.Dial(network, addr)
-		},
-		DisableKeepAlives: false,
+	var controls []*torControl
+	for _, a := range strings.Split(cfg.TorControl, ",") {
+		if a = strings.TrimSpace(a); a != "" {
+			controls = append(controls, &torControl{Addr: a, Password: cfg.TorControlPassword})
+		}
 	}
-
-	return &http.Client{
-		Transport: transport,
-		Timeout:   timeout,
-	}, nil
+	timeouts := phaseTimeouts{SOCKS: cfg.SocksTimeout, TLS: cfg.TLSTimeout, TTFB: cfg.TTFBTimeout, Body: cfg.BodyTimeout}
+	return newProxyPool(addrs, cfg.Isolate, controls, cfg.NewnymAfter, timeouts), nil
 }
 
 // -------------------------
@@ -227,89 +844,368 @@ func checkTor(client *http.Client, logPath string) bool {
 // Scan Orchestrator (Workers)
 // -------------------------
 
-func runScanPool(cfg Config, client *http.Client, targets []string, htmlDir, shotDir, logPath string) []ScanResult {
-	type job struct{ url string }
+// runScanPool runs a staged pipeline: fetch workers (-workers) download the HTML and
+// push successful results into a bounded screenshot queue (-screenshot-queue) that is
+// drained by separate render workers (-screenshot-workers). When the queue is full the
+// fetch workers block (backpressure) instead of piling up pending renders in memory.
+// With -mode=probe or two-phase a cheap SOCKS CONNECT probe stage (-probe-workers)
+// runs first; dead hosts are emitted right away and only live ones are fetched.
+// Targets are pulled lazily from the targets iterator as workers become free, and every
+// finished result is passed to emit from a single goroutine, in completion order.
+// With a crawl frontier, links of fetched pages are added to it before the page's
+// result moves on, and the frontier is told when the result is emitted.
+func runScanPool(cfg Config, proxies *proxyPool, shots *browserPool, targets func() (scanTarget, bool), crawl *crawlFrontier, archive *htmlArchive, revisit *validatorCache, shotDir, logPath string, emit func(ScanResult)) {
+	feed := make(chan scanTarget)
+	jobs := feed
+	if cfg.Mode != "full" {
+		jobs = make(chan scanTarget)
+	}
+	shotQ := make(chan ScanResult, cfg.ScreenshotQueue)
+	resultsCh := make(chan ScanResult, cfg.Workers+cfg.ScreenshotWorkers)
+
+	var probeWG, fetchWG, renderWG sync.WaitGroup
+
+	// probe runs a liveness probe, retrying transient SOCKS failures with backoff
+	probe := func(t scanTarget, worker int, timeout time.Duration) probeResult {
+		pr := probeTarget(proxies, t, worker, timeout)
+		for attempt := 1; pr.Err != nil && attempt <= cfg.Retries; attempt++ {
+			if !classifyError(pr.Err, 0, "socks").Retryable() {
+				break
+			}
+			time.Sleep(retryBackoff(cfg.RetryBackoff, attempt))
+			pr = probeTarget(proxies, t, worker, timeout)
+		}
+		return pr
+	}
 
-	jobs := make(chan job)
-	resultsCh := make(chan ScanResult, cfg.Workers)
+	// deadResult turns a failed probe into a passive result
+	deadResult := func(t scanTarget, pr probeResult) ScanResult {
+		class := classifyError(pr.Err, 0, "socks")
+		return ScanResult{
+			URL:          t.Raw,
+			Normalized:   t.URL,
+			Probe:        true,
+			SocksReply:   pr.Reply,
+			Error:        pr.Err.Error(),
+			FailedPhase:  "socks",
+			ErrorClass:   class.String(),
+			TimestampUTC: time.Now().UTC().Format(time.RFC3339),
+			DurationMS:   pr.Took.Milliseconds(),
+			SocksMS:      pr.Took.Milliseconds(),
+			hostDead:     class.HostDead(),
+		}
+	}
 
-	var wg sync.WaitGroup
+	probeFn := func(id int) {
+		defer probeWG.Done()
+		for t := range feed {
+			timeout := cfg.ProbeTimeout
+			if t.Suspect && cfg.NegativeProbeTimeout < timeout {
+				timeout = cfg.NegativeProbeTimeout
+			}
+			if t.Timeout > 0 && t.Timeout < timeout {
+				timeout = t.Timeout
+			}
+			scanStats.probeBusy.Add(1)
+			pr := probe(t, id, timeout)
+			scanStats.probeBusy.Add(-1)
+			if pr.Err != nil {
+				msg := fmt.Sprintf("[P%02d][DEAD] %s -> %v", id, t.URL, pr.Err)
+				fmt.Println(msg)
+				logEvent(logPath, logEntry{Stage: "probe", Worker: id, URL: t.URL, Phase: "socks", Msg: msg})
+				resultsCh <- deadResult(t, pr)
+				continue
+			}
 
-	workerFn := func(id int) {
-		defer wg.Done()
+			res := ScanResult{
+				URL:          t.Raw,
+				Normalized:   t.URL,
+				Active:       true,
+				Probe:        true,
+				TimestampUTC: time.Now().UTC().Format(time.RFC3339),
+				DurationMS:   pr.Took.Milliseconds(),
+				SocksMS:      pr.Took.Milliseconds(),
+			}
+
+			msg := fmt.Sprintf("[P%02d][LIVE] %s (%dms)", id, t.URL, res.DurationMS)
+			fmt.Println(msg)
+			logEvent(logPath, logEntry{Stage: "probe", Worker: id, URL: t.URL, Msg: msg})
+			if cfg.Mode == "two-phase" {
+				jobs <- t
+				continue
+			}
+			resultsCh <- res
+		}
+	}
+
+	fetchFn := func(id int) {
+		defer fetchWG.Done()
+		client := proxies.Client(cfg.Timeout, id)
 		for j := range jobs {
+			scanStats.fetchBusy.Add(1)
 			start := time.Now()
-			normalized := normalizeURL(j.url)
+			normalized := j.URL
+
+			// hosts from the negative cache must pass a short probe first (two-phase
+			// mode already probed them)
+			if j.Suspect && cfg.Mode == "full" {
+				if pr := probe(j, id, cfg.NegativeProbeTimeout); pr.Err != nil {
+					scanStats.fetchBusy.Add(-1)
+					msg := fmt.Sprintf("[W%02d][DEAD] %s -> %v (negative cache)", id, normalized, pr.Err)
+					fmt.Println(msg)
+					logEvent(logPath, logEntry{Stage: "fetch", Worker: id, URL: normalized, Phase: "socks", Msg: msg})
+					resultsCh <- deadResult(j, pr)
+					continue
+				}
+			}
 
-			status, savedHTML, err := fetchAndSaveHTML(client, normalized, htmlDir)
+			var (
+				phases *phaseTimes
+				status int
+				body   archivedBody
+				err    error
+				class  errorClass
+			)
+			fetchURL := normalized
+			attempts, retries := 0, 0
+			for {
+				attempts++
+				// fresh per attempt: late trace callbacks of a given-up attempt cannot touch it
+				phases = &phaseTimes{}
+				status, body, err = fetchAndSaveHTML(client, fetchURL, archive, revisit, j.Timeout, cfg.BodyTimeout, phases)
+				if err == nil {
+					break
+				}
+				class = classifyError(err, status, phases.phase())
+
+				// onion services often serve self-signed certificates; try plain http once
+				if class.Kind == "tls-cert" && cfg.HTTPFallback && strings.HasPrefix(fetchURL, "https://") {
+					fetchURL = "http://" + strings.TrimPrefix(fetchURL, "https://")
+					msg := fmt.Sprintf("[W%02d][FALL] %s -> untrusted certificate, trying %s", id, normalized, fetchURL)
+					fmt.Println(msg)
+					logEvent(logPath, logEntry{Stage: "fetch", Worker: id, URL: normalized, Phase: "tls", Msg: msg})
+					continue
+				}
+				if retries >= cfg.Retries || !class.Retryable() {
+					break
+				}
+				retries++
+				scanStats.retries.Add(1)
+				wait := retryBackoff(cfg.RetryBackoff, retries)
+				msg := fmt.Sprintf("[W%02d][RTRY] %s -> %s, retry %d/%d in %s", id, normalized, class, retries, cfg.Retries, wait.Round(time.Millisecond))
+				fmt.Println(msg)
+				logEvent(logPath, logEntry{Stage: "fetch", Worker: id, URL: normalized, Phase: class.Phase, Status: status, Msg: msg})
+				time.Sleep(wait)
+			}
 			dur := time.Since(start)
+			scanStats.fetchBusy.Add(-1)
 
 			res := ScanResult{
-				URL:          j.url,
+				URL:          j.Raw,
 				Normalized:   normalized,
 				Active:       err == nil,
 				HTTPStatus:   status,
-				SavedHTML:    savedHTML,
+				SavedHTML:    body.Path,
 				TimestampUTC: time.Now().UTC().Format(time.RFC3339),
 				DurationMS:   dur.Milliseconds(),
+				Attempts:     attempts,
+				Depth:        j.Depth,
+				Parent:       j.Parent,
+				TimeoutMS:    j.Timeout.Milliseconds(),
+			}
+			if err == nil {
+				res.HTMLSHA256 = body.SHA256
+				res.HTMLBytes = body.Size
+				res.BodyTruncated = body.Truncated
+				res.NotModified = body.NotModified
 			}
+			if fetchURL != normalized {
+				res.FetchedURL = fetchURL
+			}
+			phases.apply(&res)
 
 			if err != nil {
 				res.Error = err.Error()
+				res.FailedPhase = phases.phase()
+				res.ErrorClass = class.String()
+				res.hostDead = class.HostDead()
 				msg := fmt.Sprintf("[W%02d][ERR ] %s -> %v", id, normalized, err)
 				fmt.Println(msg)
-				logLine(logPath, msg)
+				logEvent(logPath, logEntry{Stage: "fetch", Worker: id, URL: normalized, Phase: res.FailedPhase, Status: status, Msg: msg})
 				resultsCh <- res
 				continue
 			}
 
 			// Success log
-			msg := fmt.Sprintf("[W%02d][OK  ] %s -> %d saved=%s (%dms)", id, normalized, status, savedHTML, res.DurationMS)
+			msg := fmt.Sprintf("[W%02d][OK  ] %s -> %d saved=%s (%dms)", id, normalized, status, body.Path, res.DurationMS)
+			if body.NotModified {
+				msg += " [not modified]"
+			} else if !body.New {
+				msg += " [same content]"
+			}
+			if body.Truncated {
+				msg += fmt.Sprintf(" [truncated at %d bytes]", cfg.MaxBody)
+			}
+
+			// crawl: queue the page's links before its result moves on
+			if crawl != nil {
+				if r, err := openArchivedHTML(body.Path); err == nil {
+					links := extractLinks(r, fetchURL)
+					r.Close()
+					res.LinksFound = len(links)
+					if added := crawl.Add(j, links); len(links) > 0 {
+						msg += fmt.Sprintf(" links=%d new=%d", len(links), added)
+					}
+				}
+			}
+
+			// change detection: simhash of the visible text against the last scan
+			if cfg.Changes {
+				simhash, known := uint64(0), false
+				if body.NotModified && j.Prev != nil && j.Prev.SHA256 == body.SHA256 {
+					simhash, known = j.Prev.simhash()
+				}
+				if !known {
+					if r, oerr := openArchivedHTML(body.Path); oerr == nil {
+						simhash, known = textSimhash(r), true
+						r.Close()
+					}
+				}
+				if known {
+					compareFingerprint(&res, simhash, j.Prev, cfg.ChangeThreshold)
+					switch {
+					case res.Similarity == nil:
+						msg += " [new]"
+					case res.Changed:
+						msg += fmt.Sprintf(" [changed, similarity %.2f]", *res.Similarity)
+					}
+				}
+			}
 			fmt.Println(msg)
-			logLine(logPath, msg)
-
-			// NEW: Screenshot on success
-			if cfg.TakeScreenshots {
-				shotPath := makeScreenshotPath(shotDir, normalized)
-				if err := captureScreenshotTor(normalized, shotPath, cfg.ProxyAddr, cfg.ScreenshotTimeout, cfg.ScreenshotWaitMS); err != nil {
-					res.ScreenshotError = err.Error()
-					warn := fmt.Sprintf("[W%02d][WARN] Screenshot failed: %s -> %v", id, normalized, err)
-					fmt.Println(warn)
-					logLine(logPath, warn)
-				} else {
-					res.SavedScreenshot = shotPath
-					okmsg := fmt.Sprintf("[W%02d][OK  ] Screenshot saved: %s", id, shotPath)
-					fmt.Println(okmsg)
-					logLine(logPath, okmsg)
+			logEvent(logPath, logEntry{Stage: "fetch", Worker: id, URL: normalized, Status: status, Msg: msg})
+
+			// unchanged page with a screenshot from an earlier scan: nothing to render
+			if body.NotModified && reuseScreenshot(&res, body.Screenshot) {
+				resultsCh <- res
+				continue
+			}
+			if cfg.ShotChangedOnly && res.Simhash != "" && !res.Changed && j.Prev != nil && reuseScreenshot(&res, j.Prev.Screenshot) {
+				resultsCh <- res
+				continue
+			}
+			if shots != nil {
+				shotQ <- res
+				continue
+			}
+			resultsCh <- res
+		}
+	}
+
+	shotBlock, _ := parseResourceTypes(cfg.ScreenshotBlock)
+	shotOpts := screenshotOptions{
+		Timeout:  cfg.ScreenshotTimeout,
+		WaitMS:   cfg.ScreenshotWaitMS,
+		WaitIdle: cfg.ScreenshotWait == "idle",
+		TextOnly: cfg.ScreenshotText,
+
+		Block:      shotBlock,
+		Format:     cfg.ScreenshotFormat,
+		Quality:    cfg.ScreenshotQuality,
+		ThumbWidth: cfg.ScreenshotThumb,
+	}
+
+	renderFn := func(id int) {
+		defer renderWG.Done()
+		for res := range shotQ {
+			// render the body we already downloaded instead of a second full Tor round trip
+			var doc []byte
+			if cfg.ScreenshotSource == "fetched" && res.SavedHTML != "" {
+				if b, err := readArchivedHTML(res.SavedHTML); err == nil {
+					doc = b
 				}
 			}
 
+			shotPath := makeScreenshotPath(shotDir, res.Normalized, screenshotExt(cfg.ScreenshotFormat))
+			scanStats.renderBusy.Add(1)
+			err := shots.Capture(res.Normalized, doc, shotPath, shotOpts)
+			scanStats.renderBusy.Add(-1)
+			if err != nil {
+				res.ScreenshotError = err.Error()
+				warn := fmt.Sprintf("[S%02d][WARN] Screenshot failed: %s -> %v", id, res.Normalized, err)
+				fmt.Println(warn)
+				logEvent(logPath, logEntry{Stage: "render", Worker: id, URL: res.Normalized, Msg: warn})
+			} else {
+				res.SavedScreenshot = shotPath
+				if shotOpts.ThumbWidth > 0 {
+					res.SavedThumbnail = thumbnailPath(shotPath)
+				}
+				okmsg := fmt.Sprintf("[S%02d][OK  ] Screenshot saved: %s", id, shotPath)
+				fmt.Println(okmsg)
+				logEvent(logPath, logEntry{Stage: "render", Worker: id, URL: res.Normalized, Msg: okmsg})
+			}
 			resultsCh <- res
 		}
 	}
 
-	wg.Add(cfg.Workers)
+	scanStats.Gauge("tor_scraper_screenshot_queue_depth", "Fetched pages waiting for a render worker.",
+		func() float64 { return float64(len(shotQ)) })
+	scanStats.Gauge("tor_scraper_workers", "Configured fetch workers.",
+		func() float64 { return float64(cfg.Workers) })
+	if shots != nil {
+		scanStats.Gauge("tor_scraper_browsers_running", "Screenshot Chrome processes running.",
+			func() float64 { running, _ := shots.Stats(); return float64(running) })
+		scanStats.Gauge("tor_scraper_browser_restarts", "Screenshot Chrome restarts so far.",
+			func() float64 { _, restarts := shots.Stats(); return float64(restarts) })
+		scanStats.Gauge("tor_scraper_browser_tabs_busy", "Screenshot tabs currently rendering.",
+			func() float64 { return float64(shots.Busy()) })
+	}
+
+	if cfg.Mode != "full" {
+		probeWG.Add(cfg.ProbeWorkers)
+		for i := 0; i < cfg.ProbeWorkers; i++ {
+			go probeFn(i + 1)
+		}
+	}
+	fetchWG.Add(cfg.Workers)
 	for i := 0; i < cfg.Workers; i++ {
-		go workerFn(i + 1)
+		go fetchFn(i + 1)
+	}
+	if shots != nil {
+		renderWG.Add(cfg.ScreenshotWorkers)
+		for i := 0; i < cfg.ScreenshotWorkers; i++ {
+			go renderFn(i + 1)
+		}
 	}
 
 	go func() {
-		for _, t := range targets {
-			jobs <- job{url: t}
+		for {
+			t, ok := targets()
+			if !ok {
+				break
+			}
+			feed <- t
 		}
-		close(jobs)
+		close(feed)
 	}()
 
 	go func() {
-		wg.Wait()
+		if cfg.Mode != "full" {
+			probeWG.Wait()
+			close(jobs)
+		}
+		fetchWG.Wait()
+		close(shotQ)
+		renderWG.Wait()
 		close(resultsCh)
 	}()
 
-	var results []ScanResult
 	for r := range resultsCh {
-		results = append(results, r)
+		if crawl != nil {
+			crawl.Done(r.Normalized)
+		}
+		scanStats.ObserveResult(r)
+		emit(r)
 	}
-	return results
 }
 
 // -------------------------
@@ -318,128 +1214,137 @@ func runScanPool(cfg Config, client *http.Client, targets []string, htmlDir, sho
 
 func normalizeURL(url string) string {
 	url = strings.TrimSpace(url)
-	if !strings.HasPrefix(url, "http://") && !strings.HasPrefix(url, "https://") {
+	lower := strings.ToLower(url)
+	if !strings.HasPrefix(lower, "http://") && !strings.HasPrefix(lower, "https://") {
 		url = "http://" + url
 	}
 	return url
 }
 
-// fetchAndSaveHTML returns (httpStatus, savedHTMLPath, error)
-func fetchAndSaveHTML(client *http.Client, url, htmlDir string) (int, string, error) {
-	req, err := http.NewRequest("GET", url, nil)
+// fetchAndSaveHTML returns (httpStatus, archivedBody, error). The body is streamed into
+// the archive (capped, hashed, stored once per content) instead of being buffered in
+// memory. Pages in the revisit cache are requested conditionally; a 304 returns the
+// archived body of the previous scan. Phase timestamps are recorded into phases;
+// timeout (if > 0) bounds the whole request on top of the client timeout and
+// bodyTimeout bounds the body read once headers have arrived.
+func fetchAndSaveHTML(client *http.Client, url string, archive *htmlArchive, revisit *validatorCache, timeout, bodyTimeout time.Duration, phases *phaseTimes) (int, archivedBody, error) {
+	ctx, cancel := context.WithCancel(httptrace.WithClientTrace(context.Background(), phases.trace()))
+	defer cancel()
+	if timeout > 0 {
+		var cancelTimeout context.CancelFunc
+		ctx, cancelTimeout = context.WithTimeout(ctx, timeout)
+		defer cancelTimeout()
+	}
+
+	req, err := http.NewRequestWithContext(ctx, "GET", url, nil)
 	if err != nil {
-		return 0, "", err
+		return 0, archivedBody{}, err
 	}
 	req.Header.Set("User-Agent", "TOR-Scraper/1.0 (Go)")
 
+	prev, revisiting := revisit.Get(url)
+	if revisiting {
+		if prev.ETag != "" {
+			req.Header.Set("If-None-Match", prev.ETag)
+		}
+		if prev.LastModified != "" {
+			req.Header.Set("If-Modified-Since", prev.LastModified)
+		}
+	}
+
 	resp, err := client.Do(req)
 	if err != nil {
-		return 0, "", err
+		return 0, archivedBody{}, err
 	}
 	defer resp.Body.Close()
 
 	status := resp.StatusCode
 
+	if status == http.StatusNotModified && revisiting {
+		return status, archivedBody{
+			Path:        prev.Path,
+			SHA256:      prev.SHA256,
+			Size:        prev.Size,
+			NotModified: true,
+			Screenshot:  prev.Screenshot,
+		}, nil
+	}
+
 	if status < 200 || status >= 300 {
 		_, _ = io.CopyN(io.Discard, resp.Body, 4096)
-		return status, "", fmt.Errorf("http status %d", status)
+		return status, archivedBody{}, fmt.Errorf("http status %d", status)
 	}
 
-	body, err := io.ReadAll(resp.Body)
-	if err != nil {
-		return status, "", err
+	phases.mark(&phases.bodyStart)
+	var bodyTimedOut atomic.Bool
+	if bodyTimeout > 0 {
+		t := time.AfterFunc(bodyTimeout, func() {
+			bodyTimedOut.Store(true)
+			cancel()
+		})
+		defer t.Stop()
 	}
-
-	ts := time.Now().Format("20060102_150405")
-	filename := fmt.Sprintf("%s_%s.html", safeFileNameFromURL(url), ts)
-	outPath := filepath.Join(htmlDir, filename)
-
-	if err := os.WriteFile(outPath, body, 0644); err != nil {
-		return status, "", err
+	body, err := archive.Store(url, resp.Body)
+	phases.mark(&phases.bodyDone)
+	if err != nil {
+		if bodyTimedOut.Load() {
+			err = fmt.Errorf("body read timeout after %s: %w", bodyTimeout, err)
+		}
+		return status, archivedBody{}, err
 	}
-	return status, outPath, nil
+	revisit.Update(url, resp.Header, body)
+	return status, body, nil
 }
 
 // -------------------------
 // Screenshot (chromedp)
 // -------------------------
 
-func makeScreenshotPath(shotDir, url string) string {
+func makeScreenshotPath(shotDir, url, ext string) string {
 	ts := time.Now().Format("20060102_150405")
-	name := fmt.Sprintf("%s_%s.png", safeFileNameFromURL(url), ts)
+	name := fmt.Sprintf("%s_%s%s", safeFileNameFromURL(url), ts, ext)
 	return filepath.Join(shotDir, name)
 }
 
-// captureScreenshotTor navigates to url in headless Chrome using Tor SOCKS5 proxy and saves a full-page PNG.
-func captureScreenshotTor(url, outPath, socks5Addr string, timeout time.Duration, waitMS int) error {
-	// Chrome proxy syntax: socks5://host:port
-	proxyArg := "--proxy-server=socks5://" + socks5Addr
+// reuseScreenshot points res at the screenshot (and thumbnail, if there is one) an
+// earlier scan saved at path. It reports false when that file is gone.
+func reuseScreenshot(res *ScanResult, path string) bool {
+	if path == "" {
+		return false
+	}
+	if _, err := os.Stat(path); err != nil {
+		return false
+	}
+	res.SavedScreenshot = path
+	thumb := thumbnailPath(path)
+	if _, err := os.Stat(thumb); err == nil {
+		res.SavedThumbnail = thumb
+	}
+	return true
+}
 
-	allocOpts := append(chromedp.DefaultExecAllocatorOptions[:],
+// browserAllocOptions returns the Chrome flags used for every screenshot browser:
+// headless, Tor SOCKS5 proxy (socks5://host:port) and a fixed window size.
+func browserAllocOptions(socks5Addr string) []chromedp.ExecAllocatorOption {
+	opts := append(chromedp.DefaultExecAllocatorOptions[:],
 		chromedp.Flag("headless", true),
 		chromedp.Flag("disable-gpu", true),
 		chromedp.Flag("no-sandbox", true),
 		chromedp.Flag("ignore-certificate-errors", true),
-		chromedp.WindowSize(1366, 768),
-		chromedp.Flag("disable-dev-shm-usage", true),
-		chromedp.Flag("hide-scrollbars", false),
-		chromedp.Flag("mute-audio", true),
-		chromedp.Flag("disable-background-networking", true),
-		chromedp.Flag("disable-default-apps", true),
-		chromedp.Flag("disable-sync", true),
-		chromedp.Flag("metrics-recording-only", true),
-		chromedp.Flag("safebrowsing-disable-auto-update", true),
-		chromedp.Flag("disable-extensions", true),
-		chromedp.Flag("disable-popup-blocking", true),
-		chromedp.Flag("disable-features", "TranslateUI"),
-		chromedp.Flag("blink-settings", "imagesEnabled=true"),
-		chromedp.Flag("proxy-bypass-list", "<-loopback>"),
-		chromedp.Flag("disable-web-security", true),
-		chromedp.Flag("allow-running-insecure-content", true),
-		chromedp.Flag("disable-site-isolation-trials", true),
-		chromedp.Flag("disable-features", "IsolateOrigins,site-per-process"),
-		chromedp.Flag("enable-features", "NetworkService,NetworkServiceInProcess"),
-		chromedp.Flag("proxy-pac-url", ""),
-		chromedp.Flag("proxy-auto-detect", false),
-		chromedp.Flag("enable-automation", false),
-		chromedp.Flag("disable-infobars", true),
-		chromedp.Flag("password-store", "basic"),
-		chromedp.Flag("use-mock-keychain", true),
-		chromedp.Flag("remote-debugging-port", 0),
-		chromedp.Flag("disable-renderer-backgrounding", true),
-		chromedp.Flag("disable-background-timer-throttling", true),
-		chromedp.Flag("disable-client-side-phishing-detection", true),
-		chromedp.Flag("disable-component-update", true),
-		chromedp.Flag("disable-domain-reliability", true),
-		chromedp.Flag("disable-print-preview", true),
-		chromedp.Flag("disable-hang-monitor", true),
-		chromedp.Flag("disable-prompt-on-repost", true),
-		chromedp.Flag("disable-ipc-flooding-protection", true),
-		chromedp.Flag("disable-notifications", true),
-		chromedp.Flag("disable-translate", true),
-		chromedp.Flag("proxy-server", ""), // ensure no duplicate
-		chromedp.Flag("proxy-server", ""), // harmless
+		chromedp.WindowSize(screenshotWidth, screenshotHeight),
+		chromedp.UserAgent("TOR-Scraper/1.0 (Go)"),
+		chromedp.Flag("proxy-server", "socks5://"+socks5Addr),
 	)
+	if p := findChrome(); p != "" {
+		opts = append(opts, chromedp.ExecPath(p))
+	}
+	return opts
+}
 
-	// put proxyArg as raw arg to avoid any ambiguity
-	allocOpts = append(allocOpts, chromedp.ExecPath(findChrome()))
-	allocCtx, cancel := chromedp.NewExecAllocator(context.Background(), append(allocOpts, chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""), chromedp.Flag("proxy-server", ""))...)
-	_ = proxyArg // keep for clarity; actual arg below
-
-	// NOTE: simplest reliable way: pass proxyArg using chromedp.ExecAllocator with chromedp.Flag is finicky across versions
-	// so we create a new allocator again with proxyArg as a raw option:
-	cancel()
-	allocCtx, cancel = chromedp.NewExecAllocator(context.Background(),
-		append(chromedp.DefaultExecAllocatorOptions[:],
-			chromedp.Flag("headless", true),
-			chromedp.Flag("disable-gpu", true),
-			chromedp.Flag("no-sandbox", true),
-			chromedp.Flag("ignore-certificate-errors", true),
-			chromedp.WindowSize(1366, 768),
-			chromedp.UserAgent("TOR-Scraper/1.0 (Go)"),
-			chromedp.Flag("proxy-server", "socks5://"+socks5Addr),
-		)...,
-	)
+// captureScreenshotTor launches a dedicated headless Chrome for a single url and saves a PNG.
+// Scans use browserPool instead; this one-shot variant is kept as the benchmark baseline.
+func captureScreenshotTor(url, outPath, socks5Addr string, timeout time.Duration, waitMS int) error {
+	allocCtx, cancel := chromedp.NewExecAllocator(context.Background(), browserAllocOptions(socks5Addr)...)
 	defer cancel()
 
 	ctx, cancelCtx := chromedp.NewContext(allocCtx)
@@ -449,17 +1354,7 @@ func captureScreenshotTor(url, outPath, socks5Addr string, timeout time.Duration
 	defer cancelTimeout()
 
 	var buf []byte
-	err := chromedp.Run(ctx,
-		chromedp.Navigate(url),
-		// biraz render bekle
-		chromedp.Sleep(time.Duration(waitMS)*time.Millisecond),
-		chromedp.ActionFunc(func(ctx context.Context) error {
-			var err error
-			buf, err = page.CaptureScreenshot().WithFormat(page.CaptureScreenshotFormatPng).WithFromSurface(true).Do(ctx)
-			return err
-		}),
-	)
-	if err != nil {
+	if err := chromedp.Run(ctx, screenshotActions(url, nil, screenshotOptions{WaitMS: waitMS}, &buf, nil)); err != nil {
 		return err
 	}
 
@@ -474,7 +1369,9 @@ func findChrome() string { return "" }
 // Output Writers (JSON + Summary)
 // -------------------------
 
-func writeJSON(path string, results []ScanResult) error {
+// writeJSON rebuilds the legacy scan_results.json array from the JSONL result stream,
+// one record at a time, so it never holds the whole run in memory.
+func writeJSON(path, streamPath string) error {
 	tmp := path + ".tmp"
 	f, err := os.Create(tmp)
 	if err != nil {
@@ -482,76 +1379,130 @@ func writeJSON(path string, results []ScanResult) error {
 	}
 	defer f.Close()
 
-	enc := json.NewEncoder(f)
-	enc.SetIndent("", "  ")
-	if err := enc.Encode(results); err != nil {
+	w := bufio.NewWriter(f)
+	n := 0
+	_, _ = w.WriteString("[")
+	err = forEachResult(streamPath, func(r ScanResult) error {
+		raw, err := json.MarshalIndent(r, "  ", "  ")
+		if err != nil {
+			return err
+		}
+		if n > 0 {
+			_, _ = w.WriteString(",")
+		}
+		_, _ = w.WriteString("\n  ")
+		_, err = w.Write(raw)
+		n++
+		return err
+	})
+	if err != nil && !os.IsNotExist(err) {
+		return err
+	}
+	if n > 0 {
+		_, _ = w.WriteString("\n")
+	}
+	_, _ = w.WriteString("]\n")
+	if err := w.Flush(); err != nil {
 		return err
 	}
 	_ = f.Close()
 	return os.Rename(tmp, path)
 }
 
-func writeSummary(path string, results []ScanResult) error {
-	var active, passive int
-	var activeList, passiveList []string
-
-	for _, r := range results {
+// writeSummary streams the result file three times (counts, active URLs, passive URLs)
+// instead of keeping the URL lists in memory. A read error leaves the previous summary
+// in place rather than writing a truncated one.
+func writeSummary(path, streamPath string) error {
+	var total, active, passive int
+	classes := map[string]int{}
+	err := forEachResult(streamPath, func(r ScanResult) error {
+		total++
 		if r.Active {
 			active++
-			line := fmt.Sprintf("%s (%d) -> html=%s", r.Normalized, r.HTTPStatus, r.SavedHTML)
-			if r.SavedScreenshot != "" {
-				line += " screenshot=" + r.SavedScreenshot
-			}
-			if r.ScreenshotError != "" {
-				line += " screenshot_error=" + r.ScreenshotError
-			}
-			activeList = append(activeList, line)
 		} else {
 			passive++
-			passiveList = append(passiveList, fmt.Sprintf("%s -> %s", r.Normalized, r.Error))
 		}
+		if r.ErrorClass != "" {
+			classes[r.ErrorClass]++
+		}
+		return nil
+	})
+	if err != nil && !os.IsNotExist(err) {
+		return err
+	}
+
+	tmp := path + ".tmp"
+	f, err := os.Create(tmp)
+	if err != nil {
+		return err
 	}
+	defer f.Close()
+	b := bufio.NewWriter(f)
 
-	var b strings.Builder
 	b.WriteString("=== Scan Summary ===\n")
 	b.WriteString(fmt.Sprintf("Timestamp (UTC): %s\n", time.Now().UTC().Format(time.RFC3339)))
-	b.WriteString(fmt.Sprintf("Total: %d | Active: %d | Passive: %d\n\n", len(results), active, passive))
+	b.WriteString(fmt.Sprintf("Total: %d | Active: %d | Passive: %d\n\n", total, active, passive))
+
+	if len(classes) > 0 {
+		names := make([]string, 0, len(classes))
+		for c := range classes {
+			names = append(names, c)
+		}
+		sort.Slice(names, func(i, j int) bool { return classes[names[i]] > classes[names[j]] })
+		b.WriteString("== Error Classes ==\n")
+		for _, c := range names {
+			b.WriteString(fmt.Sprintf("- %s: %d\n", c, classes[c]))
+		}
+		b.WriteString("\n")
+	}
 
 	b.WriteString("== Active URLs ==\n")
-	if len(activeList) == 0 {
+	if active == 0 {
 		b.WriteString("(none)\n")
 	} else {
-		for _, s := range activeList {
-			b.WriteString("- " + s + "\n")
+		err := forEachResult(streamPath, func(r ScanResult) error {
+			if !r.Active {
+				return nil
+			}
+			line := fmt.Sprintf("%s (%d) -> html=%s", r.Normalized, r.HTTPStatus, r.SavedHTML)
+			if r.SavedScreenshot != "" {
+				line += " screenshot=" + r.SavedScreenshot
+			}
+			if r.ScreenshotError != "" {
+				line += " screenshot_error=" + r.ScreenshotError
+			}
+			b.WriteString("- " + line + "\n")
+			return nil
+		})
+		if err != nil {
+			f.Close()
+			os.Remove(tmp)
+			return err
 		}
 	}
 
 	b.WriteString("\n== Passive URLs ==\n")
-	if len(passiveList) == 0 {
+	if passive == 0 {
 		b.WriteString("(none)\n")
 	} else {
-		for _, s := range passiveList {
-			b.WriteString("- " + s + "\n")
+		err := forEachResult(streamPath, func(r ScanResult) error {
+			if !r.Active {
+				b.WriteString(fmt.Sprintf("- %s -> %s\n", r.Normalized, r.Error))
+			}
+			return nil
+		})
+		if err != nil {
+			f.Close()
+			os.Remove(tmp)
+			return err
 		}
 	}
 
-	return os.WriteFile(path, []byte(b.String()), 0644)
-}
-
-// -------------------------
-// Logging
-// -------------------------
-
-func logLine(logPath, msg string) {
-	f, err := os.OpenFile(logPath, os.O_APPEND|os.O_CREATE|os.O_WRONLY, 0644)
-	if err != nil {
-		fmt.Println("[WARN] log write failed:", err)
-		return
+	if err := b.Flush(); err != nil {
+		return err
 	}
-	defer f.Close()
-
-	ts := time.Now().Format(time.RFC3339)
-	_, _ = f.WriteString(ts + " " + msg + "\n")
+	_ = f.Close()
+	return os.Rename(tmp, path)
 }
 
 // -------------------------
@@ -582,3 +1533,26 @@ func safeFileNameFromURL(u string) string {
 	}
 	return s
 }
+
+// loadJSONState decodes a small JSON state file (caches kept between runs) into v.
+func loadJSONState(path string, v any) error {
+	b, err := os.ReadFile(path)
+	if err != nil {
+		return err
+	}
+	return json.Unmarshal(b, v)
+}
+
+// saveJSONState writes v to path atomically (temp file + rename), so an interrupted
+// run never leaves a half-written state file behind.
+func saveJSONState(path string, v any) error {
+	b, err := json.MarshalIndent(v, "", "  ")
+	if err != nil {
+		return err
+	}
+	tmp := path + ".tmp"
+	if err := os.WriteFile(tmp, b, 0644); err != nil {
+		return err
+	}
+	return os.Rename(tmp, path)
+}
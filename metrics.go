@@ -0,0 +1,241 @@
+// metrics.go
+package main
+
+import (
+	"bufio"
+	"expvar"
+	"fmt"
+	"net/http"
+	"net/http/pprof"
+	"runtime"
+	"sort"
+	"strings"
+	"sync"
+	"sync/atomic"
+	"time"
+)
+
+// -------------------------
+// Metrics (Prometheus text format + pprof)
+// -------------------------
+
+// scanStats collects the scanner's metrics. Counting is always on (a few atomics and a
+// mutex per finished target); -metrics-addr only decides whether they are served.
+var scanStats = newScanMetrics()
+
+// phaseBuckets are the latency histogram bounds in seconds. Onion round trips are slow,
+// so the buckets go up to a minute.
+var phaseBuckets = []float64{0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60}
+
+type scanMetrics struct {
+	mu      sync.Mutex
+	results map[string]uint64 // outcome -> count
+	errors  map[string]uint64 // error class -> count
+	phases  map[string]*histogram
+
+	bytes      atomic.Uint64
+	retries    atomic.Uint64
+	probeBusy  atomic.Int64
+	fetchBusy  atomic.Int64
+	renderBusy atomic.Int64
+
+	gaugeMu sync.Mutex
+	gauges  map[string]gaugeFunc
+}
+
+type gaugeFunc struct {
+	help string
+	fn   func() float64
+}
+
+type histogram struct {
+	counts []uint64 // per bucket, not cumulative; last one is +Inf
+	sum    float64
+	count  uint64
+}
+
+func newScanMetrics() *scanMetrics {
+	return &scanMetrics{
+		results: map[string]uint64{},
+		errors:  map[string]uint64{},
+		phases:  map[string]*histogram{},
+		gauges:  map[string]gaugeFunc{},
+	}
+}
+
+// Gauge registers (or replaces) a gauge read at scrape time.
+func (m *scanMetrics) Gauge(name, help string, fn func() float64) {
+	m.gaugeMu.Lock()
+	defer m.gaugeMu.Unlock()
+	m.gauges[name] = gaugeFunc{help: help, fn: fn}
+}
+
+// ObserveResult counts one finished target.
+func (m *scanMetrics) ObserveResult(r ScanResult) {
+	outcome := "passive"
+	switch {
+	case r.Active && r.NotModified:
+		outcome = "not_modified"
+	case r.Active && r.Probe:
+		outcome = "live"
+	case r.Active:
+		outcome = "active"
+	}
+	if !r.NotModified {
+		m.bytes.Add(uint64(r.HTMLBytes))
+	}
+
+	m.mu.Lock()
+	defer m.mu.Unlock()
+	m.results[outcome]++
+	if r.ErrorClass != "" {
+		m.errors[r.ErrorClass]++
+	}
+	if r.DurationMS > 0 {
+		m.observeLocked("total", r.DurationMS)
+	}
+	for _, p := range []struct {
+		name string
+		ms   int64
+	}{{"socks", r.SocksMS}, {"tls", r.TLSMS}, {"ttfb", r.TTFBMS}, {"body", r.BodyMS}} {
+		if p.ms > 0 {
+			m.observeLocked(p.name, p.ms)
+		}
+	}
+}
+
+func (m *scanMetrics) observeLocked(phase string, ms int64) {
+	h := m.phases[phase]
+	if h == nil {
+		h = &histogram{counts: make([]uint64, len(phaseBuckets)+1)}
+		m.phases[phase] = h
+	}
+	sec := float64(ms) / 1000
+	i := sort.SearchFloat64s(phaseBuckets, sec)
+	h.counts[i]++
+	h.sum += sec
+	h.count++
+}
+
+// WritePrometheus writes all metrics in the Prometheus text exposition format.
+func (m *scanMetrics) WritePrometheus(w *bufio.Writer) {
+	header := func(name, typ, help string) {
+		fmt.Fprintf(w, "# HELP %s %s\n# TYPE %s %s\n", name, help, name, typ)
+	}
+
+	m.mu.Lock()
+	header("tor_scraper_results_total", "counter", "Finished targets by outcome.")
+	for _, k := range sortedKeys(m.results) {
+		fmt.Fprintf(w, "tor_scraper_results_total{outcome=%q} %d\n", k, m.results[k])
+	}
+	header("tor_scraper_errors_total", "counter", "Failed targets by error class (SOCKS reply code, timeout phase, HTTP status, ...).")
+	for _, k := range sortedKeys(m.errors) {
+		fmt.Fprintf(w, "tor_scraper_errors_total{class=%q} %d\n", k, m.errors[k])
+	}
+	header("tor_scraper_phase_seconds", "histogram", "Request latency per phase.")
+	for _, phase := range sortedKeys(m.phases) {
+		h := m.phases[phase]
+		var cum uint64
+		for i, le := range phaseBuckets {
+			cum += h.counts[i]
+			fmt.Fprintf(w, "tor_scraper_phase_seconds_bucket{phase=%q,le=\"%g\"} %d\n", phase, le, cum)
+		}
+		fmt.Fprintf(w, "tor_scraper_phase_seconds_bucket{phase=%q,le=\"+Inf\"} %d\n", phase, h.count)
+		fmt.Fprintf(w, "tor_scraper_phase_seconds_sum{phase=%q} %g\n", phase, h.sum)
+		fmt.Fprintf(w, "tor_scraper_phase_seconds_count{phase=%q} %d\n", phase, h.count)
+	}
+	m.mu.Unlock()
+
+	header("tor_scraper_downloaded_bytes_total", "counter", "Page body bytes downloaded (304 answers excluded).")
+	fmt.Fprintf(w, "tor_scraper_downloaded_bytes_total %d\n", m.bytes.Load())
+	header("tor_scraper_retries_total", "counter", "Fetch retries after transient failures.")
+	fmt.Fprintf(w, "tor_scraper_retries_total %d\n", m.retries.Load())
+	header("tor_scraper_workers_busy", "gauge", "Workers currently working, by stage.")
+	fmt.Fprintf(w, "tor_scraper_workers_busy{stage=\"probe\"} %d\n", m.probeBusy.Load())
+	fmt.Fprintf(w, "tor_scraper_workers_busy{stage=\"fetch\"} %d\n", m.fetchBusy.Load())
+	fmt.Fprintf(w, "tor_scraper_workers_busy{stage=\"render\"} %d\n", m.renderBusy.Load())
+
+	m.gaugeMu.Lock()
+	for _, name := range sortedKeys(m.gauges) {
+		g := m.gauges[name]
+		header(name, "gauge", g.help)
+		fmt.Fprintf(w, "%s %g\n", name, g.fn())
+	}
+	m.gaugeMu.Unlock()
+
+	var ms runtime.MemStats
+	runtime.ReadMemStats(&ms)
+	header("go_goroutines", "gauge", "Number of goroutines.")
+	fmt.Fprintf(w, "go_goroutines %d\n", runtime.NumGoroutine())
+	header("go_memstats_heap_alloc_bytes", "gauge", "Heap bytes allocated and in use.")
+	fmt.Fprintf(w, "go_memstats_heap_alloc_bytes %d\n", ms.HeapAlloc)
+	header("go_gc_cycles_total", "counter", "Completed GC cycles.")
+	fmt.Fprintf(w, "go_gc_cycles_total %d\n", ms.NumGC)
+	if rss, ok := processTreeRSS(); ok {
+		header("tor_scraper_process_tree_rss_bytes", "gauge", "Resident memory of the scanner and its Chrome children.")
+		fmt.Fprintf(w, "tor_scraper_process_tree_rss_bytes %d\n", rss)
+	}
+}
+
+func sortedKeys[V any](m map[string]V) []string {
+	keys := make([]string, 0, len(m))
+	for k := range m {
+		keys = append(keys, k)
+	}
+	sort.Strings(keys)
+	return keys
+}
+
+// startMetricsServer serves /metrics (Prometheus), /debug/vars (expvar) and
+// /debug/pprof/ on addr in the background. Bind it to localhost: pprof is not
+// something to expose.
+func startMetricsServer(addr string) {
+	start := time.Now()
+	expvar.Publish("tor_scraper", expvar.Func(func() any {
+		m := scanStats
+		m.mu.Lock()
+		defer m.mu.Unlock()
+		results, errors := map[string]uint64{}, map[string]uint64{}
+		for k, v := range m.results {
+			results[k] = v
+		}
+		for k, v := range m.errors {
+			errors[k] = v
+		}
+		return map[string]any{
+			"uptime_seconds": time.Since(start).Seconds(),
+			"results":        results,
+			"errors":         errors,
+			"bytes":          m.bytes.Load(),
+			"fetch_busy":     m.fetchBusy.Load(),
+		}
+	}))
+
+	mux := http.NewServeMux()
+	mux.HandleFunc("/metrics", func(w http.ResponseWriter, r *http.Request) {
+		w.Header().Set("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+		bw := bufio.NewWriter(w)
+		scanStats.WritePrometheus(bw)
+		_ = bw.Flush()
+	})
+	mux.Handle("/debug/vars", expvar.Handler())
+	mux.HandleFunc("/debug/pprof/", pprof.Index)
+	mux.HandleFunc("/debug/pprof/cmdline", pprof.Cmdline)
+	mux.HandleFunc("/debug/pprof/profile", pprof.Profile)
+	mux.HandleFunc("/debug/pprof/symbol", pprof.Symbol)
+	mux.HandleFunc("/debug/pprof/trace", pprof.Trace)
+	mux.HandleFunc("/", func(w http.ResponseWriter, r *http.Request) {
+		if r.URL.Path != "/" {
+			http.NotFound(w, r)
+			return
+		}
+		fmt.Fprintln(w, strings.Join([]string{"/metrics", "/debug/vars", "/debug/pprof/"}, "\n"))
+	})
+
+	srv := &http.Server{Addr: addr, Handler: mux, ReadHeaderTimeout: 5 * time.Second}
+	go func() {
+		if err := srv.ListenAndServe(); err != nil {
+			fmt.Println("[WARN] metrics server stopped:", err)
+		}
+	}()
+}
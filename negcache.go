@@ -0,0 +1,132 @@
+// negcache.go
+package main
+
+import (
+	"fmt"
+	"net/url"
+	"os"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Negative Cache (recently dead hosts)
+// -------------------------
+
+// negativeCache remembers hosts whose last scan failed with a host-level error (onion
+// descriptor not found, rendezvous failed, SOCKS connect timeout, ...) across runs.
+// Within the TTL such hosts are either skipped or only get a short liveness probe
+// instead of a full fetch. The TTL grows with repeated failures (up to 4x) and any
+// successful result forgets the host.
+type negativeCache struct {
+	path string
+	ttl  time.Duration
+
+	mu      sync.Mutex
+	entries map[string]*negativeEntry
+	dirty   bool
+}
+
+type negativeEntry struct {
+	Class       string    `json:"class"`
+	Failures    int       `json:"failures"`
+	LastFailure time.Time `json:"last_failure"`
+}
+
+func (e *negativeEntry) expires(ttl time.Duration) time.Time {
+	return e.LastFailure.Add(ttl * time.Duration(minInt(e.Failures, 4)))
+}
+
+// loadNegativeCache reads the cache at path; a missing file is an empty cache. The
+// returned cache is usable (empty) even when the file could not be read.
+func loadNegativeCache(path string, ttl time.Duration) (*negativeCache, error) {
+	c := &negativeCache{path: path, ttl: ttl, entries: map[string]*negativeEntry{}}
+	if err := loadJSONState(path, &c.entries); err != nil && !os.IsNotExist(err) {
+		c.entries = map[string]*negativeEntry{}
+		return c, err
+	}
+	if c.entries == nil {
+		c.entries = map[string]*negativeEntry{}
+	}
+	now := time.Now()
+	for host, e := range c.entries {
+		if now.After(e.expires(ttl)) {
+			delete(c.entries, host)
+			c.dirty = true
+		}
+	}
+	return c, nil
+}
+
+// Lookup returns the entry for the host of rawURL if it is still within its TTL.
+func (c *negativeCache) Lookup(rawURL string) (negativeEntry, bool) {
+	host := urlHost(rawURL)
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	e, ok := c.entries[host]
+	if !ok || time.Now().After(e.expires(c.ttl)) {
+		return negativeEntry{}, false
+	}
+	return *e, true
+}
+
+// Observe updates the cache from a finished result.
+func (c *negativeCache) Observe(r ScanResult) {
+	host := urlHost(r.Normalized)
+	if host == "" {
+		return
+	}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+
+	switch {
+	case r.Active:
+		if _, ok := c.entries[host]; ok {
+			delete(c.entries, host)
+			c.dirty = true
+		}
+	case r.hostDead:
+		e := c.entries[host]
+		if e == nil {
+			e = &negativeEntry{}
+			c.entries[host] = e
+		}
+		e.Class = r.ErrorClass
+		e.Failures++
+		e.LastFailure = time.Now().UTC()
+		c.dirty = true
+	}
+}
+
+// Len returns the number of cached hosts.
+func (c *negativeCache) Len() int {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	return len(c.entries)
+}
+
+// Save writes the cache back if it changed.
+func (c *negativeCache) Save() error {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if !c.dirty {
+		return nil
+	}
+	if err := saveJSONState(c.path, c.entries); err != nil {
+		return err
+	}
+	c.dirty = false
+	return nil
+}
+
+func (e negativeEntry) String() string {
+	return fmt.Sprintf("%s, %d failure(s), last %s", e.Class, e.Failures, e.LastFailure.Format(time.RFC3339))
+}
+
+func urlHost(rawURL string) string {
+	u, err := url.Parse(rawURL)
+	if err != nil {
+		return ""
+	}
+	return u.Hostname()
+}
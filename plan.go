@@ -0,0 +1,156 @@
+// plan.go
+package main
+
+import (
+	"crypto/sha3"
+	"encoding/base32"
+	"errors"
+	"fmt"
+	"hash/fnv"
+	"net"
+	"net/url"
+	"strings"
+	"time"
+)
+
+// -------------------------
+// Target Planning (canonicalize + dedup + onion validation)
+// -------------------------
+
+// scanTarget is one planned job: the line as listed in the targets file and its
+// canonical URL, which is what gets fetched and reported as normalized_url. Suspect
+// targets are in the negative cache and get a short liveness probe before the fetch.
+// Depth and Parent are set for pages discovered by -crawl. Timeout, when set, replaces
+// -timeout for this target (history-based scheduling). Prev is the page's fingerprint
+// from the last scan (change detection).
+type scanTarget struct {
+	Raw     string
+	URL     string
+	Suspect bool
+	Depth   int
+	Parent  string
+	Timeout time.Duration
+	Prev    *pageFingerprint `json:",omitempty"`
+}
+
+// targetPlanner runs before anything is dialed. It canonicalizes every target, drops
+// exact and canonical duplicates and rejects malformed onion addresses locally instead
+// of waiting for Tor to answer with SOCKS error 0xF0/0xF6.
+//
+// Seen URLs are remembered as 64-bit FNV hashes (~20 bytes each), which keeps dedup
+// affordable for multi-million lists; a false duplicate needs a 64-bit collision.
+type targetPlanner struct {
+	dedup bool
+	seen  map[uint64]struct{}
+
+	Duplicates int
+	Invalid    int
+}
+
+func newTargetPlanner(dedup bool) *targetPlanner {
+	return &targetPlanner{dedup: dedup, seen: map[uint64]struct{}{}}
+}
+
+// Plan returns the planned target. dup is true for targets already planned before;
+// err is set for targets that must not be dialed.
+func (p *targetPlanner) Plan(raw string) (t scanTarget, dup bool, err error) {
+	t = scanTarget{Raw: raw, URL: normalizeURL(raw)}
+
+	canon, err := canonicalURL(raw)
+	if err != nil {
+		p.Invalid++
+		return t, false, err
+	}
+	t.URL = canon
+
+	if p.dedup {
+		h := fnv.New64a()
+		h.Write([]byte(canon))
+		key := h.Sum64()
+		if _, ok := p.seen[key]; ok {
+			p.Duplicates++
+			return t, true, nil
+		}
+		p.seen[key] = struct{}{}
+	}
+	return t, false, nil
+}
+
+// canonicalURL normalizes a target so that trivially different spellings of the same
+// page compare equal: lower-case scheme and host, no default port, "/" for an empty
+// path and no fragment. Onion hosts are also checked with validateOnionHost.
+func canonicalURL(raw string) (string, error) {
+	u, err := url.Parse(normalizeURL(raw))
+	if err != nil {
+		return "", err
+	}
+	u.Scheme = strings.ToLower(u.Scheme)
+	if u.Scheme != "http" && u.Scheme != "https" {
+		return "", fmt.Errorf("unsupported scheme %q", u.Scheme)
+	}
+
+	host := strings.TrimSuffix(strings.ToLower(u.Hostname()), ".")
+	if host == "" {
+		return "", errors.New("missing host")
+	}
+	port := u.Port()
+	if (u.Scheme == "http" && port == "80") || (u.Scheme == "https" && port == "443") {
+		port = ""
+	}
+	if strings.HasSuffix(host, ".onion") {
+		if err := validateOnionHost(host); err != nil {
+			return "", err
+		}
+	}
+	if port != "" {
+		u.Host = net.JoinHostPort(host, port)
+	} else if strings.Contains(host, ":") {
+		u.Host = "[" + host + "]"
+	} else {
+		u.Host = host
+	}
+
+	if u.Path == "" {
+		u.Path = "/"
+	}
+	u.Fragment = ""
+	u.RawFragment = ""
+	return u.String(), nil
+}
+
+var onionBase32 = base32.StdEncoding.WithPadding(base32.NoPadding)
+
+// validateOnionHost checks a v3 onion address as specified in rend-spec-v3:
+// base32(PUBKEY[32] | CHECKSUM[2] | VERSION[1]) with VERSION = 3 and
+// CHECKSUM = SHA3-256(".onion checksum" | PUBKEY | VERSION)[:2].
+// Subdomains ("www.<addr>.onion") are allowed; the label before ".onion" is checked.
+func validateOnionHost(host string) error {
+	labels := strings.Split(strings.TrimSuffix(host, ".onion"), ".")
+	addr := labels[len(labels)-1]
+
+	switch {
+	case len(addr) == 16:
+		return fmt.Errorf("invalid onion address %s: v2 onion services are no longer supported", host)
+	case len(addr) != 56:
+		return fmt.Errorf("invalid onion address %s: expected 56 base32 characters, got %d", host, len(addr))
+	}
+
+	raw, err := onionBase32.DecodeString(strings.ToUpper(addr))
+	if err != nil || len(raw) != 35 {
+		return fmt.Errorf("invalid onion address %s: bad base32", host)
+	}
+	pubkey, checksum, version := raw[:32], raw[32:34], raw[34]
+	if version != 3 {
+		return fmt.Errorf("invalid onion address %s: unknown version %d", host, version)
+	}
+
+	h := sha3.New256()
+	h.Write([]byte(".onion checksum"))
+	h.Write(pubkey)
+	h.Write([]byte{version})
+	sum := h.Sum(nil)
+	if sum[0] != checksum[0] || sum[1] != checksum[1] {
+		return fmt.Errorf("invalid onion address %s: checksum mismatch", host)
+	}
+	return nil
+}
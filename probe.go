@@ -0,0 +1,61 @@
+// probe.go
+package main
+
+import (
+	"context"
+	"errors"
+	"net"
+	"net/url"
+	"time"
+)
+
+// -------------------------
+// Liveness Probe (SOCKS CONNECT only)
+// -------------------------
+
+// probeResult is the outcome of one liveness probe. Reply is the SOCKS reply code
+// (0 = reachable) or -1 when the proxy gave no reply (unreachable proxy, timeout).
+type probeResult struct {
+	Alive bool
+	Reply int
+	Took  time.Duration
+	Err   error
+}
+
+// probeTarget only asks the proxy to CONNECT to the target's host:port and closes the
+// stream right away: no TLS, no HTTP request. For onions that is the expensive part
+// (descriptor lookup + rendezvous), so dead hosts are sorted out cheaply and at much
+// higher concurrency than full fetches. Tor caches the descriptor, which also makes
+// the following fetch of an alive host faster.
+func probeTarget(proxies *proxyPool, t scanTarget, worker int, timeout time.Duration) probeResult {
+	u, err := url.Parse(t.URL)
+	if err != nil {
+		return probeResult{Reply: -1, Err: err}
+	}
+	port := u.Port()
+	if port == "" {
+		port = "80"
+		if u.Scheme == "https" {
+			port = "443"
+		}
+	}
+	addr := net.JoinHostPort(u.Hostname(), port)
+
+	ctx, cancel := context.WithTimeout(context.Background(), timeout)
+	defer cancel()
+
+	start := time.Now()
+	conn, err := proxies.DialContext(ctx, "tcp", addr, proxies.isolationKey(-worker, addr))
+	res := probeResult{Took: time.Since(start), Err: err, Reply: -1}
+	if err != nil {
+		var se *socksError
+		if errors.As(err, &se) {
+			res.Reply = int(se.Code)
+		}
+		return res
+	}
+	conn.Close()
+	res.Alive = true
+	res.Reply = 0
+	return res
+}
@@ -0,0 +1,389 @@
+// proxypool.go
+package main
+
+import (
+	"bufio"
+	"context"
+	"crypto/rand"
+	"encoding/hex"
+	"errors"
+	"fmt"
+	"net"
+	"net/http"
+	"strconv"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Tor Proxy Pool (multi-circuit)
+// -------------------------
+
+// proxyPool spreads SOCKS5 dials over several Tor endpoints (separate Tor instances or
+// several SocksPorts of one instance). Each dial sends a username/password derived from
+// the isolation key, so Tor's IsolateSOCKSAuth (on by default) puts every worker or
+// host on its own circuit. Endpoints that cannot be reached are benched with a growing
+// backoff; endpoints whose circuits keep failing get a NEWNYM over the control port.
+type proxyPool struct {
+	endpoints []*proxyEndpoint
+	isolate   string // worker | host | none
+	runID     string
+
+	controls    []*torControl // optional, endpoint i uses controls[i%len]
+	newnymAfter int
+	timeouts    phaseTimeouts
+
+	mu      sync.Mutex
+	clients map[int]*http.Client
+	shared  *http.Client
+}
+
+type proxyEndpoint struct {
+	Addr string
+
+	mu          sync.Mutex
+	inflight    int
+	dials       int
+	failures    int
+	consecFails int // proxy itself unreachable
+	circuitFail int // proxy reachable, but the onion/circuit failed
+	latency     time.Duration
+	downUntil   time.Time
+	newnyms     int
+}
+
+// parseProxyList accepts "host:port[,host:port...]" where a port may be a range
+// ("127.0.0.1:9050-9053" expands to four endpoints).
+func parseProxyList(spec string) ([]string, error) {
+	var out []string
+	for _, item := range strings.Split(spec, ",") {
+		item = strings.TrimSpace(item)
+		if item == "" {
+			continue
+		}
+		host, ports, err := net.SplitHostPort(item)
+		if err != nil {
+			return nil, fmt.Errorf("proxy %q: %w", item, err)
+		}
+		lo, hi := ports, ports
+		if i := strings.IndexByte(ports, '-'); i >= 0 {
+			lo, hi = ports[:i], ports[i+1:]
+		}
+		from, err1 := strconv.Atoi(lo)
+		to, err2 := strconv.Atoi(hi)
+		if err1 != nil || err2 != nil || from < 1 || to > 65535 || from > to {
+			return nil, fmt.Errorf("proxy %q: bad port or port range", item)
+		}
+		for p := from; p <= to; p++ {
+			out = append(out, net.JoinHostPort(host, strconv.Itoa(p)))
+		}
+	}
+	if len(out) == 0 {
+		return nil, errors.New("no proxy endpoints")
+	}
+	return out, nil
+}
+
+func newProxyPool(addrs []string, isolate string, controls []*torControl, newnymAfter int, timeouts phaseTimeouts) *proxyPool {
+	var idBytes [4]byte
+	_, _ = rand.Read(idBytes[:])
+	p := &proxyPool{
+		isolate:     isolate,
+		runID:       hex.EncodeToString(idBytes[:]),
+		controls:    controls,
+		newnymAfter: newnymAfter,
+		timeouts:    timeouts,
+		clients:     map[int]*http.Client{},
+	}
+	for _, a := range addrs {
+		p.endpoints = append(p.endpoints, &proxyEndpoint{Addr: a})
+	}
+	return p
+}
+
+// Addrs returns the endpoint addresses in configuration order.
+func (p *proxyPool) Addrs() []string {
+	out := make([]string, len(p.endpoints))
+	for i, ep := range p.endpoints {
+		out[i] = ep.Addr
+	}
+	return out
+}
+
+// Client returns the HTTP client a worker should use. With worker isolation every
+// worker gets its own transport (pooled keep-alive connections would otherwise leak
+// one worker's circuit to another); host isolation and none share one transport.
+func (p *proxyPool) Client(timeout time.Duration, worker int) *http.Client {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+
+	if p.isolate == "worker" {
+		if c, ok := p.clients[worker]; ok {
+			return c
+		}
+		c := p.newClient(timeout, func(addr string) string { return p.isolationKey(worker, addr) })
+		p.clients[worker] = c
+		return c
+	}
+
+	if p.shared == nil {
+		p.shared = p.newClient(timeout, func(addr string) string { return p.isolationKey(0, addr) })
+	}
+	return p.shared
+}
+
+// isolationKey returns the SOCKS username suffix for a dial of worker to addr.
+// Negative worker ids are used by the probe stage so probes never share a circuit
+// with fetch workers.
+func (p *proxyPool) isolationKey(worker int, addr string) string {
+	switch p.isolate {
+	case "worker":
+		if worker < 0 {
+			return fmt.Sprintf("p%d", -worker)
+		}
+		return fmt.Sprintf("w%d", worker)
+	case "host":
+		host, _, _ := net.SplitHostPort(addr)
+		return host
+	default:
+		return ""
+	}
+}
+
+func (p *proxyPool) newClient(timeout time.Duration, isolationKey func(addr string) string) *http.Client {
+	transport := &http.Transport{
+		DialContext: func(ctx context.Context, network, addr string) (net.Conn, error) {
+			return p.DialContext(ctx, network, addr, isolationKey(addr))
+		},
+		TLSHandshakeTimeout:   p.timeouts.TLS,
+		ResponseHeaderTimeout: p.timeouts.TTFB,
+		DisableKeepAlives:     false,
+	}
+	return &http.Client{
+		Transport: transport,
+		Timeout:   timeout,
+	}
+}
+
+// CloseIdleConnections drops the idle keep-alive connections of every client.
+func (p *proxyPool) CloseIdleConnections() {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	for _, c := range p.clients {
+		c.CloseIdleConnections()
+	}
+	if p.shared != nil {
+		p.shared.CloseIdleConnections()
+	}
+}
+
+// DialContext connects to addr through the best endpoint. An empty isolation key
+// sends no SOCKS credentials.
+func (p *proxyPool) DialContext(ctx context.Context, network, addr, isolationKey string) (net.Conn, error) {
+	ep := p.pick()
+
+	var auth *socksAuth
+	if isolationKey != "" {
+		auth = &socksAuth{User: "tor-scraper-" + p.runID + "-" + isolationKey, Password: "x"}
+	}
+	if p.timeouts.SOCKS > 0 {
+		var cancel context.CancelFunc
+		ctx, cancel = context.WithTimeout(ctx, p.timeouts.SOCKS)
+		defer cancel()
+	}
+
+	start := time.Now()
+	conn, err := socks5Dial(ctx, ep.Addr, network, addr, auth)
+	var class errorClass
+	if err != nil {
+		class = classifyError(err, 0, "socks")
+	}
+	if newnym := ep.done(time.Since(start), err, class); newnym && p.newnymAfter > 0 {
+		go p.newnym(ep)
+	}
+	return conn, err
+}
+
+// pick returns the healthy endpoint with the best latency * load score. If every
+// endpoint is benched the one that comes back first is used anyway.
+func (p *proxyPool) pick() *proxyEndpoint {
+	now := time.Now()
+	var best, soonest *proxyEndpoint
+	var bestScore float64
+	var soonestAt time.Time
+	for _, ep := range p.endpoints {
+		ep.mu.Lock()
+		down, until := now.Before(ep.downUntil), ep.downUntil
+		lat := ep.latency
+		if lat == 0 {
+			lat = time.Second // untried endpoints look average
+		}
+		score := float64(lat) * float64(ep.inflight+1)
+		ep.mu.Unlock()
+
+		if down {
+			if soonest == nil || until.Before(soonestAt) {
+				soonest, soonestAt = ep, until
+			}
+			continue
+		}
+		if best == nil || score < bestScore {
+			best, bestScore = ep, score
+		}
+	}
+	if best == nil {
+		best = soonest
+	}
+	best.mu.Lock()
+	best.inflight++
+	best.dials++
+	best.mu.Unlock()
+	return best
+}
+
+// done records a finished dial. It returns true when a circuit failure was counted,
+// i.e. the endpoint may be due for a NEWNYM. Answers about the target itself (dead
+// onion, bad address) say nothing about the circuits and are not counted.
+func (ep *proxyEndpoint) done(took time.Duration, err error, class errorClass) (newnym bool) {
+	ep.mu.Lock()
+	defer ep.mu.Unlock()
+	ep.inflight--
+
+	switch {
+	case err == nil:
+		ep.consecFails, ep.circuitFail = 0, 0
+		if ep.latency == 0 {
+			ep.latency = took
+		} else {
+			ep.latency = (ep.latency*4 + took) / 5 // EWMA, alpha = 0.2
+		}
+	case class.Kind == "proxy":
+		ep.failures++
+		ep.consecFails++
+		backoff := 5 * time.Second << uint(minInt(ep.consecFails-1, 5))
+		ep.downUntil = time.Now().Add(backoff)
+	case class.CircuitFailure():
+		ep.failures++
+		ep.circuitFail++
+		return true
+	default:
+		ep.failures++
+	}
+	return false
+}
+
+func (p *proxyPool) newnym(ep *proxyEndpoint) {
+	if len(p.controls) == 0 {
+		return
+	}
+	idx := 0
+	for i, e := range p.endpoints {
+		if e == ep {
+			idx = i
+		}
+	}
+
+	ep.mu.Lock()
+	due := ep.circuitFail >= p.newnymAfter
+	if due {
+		ep.circuitFail = 0
+	}
+	ep.mu.Unlock()
+	if !due {
+		return
+	}
+
+	if err := p.controls[idx%len(p.controls)].NewNym(); err != nil {
+		fmt.Printf("[WARN] NEWNYM via %s failed: %v\n", p.controls[idx%len(p.controls)].Addr, err)
+		return
+	}
+	ep.mu.Lock()
+	ep.newnyms++
+	ep.mu.Unlock()
+}
+
+// Report returns one line per endpoint (dials, failures, latency, NEWNYMs).
+func (p *proxyPool) Report() []string {
+	var out []string
+	for _, ep := range p.endpoints {
+		ep.mu.Lock()
+		out = append(out, fmt.Sprintf("%s dials=%d failures=%d latency=%s newnym=%d",
+			ep.Addr, ep.dials, ep.failures, ep.latency.Round(time.Millisecond), ep.newnyms))
+		ep.mu.Unlock()
+	}
+	return out
+}
+
+// isProxyUnreachable tells a failed connection to the SOCKS endpoint itself apart from
+// a failure the proxy reported for the destination (e.g. onion descriptor not found).
+func isProxyUnreachable(err error) bool {
+	for err != nil {
+		var op *net.OpError
+		if !errors.As(err, &op) {
+			return false
+		}
+		if op.Op == "dial" {
+			return true
+		}
+		err = op.Err
+	}
+	return false
+}
+
+func minInt(a, b int) int {
+	if a < b {
+		return a
+	}
+	return b
+}
+
+// -------------------------
+// Tor Control Port (NEWNYM)
+// -------------------------
+
+// torControl speaks just enough of the Tor control protocol to request new circuits.
+// Tor itself rate limits NEWNYM to one per ~10s; requests inside that window are skipped.
+type torControl struct {
+	Addr     string
+	Password string
+
+	mu   sync.Mutex
+	last time.Time
+}
+
+func (c *torControl) NewNym() error {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if time.Since(c.last) < 10*time.Second {
+		return nil
+	}
+
+	conn, err := net.DialTimeout("tcp", c.Addr, 5*time.Second)
+	if err != nil {
+		return err
+	}
+	defer conn.Close()
+	_ = conn.SetDeadline(time.Now().Add(10 * time.Second))
+	r := bufio.NewReader(conn)
+
+	auth := "AUTHENTICATE\r\n"
+	if c.Password != "" {
+		auth = fmt.Sprintf("AUTHENTICATE %q\r\n", c.Password)
+	}
+	for _, cmd := range []string{auth, "SIGNAL NEWNYM\r\n"} {
+		if _, err := conn.Write([]byte(cmd)); err != nil {
+			return err
+		}
+		line, err := r.ReadString('\n')
+		if err != nil {
+			return err
+		}
+		if !strings.HasPrefix(line, "250") {
+			return fmt.Errorf("tor control: %s", strings.TrimSpace(line))
+		}
+	}
+	_, _ = conn.Write([]byte("QUIT\r\n"))
+	c.last = time.Now()
+	return nil
+}
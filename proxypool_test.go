@@ -0,0 +1,207 @@
+// proxypool_test.go
+package main
+
+import (
+	"context"
+	"io"
+	"net"
+	"net/http"
+	"net/http/httptest"
+	"strings"
+	"testing"
+	"time"
+)
+
+// -------------------------
+// Proxy Pool Tests
+// -------------------------
+
+// startTestSOCKS runs the benchmark's fake Tor SOCKS5 server in front of a plain site
+// with three hosts: alive.onion serves pages, dead.onion answers 0xF0 (descriptor not
+// found) and circuit.onion 0xF2 (circuit failed).
+func startTestSOCKS(t *testing.T) *benchSOCKS {
+	t.Helper()
+	sites := &benchSites{kinds: map[string]string{
+		"alive.onion":   "fast",
+		"dead.onion":    "dead",
+		"circuit.onion": "circuit",
+	}}
+	web := httptest.NewServer(sites)
+	t.Cleanup(web.Close)
+	socks, err := startBenchSOCKS(sites, 0, web.Listener.Addr().String(), web.Listener.Addr().String())
+	if err != nil {
+		t.Fatal(err)
+	}
+	t.Cleanup(func() { socks.Close() })
+	return socks
+}
+
+// deadAddr returns a loopback address nobody listens on.
+func deadAddr(t *testing.T) string {
+	t.Helper()
+	ln, err := net.Listen("tcp", "127.0.0.1:0")
+	if err != nil {
+		t.Fatal(err)
+	}
+	addr := ln.Addr().String()
+	ln.Close()
+	return addr
+}
+
+func getPage(t *testing.T, c *http.Client, url string) error {
+	t.Helper()
+	resp, err := c.Get(url)
+	if err != nil {
+		return err
+	}
+	defer resp.Body.Close()
+	_, err = io.Copy(io.Discard, resp.Body)
+	return err
+}
+
+func TestParseProxyList(t *testing.T) {
+	got, err := parseProxyList(" 127.0.0.1:9050-9052, [::1]:9150 ,")
+	if err != nil {
+		t.Fatal(err)
+	}
+	want := "127.0.0.1:9050,127.0.0.1:9051,127.0.0.1:9052,[::1]:9150"
+	if strings.Join(got, ",") != want {
+		t.Errorf("got %v, want %s", got, want)
+	}
+	for _, bad := range []string{"", "127.0.0.1", "127.0.0.1:0", "127.0.0.1:9052-9050", "127.0.0.1:x", "h:1-70000"} {
+		if _, err := parseProxyList(bad); err == nil {
+			t.Errorf("%q: no error", bad)
+		}
+	}
+}
+
+func TestProxyPoolIsolation(t *testing.T) {
+	for _, tc := range []struct {
+		isolate string
+		want    []string // usernames after one request of worker 0 and worker 1 to alive.onion
+	}{
+		{"worker", []string{"w0", "w1"}},
+		{"host", []string{"alive.onion"}},
+		{"none", nil},
+	} {
+		t.Run(tc.isolate, func(t *testing.T) {
+			socks := startTestSOCKS(t)
+			p := newProxyPool([]string{socks.Addr()}, tc.isolate, nil, 0, phaseTimeouts{})
+			c0, c1 := p.Client(5*time.Second, 0), p.Client(5*time.Second, 1)
+			if (c0 == c1) != (tc.isolate != "worker") {
+				t.Errorf("workers 0 and 1 share a client: %v", c0 == c1)
+			}
+			for _, c := range []*http.Client{c0, c1} {
+				if err := getPage(t, c, "http://alive.onion/page/1"); err != nil {
+					t.Fatal(err)
+				}
+			}
+			p.CloseIdleConnections()
+
+			users := socks.Users()
+			if len(users) != len(tc.want) {
+				t.Fatalf("usernames %v, want keys %v", users, tc.want)
+			}
+			for _, key := range tc.want {
+				if users["tor-scraper-"+p.runID+"-"+key] == 0 {
+					t.Errorf("no dial with isolation key %q: %v", key, users)
+				}
+			}
+		})
+	}
+
+	// probes use negative worker ids and never share a circuit with fetch workers
+	p := newProxyPool([]string{"127.0.0.1:9050"}, "worker", nil, 0, phaseTimeouts{})
+	if a, b := p.isolationKey(-1, "x.onion:80"), p.isolationKey(1, "x.onion:80"); a == b {
+		t.Errorf("probe and worker 1 share isolation key %q", a)
+	}
+}
+
+func TestProxyPoolPick(t *testing.T) {
+	p := newProxyPool([]string{"127.0.0.1:1", "127.0.0.1:2", "127.0.0.1:3"}, "none", nil, 0, phaseTimeouts{})
+	fast, slow, down := p.endpoints[0], p.endpoints[1], p.endpoints[2]
+	fast.latency, slow.latency, down.latency = 10*time.Millisecond, 100*time.Millisecond, time.Millisecond
+	down.downUntil = time.Now().Add(time.Minute)
+
+	// latency * (inflight+1): the fast endpoint takes dials until ten are in flight
+	for i := 0; i < 10; i++ {
+		if ep := p.pick(); ep != fast {
+			t.Fatalf("dial %d went to %s, want the fast endpoint", i, ep.Addr)
+		}
+	}
+	if ep := p.pick(); ep != slow {
+		t.Errorf("11th concurrent dial went to %s, want the slow endpoint", ep.Addr)
+	}
+
+	// with every endpoint benched the one that comes back first is used anyway
+	fast.downUntil = time.Now().Add(2 * time.Minute)
+	slow.downUntil = time.Now().Add(3 * time.Minute)
+	if ep := p.pick(); ep != down {
+		t.Errorf("all benched: got %s, want the one back first", ep.Addr)
+	}
+}
+
+func TestProxyPoolFailover(t *testing.T) {
+	socks := startTestSOCKS(t)
+	p := newProxyPool([]string{deadAddr(t), socks.Addr()}, "none", nil, 0, phaseTimeouts{})
+	c := p.Client(5*time.Second, 0)
+
+	// both endpoints are untried and score alike; the unreachable first one gets benched
+	var failures int
+	for i := 0; i < 10; i++ {
+		if err := getPage(t, c, "http://alive.onion/page/1"); err != nil {
+			failures++
+		}
+		c.CloseIdleConnections() // every request dials
+	}
+	dead, live := p.endpoints[0], p.endpoints[1]
+	if failures > 1 || dead.dials > 1 {
+		t.Errorf("%d failed requests, %d dials to the dead endpoint; want at most 1 each", failures, dead.dials)
+	}
+	if live.dials < 9 || !dead.downUntil.After(time.Now()) {
+		t.Errorf("live endpoint dials=%d, dead endpoint benched until %s", live.dials, dead.downUntil)
+	}
+	if report := p.Report(); len(report) != 2 || !strings.Contains(report[1], socks.Addr()) {
+		t.Errorf("report %v", report)
+	}
+}
+
+func TestProxyPoolCircuitFailures(t *testing.T) {
+	socks := startTestSOCKS(t)
+	p := newProxyPool([]string{socks.Addr()}, "host", nil, 3, phaseTimeouts{SOCKS: 5 * time.Second})
+	ep := p.endpoints[0]
+	dial := func(addr string) errorClass {
+		conn, err := p.DialContext(context.Background(), "tcp", addr, p.isolationKey(0, addr))
+		if err == nil {
+			conn.Close()
+			return errorClass{}
+		}
+		return classifyError(err, 0, "socks")
+	}
+
+	// answers about the target say nothing about the circuits
+	for i := 0; i < 5; i++ {
+		if c := dial("dead.onion:80"); c.String() != "socks:0xF0" {
+			t.Fatalf("dead.onion: %s", c)
+		}
+	}
+	if ep.circuitFail != 0 || !ep.downUntil.IsZero() {
+		t.Errorf("0xF0 counted: circuitFail=%d downUntil=%s", ep.circuitFail, ep.downUntil)
+	}
+
+	for i := 0; i < 2; i++ {
+		if c := dial("circuit.onion:80"); !c.CircuitFailure() {
+			t.Fatalf("circuit.onion: %s", c)
+		}
+	}
+	if ep.circuitFail != 2 || ep.failures != 7 {
+		t.Errorf("circuitFail=%d failures=%d, want 2 and 7", ep.circuitFail, ep.failures)
+	}
+	// a success resets the streak
+	if c := dial("alive.onion:80"); c.Kind != "" {
+		t.Fatalf("alive.onion: %s", c)
+	}
+	if ep.circuitFail != 0 || ep.latency == 0 {
+		t.Errorf("after success circuitFail=%d latency=%s", ep.circuitFail, ep.latency)
+	}
+}
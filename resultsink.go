@@ -0,0 +1,214 @@
+// resultsink.go
+package main
+
+import (
+	"bufio"
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"io"
+	"os"
+	"strings"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// Result Stream (append-only JSONL)
+// -------------------------
+
+// resultSink appends every finished ScanResult as one JSON line. Lines are buffered and
+// fsynced in batches (every syncEvery records or syncInterval, whichever comes first),
+// so a killed process loses at most one batch instead of the whole run.
+type resultSink struct {
+	mu        sync.Mutex
+	f         *os.File
+	w         *bufio.Writer
+	pending   int
+	syncEvery int
+	count     int
+
+	stop chan struct{}
+	done chan struct{}
+}
+
+// openResultSink opens path for appending. Without resume the file is truncated first.
+// With resume a torn last line (process killed mid-write) is cut off before appending.
+func openResultSink(path string, resume bool, syncEvery int, syncInterval time.Duration) (*resultSink, error) {
+	flags := os.O_CREATE | os.O_WRONLY | os.O_APPEND
+	if !resume {
+		flags |= os.O_TRUNC
+	} else if err := truncateTornLine(path); err != nil {
+		return nil, err
+	}
+
+	f, err := os.OpenFile(path, flags, 0644)
+	if err != nil {
+		return nil, err
+	}
+	if syncEvery < 1 {
+		syncEvery = 1
+	}
+	s := &resultSink{
+		f:         f,
+		w:         bufio.NewWriter(f),
+		syncEvery: syncEvery,
+		stop:      make(chan struct{}),
+		done:      make(chan struct{}),
+	}
+	go s.syncLoop(syncInterval)
+	return s, nil
+}
+
+// Write appends one result. Safe for concurrent use.
+func (s *resultSink) Write(r ScanResult) error {
+	line, err := json.Marshal(r)
+	if err != nil {
+		return err
+	}
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	if _, err := s.w.Write(append(line, '\n')); err != nil {
+		return err
+	}
+	s.count++
+	s.pending++
+	if s.pending >= s.syncEvery {
+		return s.syncLocked()
+	}
+	return nil
+}
+
+func (s *resultSink) syncLocked() error {
+	if s.pending == 0 {
+		return nil
+	}
+	if err := s.w.Flush(); err != nil {
+		return err
+	}
+	s.pending = 0
+	return s.f.Sync()
+}
+
+func (s *resultSink) syncLoop(every time.Duration) {
+	defer close(s.done)
+	if every <= 0 {
+		<-s.stop
+		return
+	}
+	t := time.NewTicker(every)
+	defer t.Stop()
+	for {
+		select {
+		case <-s.stop:
+			return
+		case <-t.C:
+			s.mu.Lock()
+			if err := s.syncLocked(); err != nil {
+				fmt.Println("[WARN] result stream sync failed:", err)
+			}
+			s.mu.Unlock()
+		}
+	}
+}
+
+// Count returns the number of results written by this sink.
+func (s *resultSink) Count() int {
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	return s.count
+}
+
+// Close flushes and fsyncs pending lines and closes the file.
+func (s *resultSink) Close() error {
+	close(s.stop)
+	<-s.done
+
+	s.mu.Lock()
+	defer s.mu.Unlock()
+	err := s.syncLocked()
+	if cerr := s.f.Close(); err == nil {
+		err = cerr
+	}
+	return err
+}
+
+// truncateTornLine drops a trailing partial line so appended records start on a new line.
+func truncateTornLine(path string) error {
+	f, err := os.OpenFile(path, os.O_RDWR, 0644)
+	if os.IsNotExist(err) {
+		return nil
+	}
+	if err != nil {
+		return err
+	}
+	defer f.Close()
+
+	st, err := f.Stat()
+	if err != nil || st.Size() == 0 {
+		return err
+	}
+
+	// scan backwards in chunks for the last newline
+	const chunk = 64 * 1024
+	buf := make([]byte, chunk)
+	end := st.Size()
+	for pos := end; pos > 0; {
+		n := int64(chunk)
+		if pos < n {
+			n = pos
+		}
+		pos -= n
+		if _, err := f.ReadAt(buf[:n], pos); err != nil && err != io.EOF {
+			return err
+		}
+		if i := bytes.LastIndexByte(buf[:n], '\n'); i >= 0 {
+			if pos+int64(i)+1 == end {
+				return nil
+			}
+			return f.Truncate(pos + int64(i) + 1)
+		}
+	}
+	return f.Truncate(0)
+}
+
+// forEachResult streams the results of a JSONL file to fn. Malformed lines are skipped.
+func forEachResult(path string, fn func(ScanResult) error) error {
+	f, err := os.Open(path)
+	if err != nil {
+		return err
+	}
+	defer f.Close()
+
+	sc := bufio.NewScanner(f)
+	sc.Buffer(make([]byte, 64*1024), 16*1024*1024)
+	for sc.Scan() {
+		line := bytes.TrimSpace(sc.Bytes())
+		if len(line) == 0 {
+			continue
+		}
+		var r ScanResult
+		if err := json.Unmarshal(line, &r); err != nil {
+			continue
+		}
+		if err := fn(r); err != nil {
+			return err
+		}
+	}
+	return sc.Err()
+}
+
+// loadCompletedURLs returns the normalized URLs already present in a result stream,
+// used by -resume to skip finished targets.
+func loadCompletedURLs(path string) (map[string]bool, error) {
+	done := map[string]bool{}
+	err := forEachResult(path, func(r ScanResult) error {
+		done[strings.TrimSpace(r.Normalized)] = true
+		return nil
+	})
+	if os.IsNotExist(err) {
+		return done, nil
+	}
+	return done, err
+}
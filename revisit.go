@@ -0,0 +1,125 @@
+// revisit.go
+package main
+
+import (
+	"net/http"
+	"os"
+	"sync"
+)
+
+// -------------------------
+// Revisit Cache (ETag / Last-Modified)
+// -------------------------
+
+// validatorCache keeps the cache validators a page was served with, per URL, across
+// runs. Later scans send them as If-None-Match / If-Modified-Since; a 304 answer costs
+// a few hundred bytes over Tor and the archived blob (and screenshot) of the previous
+// scan are reused.
+type validatorCache struct {
+	path string
+
+	mu      sync.Mutex
+	entries map[string]*validatorEntry
+	dirty   bool
+}
+
+type validatorEntry struct {
+	ETag         string `json:"etag,omitempty"`
+	LastModified string `json:"last_modified,omitempty"`
+	SHA256       string `json:"sha256"`
+	Path         string `json:"path"`
+	Size         int64  `json:"size"`
+	Screenshot   string `json:"screenshot,omitempty"`
+}
+
+// loadValidatorCache reads the cache at path; a missing file is an empty cache. The
+// returned cache is usable (empty) even when the file could not be read.
+func loadValidatorCache(path string) (*validatorCache, error) {
+	c := &validatorCache{path: path, entries: map[string]*validatorEntry{}}
+	if err := loadJSONState(path, &c.entries); err != nil && !os.IsNotExist(err) {
+		c.entries = map[string]*validatorEntry{}
+		return c, err
+	}
+	if c.entries == nil {
+		c.entries = map[string]*validatorEntry{}
+	}
+	return c, nil
+}
+
+// Get returns the entry for url if its archived blob still exists.
+func (c *validatorCache) Get(url string) (validatorEntry, bool) {
+	if c == nil {
+		return validatorEntry{}, false
+	}
+	c.mu.Lock()
+	e, ok := c.entries[url]
+	c.mu.Unlock()
+	if !ok {
+		return validatorEntry{}, false
+	}
+	if _, err := os.Stat(e.Path); err != nil {
+		return validatorEntry{}, false
+	}
+	return *e, true
+}
+
+// Update stores the validators of a fresh 2xx response. Responses without any
+// validator drop the entry, since they cannot be revalidated.
+func (c *validatorCache) Update(url string, h http.Header, body archivedBody) {
+	if c == nil {
+		return
+	}
+	etag, lm := h.Get("ETag"), h.Get("Last-Modified")
+
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	c.dirty = true
+	if (etag == "" && lm == "") || body.Truncated {
+		delete(c.entries, url)
+		return
+	}
+	prev := c.entries[url]
+	e := &validatorEntry{ETag: etag, LastModified: lm, SHA256: body.SHA256, Path: body.Path, Size: body.Size}
+	if prev != nil && prev.SHA256 == body.SHA256 {
+		e.Screenshot = prev.Screenshot
+	}
+	c.entries[url] = e
+}
+
+// Observe records the screenshot of a finished result so a later 304 can reuse it.
+func (c *validatorCache) Observe(r ScanResult) {
+	if c == nil || r.SavedScreenshot == "" {
+		return
+	}
+	key := r.Normalized
+	if r.FetchedURL != "" {
+		key = r.FetchedURL
+	}
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if e, ok := c.entries[key]; ok && e.SHA256 == r.HTMLSHA256 && e.Screenshot != r.SavedScreenshot {
+		e.Screenshot = r.SavedScreenshot
+		c.dirty = true
+	}
+}
+
+// Len returns the number of URLs with validators.
+func (c *validatorCache) Len() int {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	return len(c.entries)
+}
+
+// Save writes the cache back if it changed.
+func (c *validatorCache) Save() error {
+	c.mu.Lock()
+	defer c.mu.Unlock()
+	if !c.dirty {
+		return nil
+	}
+	if err := saveJSONState(c.path, c.entries); err != nil {
+		return err
+	}
+	c.dirty = false
+	return nil
+}
@@ -0,0 +1,56 @@
+// rss_linux.go
+//go:build linux
+
+package main
+
+import (
+	"os"
+	"strconv"
+	"strings"
+)
+
+// processTreeRSS returns the resident memory (bytes) of this process plus all of its
+// descendants, e.g. the headless Chrome processes started for screenshots.
+func processTreeRSS() (uint64, bool) {
+	entries, err := os.ReadDir("/proc")
+	if err != nil {
+		return 0, false
+	}
+
+	children := map[int][]int{}
+	rss := map[int]uint64{}
+	for _, e := range entries {
+		pid, err := strconv.Atoi(e.Name())
+		if err != nil {
+			continue
+		}
+		raw, err := os.ReadFile("/proc/" + e.Name() + "/stat")
+		if err != nil {
+			continue
+		}
+		// the command name may contain spaces, so split after its closing paren
+		s := string(raw)
+		i := strings.LastIndexByte(s, ')')
+		if i < 0 {
+			continue
+		}
+		fields := strings.Fields(s[i+1:])
+		if len(fields) < 22 {
+			continue
+		}
+		ppid, _ := strconv.Atoi(fields[1])
+		pages, _ := strconv.ParseUint(fields[21], 10, 64)
+		children[ppid] = append(children[ppid], pid)
+		rss[pid] = pages * uint64(os.Getpagesize())
+	}
+
+	var total uint64
+	stack := []int{os.Getpid()}
+	for len(stack) > 0 {
+		pid := stack[len(stack)-1]
+		stack = stack[:len(stack)-1]
+		total += rss[pid]
+		stack = append(stack, children[pid]...)
+	}
+	return total, true
+}
@@ -0,0 +1,7 @@
+// rss_other.go
+//go:build !linux
+
+package main
+
+// processTreeRSS is only implemented on Linux (/proc); benchmarks report "n/a" elsewhere.
+func processTreeRSS() (uint64, bool) { return 0, false }
@@ -0,0 +1,290 @@
+// socks.go
+package main
+
+import (
+	"context"
+	"crypto/tls"
+	"encoding/binary"
+	"errors"
+	"fmt"
+	"io"
+	"net"
+	"net/http/httptrace"
+	"strconv"
+	"sync"
+	"time"
+)
+
+// -------------------------
+// SOCKS5 Client (context-aware)
+// -------------------------
+
+// socksAuth is the RFC 1929 username/password sent to the proxy. Tor does not check it,
+// it only uses it as a stream isolation key.
+type socksAuth struct {
+	User     string
+	Password string
+}
+
+// socksError is a non-zero reply code of the SOCKS5 CONNECT request. Tor adds its own
+// codes (0xF0-0xF7) for onion service failures.
+type socksError struct {
+	Code byte
+}
+
+func (e *socksError) Error() string {
+	return fmt.Sprintf("socks reply 0x%02X: %s", e.Code, socksReplyText(e.Code))
+}
+
+func socksReplyText(code byte) string {
+	switch code {
+	case 0x01:
+		return "general failure"
+	case 0x02:
+		return "connection not allowed by ruleset"
+	case 0x03:
+		return "network unreachable"
+	case 0x04:
+		return "host unreachable"
+	case 0x05:
+		return "connection refused"
+	case 0x06:
+		return "TTL expired"
+	case 0x07:
+		return "command not supported"
+	case 0x08:
+		return "address type not supported"
+	case 0xF0:
+		return "onion service descriptor not found"
+	case 0xF1:
+		return "onion service descriptor invalid"
+	case 0xF2:
+		return "onion service introduction failed"
+	case 0xF3:
+		return "onion service rendezvous failed"
+	case 0xF4:
+		return "onion service missing client authorization"
+	case 0xF5:
+		return "onion service wrong client authorization"
+	case 0xF6:
+		return "onion service bad address"
+	case 0xF7:
+		return "onion service introduction timed out"
+	default:
+		return "unknown"
+	}
+}
+
+// socks5Dial connects to addr through the SOCKS5 proxy at proxyAddr. Unlike
+// proxy.SOCKS5(...).Dial it honours ctx for the TCP connect and the whole handshake,
+// so a hung proxy or a slow onion descriptor lookup can be cancelled.
+func socks5Dial(ctx context.Context, proxyAddr, network, addr string, auth *socksAuth) (net.Conn, error) {
+	host, portStr, err := net.SplitHostPort(addr)
+	if err != nil {
+		return nil, err
+	}
+	port, err := strconv.Atoi(portStr)
+	if err != nil || port < 1 || port > 65535 {
+		return nil, fmt.Errorf("bad port %q", portStr)
+	}
+
+	var d net.Dialer
+	conn, err := d.DialContext(ctx, "tcp", proxyAddr)
+	if err != nil {
+		return nil, err
+	}
+
+	// the deadline covers blocking reads; AfterFunc also unblocks them on cancel
+	if dl, ok := ctx.Deadline(); ok {
+		_ = conn.SetDeadline(dl)
+	}
+	stop := context.AfterFunc(ctx, func() { _ = conn.SetDeadline(time.Unix(1, 0)) })
+
+	err = socks5Handshake(conn, host, port, auth)
+	if !stop() {
+		// ctx ended during the handshake; report that rather than the forced i/o error
+		err = ctx.Err()
+	}
+	if err != nil {
+		conn.Close()
+		return nil, err
+	}
+	_ = conn.SetDeadline(time.Time{})
+	return conn, nil
+}
+
+func socks5Handshake(rw io.ReadWriter, host string, port int, auth *socksAuth) error {
+	methods := []byte{0x00}
+	if auth != nil {
+		methods = []byte{0x02, 0x00}
+	}
+	if _, err := rw.Write(append([]byte{0x05, byte(len(methods))}, methods...)); err != nil {
+		return fmt.Errorf("socks greeting: %w", err)
+	}
+	var buf [2]byte
+	if _, err := io.ReadFull(rw, buf[:]); err != nil {
+		return fmt.Errorf("socks greeting: %w", err)
+	}
+	if buf[0] != 0x05 {
+		return fmt.Errorf("socks greeting: unexpected version %d", buf[0])
+	}
+
+	switch buf[1] {
+	case 0x00:
+	case 0x02:
+		if auth == nil || len(auth.User) > 255 || len(auth.Password) > 255 {
+			return errors.New("socks: proxy requires username/password")
+		}
+		req := []byte{0x01, byte(len(auth.User))}
+		req = append(req, auth.User...)
+		req = append(req, byte(len(auth.Password)))
+		req = append(req, auth.Password...)
+		if _, err := rw.Write(req); err != nil {
+			return fmt.Errorf("socks auth: %w", err)
+		}
+		if _, err := io.ReadFull(rw, buf[:]); err != nil {
+			return fmt.Errorf("socks auth: %w", err)
+		}
+		if buf[1] != 0x00 {
+			return errors.New("socks auth: rejected by proxy")
+		}
+	default:
+		return fmt.Errorf("socks: no acceptable auth method (0x%02X)", buf[1])
+	}
+
+	req := []byte{0x05, 0x01, 0x00}
+	if ip := net.ParseIP(host); ip != nil {
+		if ip4 := ip.To4(); ip4 != nil {
+			req = append(append(req, 0x01), ip4...)
+		} else {
+			req = append(append(req, 0x04), ip.To16()...)
+		}
+	} else {
+		if len(host) > 255 {
+			return errors.New("socks: host name too long")
+		}
+		req = append(append(req, 0x03, byte(len(host))), host...)
+	}
+	req = binary.BigEndian.AppendUint16(req, uint16(port))
+	if _, err := rw.Write(req); err != nil {
+		return fmt.Errorf("socks connect: %w", err)
+	}
+
+	var head [4]byte
+	if _, err := io.ReadFull(rw, head[:]); err != nil {
+		return fmt.Errorf("socks connect: %w", err)
+	}
+	if head[1] != 0x00 {
+		return &socksError{Code: head[1]}
+	}
+
+	// skip the bound address
+	var skip int
+	switch head[3] {
+	case 0x01:
+		skip = 4
+	case 0x04:
+		skip = 16
+	case 0x03:
+		if _, err := io.ReadFull(rw, buf[:1]); err != nil {
+			return fmt.Errorf("socks connect: %w", err)
+		}
+		skip = int(buf[0])
+	default:
+		return fmt.Errorf("socks connect: bad address type %d", head[3])
+	}
+	if _, err := io.CopyN(io.Discard, rw, int64(skip+2)); err != nil {
+		return fmt.Errorf("socks connect: %w", err)
+	}
+	return nil
+}
+
+// -------------------------
+// Request Phases (timeouts + timing)
+// -------------------------
+
+// phaseTimeouts bounds each phase of a request separately instead of one blunt timeout.
+type phaseTimeouts struct {
+	SOCKS time.Duration // proxy connect + CONNECT reply (onion lookup, rendezvous)
+	TLS   time.Duration
+	TTFB  time.Duration // request written -> first response byte
+	Body  time.Duration
+}
+
+// phaseTimes records when each phase of one request started and ended, via httptrace.
+// A reused keep-alive connection has no SOCKS or TLS phase. Trace callbacks may still
+// fire on the transport's dial goroutine after the request was given up, so the fields
+// are guarded and every attempt gets its own phaseTimes.
+type phaseTimes struct {
+	mu                  sync.Mutex
+	getConn, gotConn    time.Time
+	tlsStart, tlsDone   time.Time
+	wrote, firstByte    time.Time
+	bodyStart, bodyDone time.Time
+	reused              bool
+}
+
+func (p *phaseTimes) trace() *httptrace.ClientTrace {
+	return &httptrace.ClientTrace{
+		GetConn: func(string) { p.mark(&p.getConn) },
+		GotConn: func(info httptrace.GotConnInfo) {
+			p.mu.Lock()
+			p.gotConn = time.Now()
+			p.reused = info.Reused
+			p.mu.Unlock()
+		},
+		TLSHandshakeStart:    func() { p.mark(&p.tlsStart) },
+		TLSHandshakeDone:     func(tls.ConnectionState, error) { p.mark(&p.tlsDone) },
+		WroteRequest:         func(httptrace.WroteRequestInfo) { p.mark(&p.wrote) },
+		GotFirstResponseByte: func() { p.mark(&p.firstByte) },
+	}
+}
+
+// mark sets one of p's timestamps to now.
+func (p *phaseTimes) mark(t *time.Time) {
+	p.mu.Lock()
+	*t = time.Now()
+	p.mu.Unlock()
+}
+
+// phase returns the name of the phase a request was in when it stopped.
+func (p *phaseTimes) phase() string {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	switch {
+	case !p.bodyStart.IsZero():
+		return "body"
+	case !p.wrote.IsZero():
+		return "ttfb"
+	case !p.gotConn.IsZero():
+		return "request"
+	case !p.tlsStart.IsZero():
+		return "tls"
+	case !p.getConn.IsZero():
+		return "socks"
+	default:
+		return "request"
+	}
+}
+
+func (p *phaseTimes) apply(res *ScanResult) {
+	p.mu.Lock()
+	defer p.mu.Unlock()
+	ms := func(from, to time.Time) int64 {
+		if from.IsZero() || to.IsZero() {
+			return 0
+		}
+		return to.Sub(from).Milliseconds()
+	}
+	tlsMS := ms(p.tlsStart, p.tlsDone)
+	if !p.reused {
+		// the custom DialContext is invisible to httptrace: dial = conn wait - TLS
+		res.SocksMS = ms(p.getConn, p.gotConn) - tlsMS
+		if res.SocksMS < 0 {
+			res.SocksMS = 0
+		}
+	}
+	res.TLSMS = tlsMS
+	res.TTFBMS = ms(p.wrote, p.firstByte)
+	res.BodyMS = ms(p.bodyStart, p.bodyDone)
+}